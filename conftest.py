@@ -0,0 +1,40 @@
+"""
+The `kuzudb` and `neo4j` directories hold flat scripts, and both have modules named `build_graph`,
+`query` and `benchmark_query`. pytest puts each test module's directory on the path, but a module
+imported for one directory's tests would be reused by the other's. So that both directories can run
+in one session, as in `pytest . ../neo4j` from `kuzudb`, the modules imported from one directory are
+set aside while the other's tests are collected or run, and put back (the same objects, so that
+pickling by reference still works) before its own tests are.
+"""
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+SCRIPT_DIRS = {Path(__file__).resolve().parent / name for name in ("kuzudb", "neo4j")}
+_set_aside: dict[Path, dict[str, ModuleType]] = {script_dir: {} for script_dir in SCRIPT_DIRS}
+
+
+def use_script_dir(script_dir: Path) -> None:
+    if script_dir not in SCRIPT_DIRS:
+        return
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path is not None and Path(path).parent in SCRIPT_DIRS - {script_dir}:
+            _set_aside[Path(path).parent][name] = sys.modules.pop(name)
+    sys.modules.update(_set_aside[script_dir])
+    _set_aside[script_dir].clear()
+    # Resolve the test module's own imports from its directory first
+    if str(script_dir) in sys.path:
+        sys.path.remove(str(script_dir))
+    sys.path.insert(0, str(script_dir))
+
+
+def pytest_collectstart(collector: pytest.Collector) -> None:
+    if isinstance(collector, pytest.Module):
+        use_script_dir(collector.path.parent)
+
+
+def pytest_runtest_setup(item: pytest.Item) -> None:
+    use_script_dir(item.path.parent)
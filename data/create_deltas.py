@@ -0,0 +1,265 @@
+"""
+Generate a deterministic sequence of append-only delta batches on top of the full snapshot, to drive
+incremental loads and mixed read/write benchmarks.
+
+Each batch is a directory `output/deltas/NNNN` of parquet files, to be applied in this order:
+
+* `persons.parquet`: new persons, with the same columns as `persons.parquet`
+* `lives_in.parquet`: the residence city of each new person
+* `unfollows.parquet`: existing `Follows` edges to delete
+* `follows.parquet`: new `Follows` edges, with their targets picked by preferential attachment
+* `relocations.parquet`: existing persons (`from`) moving to a new city (`to`)
+
+A batch only refers to persons and edges that exist once the batches before it are applied, so each
+one can be loaded on its own with plain COPY/LOAD statements, without reading any other batch.
+
+New follows are drawn with the same (`from`, `to`) convention as `create_edges_follows.py`: the
+follower is uniform over all persons, and the person followed is chosen with probability
+proportional to their in-degree plus one (the target of a uniformly drawn existing edge, or a
+uniformly drawn person), so the existing hubs keep gaining followers. Relocations pick from the
+same cities with a population of over 1M as `create_edges_location.py`. New persons' profiles
+are resampled from the existing ones (names recombined from first and last names of the same
+gender), so no Faker calls are needed. The whole graph is held as a sorted array of edge keys, so
+every step is a vectorized NumPy operation, and a batch's edges are merged into it by position
+rather than by sorting it again.
+
+`--output_format ipc` reads the snapshot from the Arrow IPC files written by the other scripts
+with the same option. The batches are always parquet, since `apply_deltas.py` loads them directly.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from create_edges_location import get_cities_df
+from parquet_writer import add_parquet_args, config_from_args, measure, read_output, write_parquet
+
+# An edge's key packs the follower ID into the high bits and the followed ID into the low bits
+ID_BITS = 32
+
+
+def edge_keys(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    return (source.astype(np.int64) << ID_BITS) | target.astype(np.int64)
+
+
+def split_keys(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return keys >> ID_BITS, keys & ((1 << ID_BITS) - 1)
+
+
+def check_id_range(ids: np.ndarray) -> None:
+    if len(ids) and (ids.min() < 0 or ids.max() >= 1 << ID_BITS):
+        raise ValueError(f"Person IDs must fit in {ID_BITS} bits to be packed into edge keys")
+
+
+class GrowingArray:
+    """A NumPy array with amortized constant-time appends, by doubling its capacity when full"""
+
+    def __init__(self, values: np.ndarray) -> None:
+        self._data = values.copy()
+        self.size = len(values)
+
+    @property
+    def values(self) -> np.ndarray:
+        """A view of the appended values, which writes through to the array"""
+        return self._data[: self.size]
+
+    def extend(self, values: np.ndarray) -> None:
+        if self.size + len(values) > len(self._data):
+            data = np.empty(max(2 * len(self._data), self.size + len(values)), self._data.dtype)
+            data[: self.size] = self.values
+            self._data = data
+        self._data[self.size : self.size + len(values)] = values
+        self.size += len(values)
+
+
+class GraphState:
+    """Person IDs, the sorted `Follows` edge keys and each person's city, as of the last batch"""
+
+    def __init__(
+        self, persons_df: pl.DataFrame, follows_df: pl.DataFrame, lives_in_df: pl.DataFrame
+    ) -> None:
+        self.persons_df = persons_df
+        self._person_ids = GrowingArray(persons_df["id"].to_numpy())
+        check_id_range(self.person_ids)
+        sources, targets = follows_df["from"].to_numpy(), follows_df["to"].to_numpy()
+        check_id_range(sources)
+        check_id_range(targets)
+        self.edges = np.unique(edge_keys(sources, targets))
+        lives_in_df = lives_in_df.sort("from")
+        self._city_person_ids = GrowingArray(lives_in_df["from"].to_numpy())
+        self._city_ids = GrowingArray(lives_in_df["to"].to_numpy())
+
+    @property
+    def person_ids(self) -> np.ndarray:
+        return self._person_ids.values
+
+    @property
+    def city_person_ids(self) -> np.ndarray:
+        return self._city_person_ids.values
+
+    @property
+    def city_ids(self) -> np.ndarray:
+        return self._city_ids.values
+
+    def new_persons(self, rng: np.random.Generator, num: int) -> pl.DataFrame:
+        """Profiles resampled from the existing persons, with new IDs after the largest one"""
+        sample = self.persons_df.select(pl.all().gather(rng.integers(0, len(self.persons_df), num)))
+        names = self.persons_df["name"].str.split_exact(" ", 1).struct.unnest()
+        new_names = []
+        for gender in ["female", "male"]:
+            is_gender = (self.persons_df["gender"] == gender).to_numpy()
+            first, last = names["field_0"].filter(is_gender), names["field_1"].filter(is_gender)
+            count = int((sample["gender"] == gender).sum())
+            new_names.append(
+                first.gather(rng.integers(0, len(first), count))
+                + " "
+                + last.gather(rng.integers(0, len(last), count))
+            )
+        # Put the names back in the order of each gender's rows in the sample
+        order = np.argsort(np.argsort(sample["gender"].to_numpy() == "male", kind="stable"))
+        names = pl.concat(new_names).gather(order)
+        first_id = int(self.person_ids.max()) + 1
+        check_id_range(np.array([first_id + num - 1]))
+        return sample.with_columns(
+            pl.Series("id", np.arange(first_id, first_id + num, dtype=np.int64)),
+            names.alias("name"),
+        )
+
+    def new_follows(
+        self, rng: np.random.Generator, num: int, new_person_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Keys of up to `num` new edges, with no self-follows and no edges that already exist. The
+        batch's new persons follow others too, but are only followed from the next batch on.
+        """
+        person_ids = self.person_ids
+        # Draw from the existing and the new persons by index, without concatenating them
+        picks = rng.integers(0, len(person_ids) + len(new_person_ids), num)
+        is_new = picks >= len(person_ids)
+        sources = np.empty(num, dtype=np.int64)
+        sources[~is_new] = person_ids[picks[~is_new]]
+        sources[is_new] = new_person_ids[picks[is_new] - len(person_ids)]
+        # Preferential attachment with smoothing: a person is picked with probability proportional
+        # to in-degree + 1, by taking the target of a random edge with probability E / (E + N)
+        from_edge = rng.random(num) < len(self.edges) / (len(self.edges) + len(person_ids))
+        _, edge_targets = split_keys(self.edges[rng.integers(0, len(self.edges), num)])
+        targets = np.where(from_edge, edge_targets, rng.choice(person_ids, num))
+        keys = edge_keys(sources, targets)
+        keys = keys[sources != targets]
+        # Drop existing edges and duplicates, keeping the first draw of each
+        position = np.minimum(np.searchsorted(self.edges, keys), len(self.edges) - 1)
+        keys = keys[self.edges[position] != keys]
+        _, first = np.unique(keys, return_index=True)
+        return keys[np.sort(first)]
+
+    def unfollows(self, rng: np.random.Generator, num: int) -> np.ndarray:
+        """Indices into the edges of `num` distinct existing edges"""
+        return np.sort(rng.choice(len(self.edges), min(num, len(self.edges)), replace=False))
+
+    def relocations(
+        self, rng: np.random.Generator, num: int, city_ids: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Indices into the residents of `num` distinct persons, and a different city for each"""
+        movers = np.sort(rng.choice(len(self.city_person_ids), num, replace=False))
+        choice = rng.integers(0, len(city_ids), num)
+        # Move anyone who drew their current city to the next city in the list instead
+        same = city_ids[choice] == self.city_ids[movers]
+        choice[same] = (choice[same] + 1) % len(city_ids)
+        return movers, city_ids[choice]
+
+    def apply(
+        self,
+        persons_df: pl.DataFrame,
+        lives_in: np.ndarray,
+        unfollowed: np.ndarray,
+        followed: np.ndarray,
+        movers: np.ndarray,
+        new_cities: np.ndarray,
+    ) -> None:
+        self.persons_df = pl.concat([self.persons_df, persons_df])
+        self._person_ids.extend(persons_df["id"].to_numpy())
+        # Only the batch's keys are sorted: the new edges are inserted at their positions among the
+        # remaining ones, which are still sorted, in one copy of the array
+        edges = np.delete(self.edges, unfollowed)
+        followed = np.sort(followed)
+        self.edges = np.insert(edges, np.searchsorted(edges, followed), followed)
+        self.city_ids[movers] = new_cities
+        self._city_person_ids.extend(persons_df["id"].to_numpy())
+        self._city_ids.extend(lives_in)
+
+
+def write_edges(path: Path, source: np.ndarray, target: np.ndarray) -> None:
+    edges_df = pl.DataFrame(
+        {"from": source, "to": target}, schema={"from": pl.Int64, "to": pl.Int64}
+    )
+    write_parquet(edges_df, path, WRITER_CONFIG)
+
+
+def main() -> None:
+    state = GraphState(
+        read_output(NODES_PATH / "persons.parquet", WRITER_CONFIG),
+        read_output(EDGES_PATH / "follows.parquet", WRITER_CONFIG),
+        read_output(EDGES_PATH / "lives_in.parquet", WRITER_CONFIG),
+    )
+    city_ids = get_cities_df(NODES_PATH / "cities.parquet", WRITER_CONFIG)["city_id"].to_numpy()
+    rng = np.random.default_rng(SEED)
+    num_events = 0
+    start = time.perf_counter()
+    for batch in range(1, NUM_BATCHES + 1):
+        batch_path = OUTPUT_PATH / f"{batch:04d}"
+        batch_path.mkdir(parents=True, exist_ok=True)
+        persons_df = state.new_persons(rng, NUM_PERSONS)
+        lives_in = rng.choice(city_ids, NUM_PERSONS)
+        unfollowed = state.unfollows(rng, NUM_UNFOLLOWS)
+        followed = state.new_follows(rng, NUM_FOLLOWS, persons_df["id"].to_numpy())
+        movers, new_cities = state.relocations(rng, NUM_RELOCATIONS, city_ids)
+
+        persons_df = persons_df.select(state.persons_df.columns)
+        write_parquet(persons_df, batch_path / "persons.parquet", WRITER_CONFIG)
+        write_edges(batch_path / "lives_in.parquet", persons_df["id"].to_numpy(), lives_in)
+        write_edges(batch_path / "unfollows.parquet", *split_keys(state.edges[unfollowed]))
+        write_edges(batch_path / "follows.parquet", *split_keys(followed))
+        write_edges(batch_path / "relocations.parquet", state.city_person_ids[movers], new_cities)
+        # Persons join after the relocations are drawn, so that only existing persons move
+        state.apply(persons_df, lives_in, unfollowed, followed, movers, new_cities)
+        num_events += len(persons_df) + len(unfollowed) + len(followed) + len(movers)
+        print(
+            f"Batch {batch}: {len(persons_df)} persons, {len(followed)} follows, "
+            f"{len(unfollowed)} unfollows, {len(movers)} relocations"
+        )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Wrote {NUM_BATCHES} delta batches to {OUTPUT_PATH} in {elapsed:.2f}s "
+        f"({num_events / elapsed:,.0f} events/s), ending at {len(state.edges)} follows"
+    )
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", "-b", type=int, default=10, help="Number of delta batches to generate")
+    parser.add_argument("--persons", type=int, default=100, help="New persons per batch")
+    parser.add_argument("--follows", type=int, default=2000, help="New follows drawn per batch (fewer are kept after dropping duplicates)")
+    parser.add_argument("--unfollows", type=int, default=200, help="Follows deleted per batch")
+    parser.add_argument("--relocations", type=int, default=20, help="Persons moving to a new city per batch")
+    parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", "-o", type=Path, default=Path("output/deltas"), help="Directory to write the batches to")
+    add_parquet_args(parser)
+    args = parser.parse_args()
+    # fmt: on
+
+    NUM_BATCHES = args.batches
+    NUM_PERSONS = args.persons
+    NUM_FOLLOWS = args.follows
+    NUM_UNFOLLOWS = args.unfollows
+    NUM_RELOCATIONS = args.relocations
+    SEED = args.seed
+    OUTPUT_PATH = args.output
+    WRITER_CONFIG = config_from_args(args)
+    NODES_PATH = Path("output/nodes")
+    EDGES_PATH = Path("output/edges")
+
+    with measure(Path(__file__).stem):
+        main()
@@ -4,6 +4,15 @@ Generate edges between persons and their followers (who are also persons in the
 The aim is to scale up the generation of edges based on the number of nodes in the graph,
 while also keeping edges between nodes in a way that's not a uniform distribution.
 In the real world, some people are way more connected than others.
+
+The edge model is selected with `--model`:
+  - `hubs` (default): uniform random pairs, plus a fixed set of super nodes with many followers
+  - `chung-lu`: every person gets a power-law weight, and each edge draws its follower and the
+    person followed independently in proportion to their weights
+  - `pa`: batched preferential attachment, where persons join in batches and follow persons
+    already in the graph in proportion to their number of followers plus an offset
+Both power-law models give in-degrees that follow a power law with the exponent set by
+`--exponent`, and are vectorized to generate 10M+ persons in seconds.
 """
 
 import argparse
@@ -11,6 +20,7 @@ from pathlib import Path
 
 import numpy as np
 import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, read_output, write_output
 
 
 def select_random_ids(df: pl.DataFrame, num: int) -> list[int]:
@@ -84,22 +94,137 @@ def create_super_node_edges(persons_df: pl.DataFrame) -> pl.DataFrame:
     return super_nodes_df
 
 
+# Edges of the power-law models are drawn as int64 keys packing the followed person's ID into the
+# high bits and the follower's ID into the low bits, so sorting the keys sorts by ["to", "from"]
+ID_BITS = 32
+# Edges drawn at a time, to bound the memory of the float temporaries
+CHUNK_SIZE = 10_000_000
+
+
+def power_law_ranks(
+    rng: np.random.Generator, num_nodes: int, exponent: float, size: int
+) -> np.ndarray:
+    """
+    Draw node ranks with probability proportional to (rank + 1) ^ -(1 / (exponent - 1)), which
+    gives the ranks' expected degrees a power-law distribution with the given exponent. Sampled by
+    inverting the CDF of the continuous distribution, so there's no per-node table to search.
+    """
+    if exponent <= 2:
+        raise ValueError("Power-law ranks need an exponent above 2")
+    alpha = 1 / (exponent - 1)
+    low, high = 1.0, (num_nodes + 1.0) ** (1 - alpha)
+    x = (low + rng.random(size) * (high - low)) ** (1 / (1 - alpha)) - 1
+    return np.minimum(x.astype(np.int64), num_nodes - 1)
+
+
+def unique_edge_keys(keys: np.ndarray) -> np.ndarray:
+    """Sorted keys without duplicates or self-connecting edges, sorting `keys` in place"""
+    keys.sort()
+    keep = (keys >> ID_BITS) != (keys & ((1 << ID_BITS) - 1))
+    keep[1:] &= keys[1:] != keys[:-1]
+    return keys[keep]
+
+
+def edges_from_keys(keys: np.ndarray) -> pl.DataFrame:
+    return pl.DataFrame({"from": keys & ((1 << ID_BITS) - 1), "to": keys >> ID_BITS})
+
+
+def get_chung_lu_edges(
+    persons_df: pl.DataFrame, exponent: float, avg_degree: float, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Directed Chung-Lu edges: each person gets an in-weight and an out-weight by their position
+    in two independent random orders, and each edge draws both of its ends by those weights
+    """
+    ids = persons_df["id"].to_numpy().astype(np.int64)
+    followed_order, follower_order = rng.permutation(ids), rng.permutation(ids)
+    keys = np.empty(int(len(ids) * avg_degree), dtype=np.int64)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        size = min(CHUNK_SIZE, len(keys) - start)
+        followed = followed_order[power_law_ranks(rng, len(ids), exponent, size)]
+        followers = follower_order[power_law_ranks(rng, len(ids), exponent, size)]
+        keys[start : start + size] = (followed << ID_BITS) | followers
+    return unique_edge_keys(keys)
+
+
+def get_preferential_attachment_edges(
+    persons_df: pl.DataFrame,
+    exponent: float,
+    avg_degree: float,
+    rng: np.random.Generator,
+    growth: float = 0.05,
+) -> np.ndarray:
+    """
+    Batched preferential attachment (Price's model): persons join in batches that grow the graph
+    by `growth`, and each new person follows `avg_degree` persons already in the graph, each
+    picked with probability proportional to their number of followers plus an offset. The
+    in-degrees then follow a power law with exponent 2 + offset / avg_degree. Within a batch,
+    the follower counts are those from before the batch.
+    """
+    if exponent <= 2:
+        raise ValueError("Preferential attachment needs an exponent above 2")
+    ids = rng.permutation(persons_df["id"].to_numpy().astype(np.int64))
+    num_nodes = len(ids)
+    per_node = max(int(round(avg_degree)), 1)
+    offset = per_node * (exponent - 2)
+    # Start from a small seed graph where everyone follows everyone else once
+    num_seed_nodes = num_joined = min(per_node + 1, num_nodes)
+    seed_sources, seed_targets = np.nonzero(~np.eye(num_seed_nodes, dtype=bool))
+    num_seed_edges = len(seed_targets)
+    # Followed person of every edge, as a position in the joining order. Every later person
+    # follows `per_node` persons, so an edge's follower is implied by its position
+    targets = np.empty(num_seed_edges + (num_nodes - num_joined) * per_node, dtype=np.int32)
+    targets[:num_seed_edges] = seed_targets
+    num_edges = num_seed_edges
+    while num_joined < num_nodes:
+        batch = min(max(int(num_joined * growth), 1), num_nodes - num_joined)
+        size = batch * per_node
+        # The target of a random edge is a person drawn by follower count; a uniformly drawn
+        # person covers the offset
+        from_edge = rng.random(size) < num_edges / (num_edges + offset * num_joined)
+        targets[num_edges : num_edges + size] = np.where(
+            from_edge,
+            targets[rng.integers(0, max(num_edges, 1), size)],
+            rng.integers(0, num_joined, size),
+        )
+        num_edges += size
+        num_joined += batch
+    keys = np.empty(len(targets), dtype=np.int64)
+    keys[:num_seed_edges] = (ids[seed_targets] << ID_BITS) | ids[seed_sources]
+    for start in range(num_seed_edges, len(keys), CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, len(keys))
+        sources = np.arange(start - num_seed_edges, end - num_seed_edges) // per_node
+        keys[start:end] = (ids[targets[start:end]] << ID_BITS) | ids[sources + num_seed_nodes]
+    return unique_edge_keys(keys)
+
+
 def main() -> None:
-    persons_df = pl.read_parquet(NODES_PATH / "persons.parquet")
+    persons_df = read_output(NODES_PATH / "persons.parquet", WRITER_CONFIG)
     np.random.seed(SEED)
-    edges_df = get_initial_person_edges(persons_df)
-    # Generate edges from super nodes
-    super_node_edges_df = create_super_node_edges(persons_df)
-    # Concatenate edges from original edges_df and super_node_edges_df
-    edges_df = (pl.concat([edges_df, super_node_edges_df]).unique().sort(["to", "from"])).select(
-        "from", "to"
-    )
+    if MODEL == "hubs":
+        edges_df = get_initial_person_edges(persons_df)
+        # Generate edges from super nodes
+        super_node_edges_df = create_super_node_edges(persons_df)
+        # Concatenate edges from original edges_df and super_node_edges_df
+        edges_df = (
+            pl.concat([edges_df, super_node_edges_df]).unique().sort(["to", "from"])
+        ).select("from", "to")
+    else:
+        if persons_df["id"].max() >= 1 << ID_BITS:
+            raise ValueError(f"Person IDs must fit in {ID_BITS} bits for the {MODEL} model")
+        rng = np.random.default_rng(SEED)
+        if MODEL == "chung-lu":
+            keys = get_chung_lu_edges(persons_df, EXPONENT, AVG_DEGREE, rng)
+        else:
+            keys = get_preferential_attachment_edges(persons_df, EXPONENT, AVG_DEGREE, rng)
+        print(f"Generated {len(keys)} edges with the {MODEL} model, exponent {EXPONENT}")
+        edges_df = edges_from_keys(keys)
     # Limit the number of edges
     if NUM < len(edges_df):
         edges_df = edges_df.head(NUM)
         print(f"Limiting edges to {NUM} per the `--num` argument")
     # Write nodes
-    edges_df.write_parquet(Path("output/edges") / "follows.parquet")
+    write_output(edges_df, Path("output/edges") / "follows.parquet", WRITER_CONFIG)
     print(f"Wrote {len(edges_df)} edges for {len(persons_df)} persons")
 
 
@@ -108,15 +233,26 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--num", "-n", type=int, default=int(1E9), help="Number of edges to limit the result to")
     parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    parser.add_argument("--model", "-m", type=str, default="hubs", choices=["hubs", "chung-lu", "pa"], help="Edge model: uniform pairs plus super nodes, Chung-Lu, or batched preferential attachment")
+    parser.add_argument("--exponent", type=float, default=2.5, help="Power-law exponent of the in-degrees (chung-lu and pa models, must be above 2)")
+    parser.add_argument("--avg_degree", type=float, default=10.0, help="Edges per person before removing duplicates (chung-lu and pa models)")
+    add_parquet_args(parser)
     args = parser.parse_args()
     # fmt: on
+    if args.model != "hubs" and args.exponent <= 2:
+        parser.error(f"--exponent must be above 2 for the {args.model} model, got {args.exponent}")
 
     SEED = args.seed
     NUM = args.num
+    MODEL = args.model
+    EXPONENT = args.exponent
+    AVG_DEGREE = args.avg_degree
+    WRITER_CONFIG = config_from_args(args)
     NODES_PATH = Path("output/nodes")
     # Create output dir
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
     # Ensure that a global seed is set prior to running main
     np.random.seed(SEED)
-    main()
+    with measure(Path(__file__).stem):
+        main()
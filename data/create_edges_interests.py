@@ -7,6 +7,7 @@ from pathlib import Path
 
 import numpy as np
 import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, read_output, write_output
 
 
 def select_random_ids(df: pl.DataFrame, colname: str, num: int) -> list[int]:
@@ -16,11 +17,11 @@ def select_random_ids(df: pl.DataFrame, colname: str, num: int) -> list[int]:
 
 
 def main() -> None:
-    interests_df = pl.read_parquet(Path(NODES_PATH) / "interests.parquet").rename(
+    interests_df = read_output(Path(NODES_PATH) / "interests.parquet", WRITER_CONFIG).rename(
         {"id": "interest_id"}
     )
     # Read in person IDs
-    persons_df = pl.read_parquet(NODES_PATH / "persons.parquet").select("id")
+    persons_df = read_output(NODES_PATH / "persons.parquet", WRITER_CONFIG).select("id")
     # Set a lower and upper bound on the number of interests per person
     lower_bound, upper_bound = 1, 5
     # Add a column with a random number of interests per person
@@ -55,7 +56,7 @@ def main() -> None:
         print(f"Limiting edges to {NUM} per the `--num` argument")
     # Write nodes
     edges_df = edges_df.rename({"id": "from", "interests": "to"})
-    edges_df.write_parquet(Path("output/edges") / "interested_in.parquet")
+    write_output(edges_df, Path("output/edges") / "interested_in.parquet", WRITER_CONFIG)
     print(f"Wrote {len(edges_df)} edges for {len(persons_df)} persons")
 
 
@@ -64,15 +65,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--num", "-n", type=int, default=int(1E9), help="Number of edges to limit the result to")
     parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    add_parquet_args(parser)
     args = parser.parse_args()
     # fmt: on
 
     SEED = args.seed
     NUM = args.num
+    WRITER_CONFIG = config_from_args(args)
     NODES_PATH = Path("output/nodes")
     # Create output dir
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
     # Ensure that a global seed is set prior to running main
     np.random.seed(SEED)
-    main()
+    with measure(Path(__file__).stem):
+        main()
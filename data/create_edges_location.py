@@ -7,21 +7,29 @@ from pathlib import Path
 
 import numpy as np
 import polars as pl
+from parquet_writer import (
+    ParquetWriterConfig,
+    add_parquet_args,
+    config_from_args,
+    measure,
+    read_output,
+    write_output,
+)
 
 
-def get_persons_df(filepath: Path) -> pl.DataFrame:
+def get_persons_df(filepath: Path, config: ParquetWriterConfig) -> pl.DataFrame:
     # Read in persons data
-    persons_df = pl.read_parquet(filepath).select("id")
+    persons_df = read_output(filepath, config).select("id")
     return persons_df
 
 
-def get_cities_df(filepath: Path) -> pl.DataFrame:
+def get_cities_df(filepath: Path, config: ParquetWriterConfig) -> pl.DataFrame:
     """
     Get only cities with a population of > 1M
     """
     # Read in cities data and rename the ID column to avoid conflicts
     residence_loc_df = (
-        pl.read_parquet(filepath)
+        read_output(filepath, config)
         .filter(pl.col("population") >= 1_000_000)
         .rename({"id": "city_id"})
     )
@@ -30,8 +38,8 @@ def get_cities_df(filepath: Path) -> pl.DataFrame:
 
 def main() -> None:
     np.random.seed(SEED)
-    persons_df = get_persons_df(NODES_PATH / "persons.parquet")
-    residence_loc_df = get_cities_df(NODES_PATH / "cities.parquet")
+    persons_df = get_persons_df(NODES_PATH / "persons.parquet", WRITER_CONFIG)
+    residence_loc_df = get_cities_df(NODES_PATH / "cities.parquet", WRITER_CONFIG)
     # Randomly pick a city ID from the list of all cities with population > 1M
     city_ids = np.random.choice(residence_loc_df["city_id"], size=len(persons_df), replace=True)
     # Obtain top 5 most common cities name via a join
@@ -51,9 +59,8 @@ def main() -> None:
         edges_df = edges_df.head(NUM)
         print(f"Limiting edges to {NUM} per the `--num` argument")
     # Write nodes
-    edges_df = edges_df.rename({"city_id": "to", "id": "from"}).write_parquet(
-        Path("output/edges") / "lives_in.parquet",
-    )
+    edges_df = edges_df.rename({"city_id": "to", "id": "from"})
+    write_output(edges_df, Path("output/edges") / "lives_in.parquet", WRITER_CONFIG)
     print(f"Generated residence cities for persons. Top 5 common cities are: {', '.join(top_5)}")
 
 
@@ -62,15 +69,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--num", "-n", type=int, default=int(1E9), help="Number of edges to limit the result to")
     parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    add_parquet_args(parser)
     args = parser.parse_args()
     # fmt: on
 
     SEED = args.seed
     NUM = args.num
+    WRITER_CONFIG = config_from_args(args)
     NODES_PATH = Path("output/nodes")
     # Create output dir
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
     # Ensure that a global seed is set prior to running main
     np.random.seed(SEED)
-    main()
+    with measure(Path(__file__).stem):
+        main()
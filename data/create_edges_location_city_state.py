@@ -2,21 +2,22 @@
 Generate edges between cities and the states to which they belong
 """
 
+import argparse
 from pathlib import Path
 
-import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, read_output, write_output
 
 
 def main() -> None:
     # Read data from cities file
     cities_df = (
-        pl.read_parquet(NODES_PATH / "cities.parquet")
+        read_output(NODES_PATH / "cities.parquet", WRITER_CONFIG)
         .rename({"id": "city_id"})
         .select(["city_id", "city", "state"])
     )
     # Read in states from file
     states_df = (
-        pl.read_parquet(NODES_PATH / "states.parquet")
+        read_output(NODES_PATH / "states.parquet", WRITER_CONFIG)
         .rename({"id": "state_id"})
         .select("state_id", "state")
     )
@@ -27,13 +28,19 @@ def main() -> None:
         .rename({"city_id": "from", "state_id": "to"})
     )
     # Write nodes
-    edges_df.write_parquet(Path("output/edges") / "city_in.parquet")
+    write_output(edges_df, Path("output/edges") / "city_in.parquet", WRITER_CONFIG)
     print(f"Wrote {len(edges_df)} edges for {len(cities_df)} cities")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_parquet_args(parser)
+    args = parser.parse_args()
+
+    WRITER_CONFIG = config_from_args(args)
     NODES_PATH = Path("output/nodes")
     # Create output dir
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
-    main()
+    with measure(Path(__file__).stem):
+        main()
@@ -2,20 +2,23 @@
 Generate edges between states and the countries to which they belong
 """
 
+import argparse
 from pathlib import Path
 
-import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, read_output, write_output
 
 
 def main() -> None:
     # Read in states from file
     states_df = (
-        pl.read_parquet(NODES_PATH / "states.parquet")
+        read_output(NODES_PATH / "states.parquet", WRITER_CONFIG)
         .rename({"id": "state_id"})
         .select("state_id", "state", "country")
     )
     # Read data from countries file
-    countries_df = pl.read_parquet(NODES_PATH / "countries.parquet").rename({"id": "country_id"})
+    countries_df = read_output(NODES_PATH / "countries.parquet", WRITER_CONFIG).rename(
+        {"id": "country_id"}
+    )
     # Join city and state dataframes on name
     edges_df = (
         countries_df.join(states_df, on="country", how="left")
@@ -23,13 +26,19 @@ def main() -> None:
         .rename({"state_id": "from", "country_id": "to"})
     )
     # Write nodes
-    edges_df.write_parquet(Path("output/edges") / "state_in.parquet")
+    write_output(edges_df, Path("output/edges") / "state_in.parquet", WRITER_CONFIG)
     print(f"Wrote {len(edges_df)} edges for {len(states_df)} states")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_parquet_args(parser)
+    args = parser.parse_args()
+
+    WRITER_CONFIG = config_from_args(args)
     NODES_PATH = Path("output/nodes")
     # Create output dir
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
-    main()
+    with measure(Path(__file__).stem):
+        main()
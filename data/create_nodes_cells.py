@@ -0,0 +1,55 @@
+"""
+Assign cities to the cells of a latitude/longitude grid, for geospatial queries that prune by cell
+
+Writes the grid cells that hold at least one city as nodes, and the cell of each city as a
+`from` (city) / `to` (cell) edge list, which serves as both the cell column of the cities and
+the cell -> city lookup table.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, read_output, write_output
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from workload.geo import DEFAULT_CELL_SIZE, cell_bounds, grid_cells  # noqa: E402
+from workload.instrument import measure  # noqa: E402
+
+
+def main() -> None:
+    cities_df = read_output(NODES_PATH / "cities.parquet", WRITER_CONFIG).select("id", "lat", "lng")
+    cells = grid_cells(cities_df["lat"].to_numpy(), cities_df["lng"].to_numpy(), CELL_SIZE)
+    edges_df = pl.DataFrame({"from": cities_df["id"], "to": cells})
+    cells_df = edges_df.group_by("to").len("num_cities").rename({"to": "id"}).sort("id")
+    lat_min, lon_min = cell_bounds(cells_df["id"].to_numpy(), CELL_SIZE)
+    cells_df = cells_df.select(
+        "id",
+        pl.Series("lat_min", lat_min, dtype=pl.Float64),
+        pl.Series("lon_min", lon_min, dtype=pl.Float64),
+        pl.lit(CELL_SIZE, dtype=pl.Float64).alias("size"),
+        pl.col("num_cities").cast(pl.Int64),
+    )
+    write_output(cells_df, Path("output/nodes") / "cells.parquet", WRITER_CONFIG)
+    write_output(edges_df, Path("output/edges") / "city_in_cell.parquet", WRITER_CONFIG)
+    print(f"Wrote {len(cells_df)} cells of {CELL_SIZE} degrees for {len(cities_df)} cities")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cell_size", type=float, default=DEFAULT_CELL_SIZE, help="Size of the grid cells, in degrees")
+    add_parquet_args(parser)
+    args = parser.parse_args()
+    # fmt: on
+
+    CELL_SIZE = args.cell_size
+    WRITER_CONFIG = config_from_args(args)
+    NODES_PATH = Path("output/nodes")
+    # Create output dirs
+    Path("output/nodes").mkdir(parents=True, exist_ok=True)
+    Path("output/edges").mkdir(parents=True, exist_ok=True)
+
+    with measure(Path(__file__).stem):
+        main()
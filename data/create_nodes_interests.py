@@ -3,9 +3,11 @@ Generate nodes for a person's interests
 These are activities or hobbies person in the real world might have
 """
 
+import argparse
 from pathlib import Path
 
 import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, write_output
 
 
 def main(filename: str) -> pl.DataFrame:
@@ -19,12 +21,20 @@ def main(filename: str) -> pl.DataFrame:
     ids = list(range(1, len(interests_df) + 1))
     interests_df = interests_df.with_columns(pl.Series(ids).alias("id"))
     # Write to csv
-    interests_df.select(pl.col("id"), pl.all().exclude("id")).write_parquet(
+    write_output(
+        interests_df.select(pl.col("id"), pl.all().exclude("id")),
         Path("output/nodes") / "interests.parquet",
+        WRITER_CONFIG,
     )
     print(f"Wrote {interests_df.shape[0]} interests nodes to parquet")
     return interests
 
 
 if __name__ == "__main__":
-    main("raw/interests.csv")
+    parser = argparse.ArgumentParser()
+    add_parquet_args(parser)
+    args = parser.parse_args()
+
+    WRITER_CONFIG = config_from_args(args)
+    with measure(Path(__file__).stem):
+        main("raw/interests.csv")
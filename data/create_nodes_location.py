@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Any
 
 import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, write_output
 
 City = dict[str, Any]
 
@@ -58,8 +59,10 @@ def write_city_nodes(cities_of_interest: pl.DataFrame) -> pl.DataFrame:
     ids = list(range(1, len(city_nodes) + 1))
     city_nodes = city_nodes.with_columns(pl.Series(ids).alias("id"))
     # Write to csv
-    city_nodes.select(pl.col("id"), pl.all().exclude("id")).write_parquet(
+    write_output(
+        city_nodes.select(pl.col("id"), pl.all().exclude("id")),
         Path("output/nodes") / "cities.parquet",
+        WRITER_CONFIG,
     )
     print(f"Wrote {city_nodes.shape[0]} cities to parquet")
     return city_nodes
@@ -72,9 +75,10 @@ def write_state_nodes(city_nodes: pl.DataFrame) -> None:
     ids = list(range(1, len(state_nodes) + 1))
     state_nodes = state_nodes.with_columns(pl.Series(ids).alias("id"))
     # Write to csv
-    state_nodes.select(pl.col("id"), pl.all().exclude("id")).write_parquet(
+    write_output(
+        state_nodes.select(pl.col("id"), pl.all().exclude("id")),
         Path("output/nodes") / "states.parquet",
-        compression="snappy",
+        WRITER_CONFIG,
     )
     print(f"Wrote {state_nodes.shape[0]} states to parquet")
 
@@ -86,9 +90,10 @@ def write_country_nodes(city_nodes: pl.DataFrame) -> None:
     ids = list(range(1, len(country_nodes) + 1))
     country_nodes = country_nodes.with_columns(pl.Series(ids).alias("id"))
     # Write to csv
-    country_nodes.select(pl.col("id"), pl.all().exclude("id")).write_parquet(
+    write_output(
+        country_nodes.select(pl.col("id"), pl.all().exclude("id")),
         Path("output/nodes") / "countries.parquet",
-        compression="snappy",
+        WRITER_CONFIG,
     )
     print(f"Wrote {country_nodes.shape[0]} countries to parquet")
 
@@ -112,14 +117,17 @@ if __name__ == "__main__":
     parser.add_argument("--input_file", type=str, default="raw/worldcities.csv", help="Input file for raw location info")
     parser.add_argument("--num", "-n", type=int, default=10_000, help="Limit the number of locations to generate")
     parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    add_parquet_args(parser)
     args = parser.parse_args()
     # fmt: on
 
     SEED = args.seed
     NUM = args.num
+    WRITER_CONFIG = config_from_args(args)
     INPUT_FILE = args.input_file
     # Create output dirs
     Path("output/nodes").mkdir(parents=True, exist_ok=True)
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
-    main(INPUT_FILE)
+    with measure(Path(__file__).stem):
+        main(INPUT_FILE)
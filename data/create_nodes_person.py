@@ -10,6 +10,7 @@ from pathlib import Path
 from typing import Any
 
 import polars as pl
+from parquet_writer import add_parquet_args, config_from_args, measure, write_output
 from faker import Faker
 
 Profile = dict[str, Any]
@@ -61,8 +62,10 @@ def main() -> None:
     # Create person dataframe
     persons_df = create_person_df(female_profiles, male_profiles)
     # Write nodes
-    persons_df.select(pl.col("id"), pl.all().exclude("id")).write_parquet(
+    write_output(
+        persons_df.select(pl.col("id"), pl.all().exclude("id")),
         Path("output/nodes") / "persons.parquet",
+        WRITER_CONFIG,
     )
     print(f"Wrote {persons_df.shape[0]} person nodes to parquet")
 
@@ -72,11 +75,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--num", "-n", type=int, default=10_000, help="Number of fake profiles to generate")
     parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    add_parquet_args(parser)
     args = parser.parse_args()
     # fmt: on
 
     SEED = args.seed
     NUM = args.num
+    WRITER_CONFIG = config_from_args(args)
     # Create faker object
     Faker.seed(SEED)
     fake = Faker()
@@ -84,4 +89,5 @@ if __name__ == "__main__":
     Path("output/nodes").mkdir(parents=True, exist_ok=True)
     Path("output/edges").mkdir(parents=True, exist_ok=True)
 
-    main()
+    with measure(Path(__file__).stem):
+        main()
@@ -0,0 +1,50 @@
+"""
+Write the parquet files for the database loaders from the Arrow IPC files that the generator
+scripts write with `--output_format ipc`.
+
+Each `output/{nodes,edges}/<name>.arrow` is read memory-mapped and written to `<name>.parquet` next
+to it with the parquet writer settings, so the result is the same as generating parquet directly.
+"""
+
+import argparse
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from parquet_writer import (
+    IPC_SUFFIX,
+    add_parquet_args,
+    config_from_args,
+    measure,
+    read_output,
+    write_output,
+)
+
+
+def main() -> None:
+    paths = FILES or sorted(
+        path.with_suffix(".parquet")
+        for output_path in (Path("output/nodes"), Path("output/edges"))
+        for path in output_path.glob(f"*{IPC_SUFFIX}")
+    )
+    start = time.perf_counter()
+    for path in paths:
+        df = read_output(path, replace(WRITER_CONFIG, output_format="ipc"))
+        write_output(df, path, replace(WRITER_CONFIG, output_format="parquet"))
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(paths)} parquet files from Arrow IPC in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=Path, nargs="+", default=None, help="Parquet files to write, e.g. output/nodes/persons.parquet (default: one for every IPC file in output)")
+    add_parquet_args(parser)
+    args = parser.parse_args()
+    # fmt: on
+
+    FILES = args.files
+    WRITER_CONFIG = config_from_args(args)
+
+    with measure(Path(__file__).stem):
+        main()
@@ -0,0 +1,92 @@
+"""
+Shared parquet writer settings for the data generation scripts.
+
+Kùzu's COPY parallelizes over parquet row groups, so the row group size of the larger files
+(persons and follows) directly limits how many threads can take part in ingestion. Every
+generator script writes its output via `write_output` so that compression and row group
+sizing can be tuned in a single place, or swept from the command line.
+
+With `--output_format ipc`, the scripts write uncompressed Arrow IPC (Feather) files instead, next
+to where the parquet files would be, and read each other's output memory-mapped through
+`read_output`. This skips the encoding and compression work for files that are only read by the
+next script; `ipc_to_parquet.py` then writes the parquet files that the databases load.
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# Also imported from here by the generator scripts, which are run from this directory
+from workload.instrument import measure  # noqa: E402
+
+COMPRESSION_CODECS = ("uncompressed", "snappy", "gzip", "lz4", "zstd", "brotli")
+OUTPUT_FORMATS = ("parquet", "ipc")
+IPC_SUFFIX = ".arrow"
+
+
+@dataclass(frozen=True)
+class ParquetWriterConfig:
+    compression: str = "zstd"
+    compression_level: int | None = None
+    # Small enough that Kùzu gets several row groups per thread on the edge files
+    row_group_size: int | None = 100_000
+    statistics: bool = True
+    output_format: str = "parquet"
+
+
+def add_parquet_args(parser: argparse.ArgumentParser) -> None:
+    """Add the parquet writer options to a generator script's argument parser"""
+    # fmt: off
+    defaults = ParquetWriterConfig()
+    parser.add_argument("--compression", type=str, default=defaults.compression, choices=COMPRESSION_CODECS, help="Parquet compression codec")
+    parser.add_argument("--compression_level", type=int, default=defaults.compression_level, help="Compression level (codec-specific)")
+    parser.add_argument("--row_group_size", type=int, default=defaults.row_group_size, help="Max number of rows per parquet row group")
+    parser.add_argument("--no_statistics", action="store_true", help="Do not write column statistics")
+    parser.add_argument("--output_format", type=str, default=defaults.output_format, choices=OUTPUT_FORMATS, help="Write parquet, or uncompressed Arrow IPC for intermediate files")
+    # fmt: on
+
+
+def config_from_args(args: argparse.Namespace) -> ParquetWriterConfig:
+    return ParquetWriterConfig(
+        compression=args.compression,
+        compression_level=args.compression_level,
+        row_group_size=args.row_group_size,
+        statistics=not args.no_statistics,
+        output_format=args.output_format,
+    )
+
+
+def output_path(path: Path, config: ParquetWriterConfig) -> Path:
+    """Where the file named `path` (a `.parquet` path) is written in the configured format"""
+    return path.with_suffix(IPC_SUFFIX) if config.output_format == "ipc" else path
+
+
+def write_parquet(df: pl.DataFrame, path: Path, config: ParquetWriterConfig) -> None:
+    df.write_parquet(
+        path,
+        compression=config.compression,
+        compression_level=config.compression_level,
+        row_group_size=config.row_group_size,
+        statistics=config.statistics,
+    )
+
+
+def write_output(df: pl.DataFrame, path: Path, config: ParquetWriterConfig) -> None:
+    with measure("write", file=path.name, format=config.output_format, rows=len(df)):
+        if config.output_format == "ipc":
+            # Uncompressed, so that readers can map the columns without decoding them
+            df.write_ipc(output_path(path, config), compression="uncompressed")
+        else:
+            write_parquet(df, path, config)
+
+
+def read_output(path: Path, config: ParquetWriterConfig) -> pl.DataFrame:
+    """Read a file written by `write_output` with the same config"""
+    with measure("read", file=path.name, format=config.output_format):
+        if config.output_format == "ipc":
+            return pl.read_ipc(output_path(path, config), memory_map=True)
+        return pl.read_parquet(path)
@@ -0,0 +1,275 @@
+"""
+Run the data generation scripts in order, skipping those whose output is already up to date.
+
+Each stage's cache key is hashed from its script (and the local modules it imports), its
+command-line arguments and the content of the files it reads, and `output/manifest.json` records
+the key and the content hashes of the files it wrote (see `workload/build_cache.py`). A stage is
+rerun when any of these changed or its outputs are missing or were modified. Since the keys depend
+on the content of the inputs rather than on whether they were regenerated, a stage that reruns but
+writes identical files does not invalidate the stages after it.
+
+With `--output_format ipc`, the scripts pass their intermediate files to each other as
+uncompressed Arrow IPC, read memory-mapped, and a last stage writes the parquet files for the
+database loaders (see `parquet_writer.py`). `--compare_formats` reruns every stage in both formats
+and reports the time of each stage side by side.
+
+    python pipeline.py -n 1000
+    python pipeline.py -n 1000 --compression snappy  # other arguments are passed to every script
+    python pipeline.py -n 1000 --model chung-lu --exponent 2.2  # except a stage's own `options`
+    python pipeline.py -n 100000 --compare_formats
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+import polars as pl
+from parquet_writer import IPC_SUFFIX, OUTPUT_FORMATS
+
+DATA_PATH = Path(__file__).resolve().parent
+sys.path.append(str(DATA_PATH.parent))
+from workload.build_cache import BuildManifest, cache_key, source_digest  # noqa: E402
+
+MANIFEST_PATH = DATA_PATH / "output" / "manifest.json"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    script: str
+    # Files read and written, relative to the data directory
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+    # Whether the script takes the number of persons and the random seed
+    takes_num: bool = False
+    takes_seed: bool = False
+    # Options of the script's own, which pipeline.py accepts and passes to this script only
+    options: list[str] = field(default_factory=list)
+
+
+# In the order of `generate_data.sh`, which runs every stage after the ones it reads from
+STAGES = [
+    Stage(
+        "persons",
+        "create_nodes_person.py",
+        outputs=["output/nodes/persons.parquet"],
+        takes_num=True,
+        takes_seed=True,
+    ),
+    Stage(
+        "locations",
+        "create_nodes_location.py",
+        inputs=["raw/worldcities.csv"],
+        outputs=[
+            "output/nodes/cities.parquet",
+            "output/nodes/states.parquet",
+            "output/nodes/countries.parquet",
+        ],
+    ),
+    Stage(
+        "interests",
+        "create_nodes_interests.py",
+        inputs=["raw/interests.csv"],
+        outputs=["output/nodes/interests.parquet"],
+    ),
+    Stage(
+        "cells",
+        "create_nodes_cells.py",
+        inputs=["output/nodes/cities.parquet"],
+        outputs=["output/nodes/cells.parquet", "output/edges/city_in_cell.parquet"],
+    ),
+    Stage(
+        "follows",
+        "create_edges_follows.py",
+        inputs=["output/nodes/persons.parquet"],
+        outputs=["output/edges/follows.parquet"],
+        takes_seed=True,
+        options=["--model", "--exponent", "--avg_degree"],
+    ),
+    Stage(
+        "lives_in",
+        "create_edges_location.py",
+        inputs=["output/nodes/persons.parquet", "output/nodes/cities.parquet"],
+        outputs=["output/edges/lives_in.parquet"],
+        takes_seed=True,
+    ),
+    Stage(
+        "interested_in",
+        "create_edges_interests.py",
+        inputs=["output/nodes/persons.parquet", "output/nodes/interests.parquet"],
+        outputs=["output/edges/interested_in.parquet"],
+        takes_seed=True,
+    ),
+    Stage(
+        "city_in",
+        "create_edges_location_city_state.py",
+        inputs=["output/nodes/cities.parquet", "output/nodes/states.parquet"],
+        outputs=["output/edges/city_in.parquet"],
+    ),
+    Stage(
+        "state_in",
+        "create_edges_location_state_country.py",
+        inputs=["output/nodes/states.parquet", "output/nodes/countries.parquet"],
+        outputs=["output/edges/state_in.parquet"],
+    ),
+]
+
+
+def stages_in_format(stages: list[Stage], output_format: str) -> list[Stage]:
+    """
+    The stages with the paths of their generated files in the given format, followed by a stage
+    that writes the parquet files from the IPC files if the format is not parquet
+    """
+    if output_format == "parquet":
+        return stages
+
+    def ipc_paths(paths: list[str]) -> list[str]:
+        return [
+            str(Path(path).with_suffix(IPC_SUFFIX)) if path.startswith("output/") else path
+            for path in paths
+        ]
+
+    to_parquet = Stage(
+        "to_parquet",
+        "ipc_to_parquet.py",
+        inputs=ipc_paths([path for stage in stages for path in stage.outputs]),
+        outputs=[path for stage in stages for path in stage.outputs],
+    )
+    ipc_stages = [
+        replace(stage, inputs=ipc_paths(stage.inputs), outputs=ipc_paths(stage.outputs))
+        for stage in stages
+    ]
+    return [*ipc_stages, to_parquet]
+
+
+def stage_args(
+    stage: Stage, num: int, seed: int, extra_args: list[str], stage_options: dict[str, str]
+) -> list[str]:
+    args = list(extra_args)
+    for option in stage.options:
+        if option in stage_options:
+            args += [option, stage_options[option]]
+    if stage.takes_num:
+        args = ["--num", str(num), *args]
+    if stage.takes_seed:
+        args = ["--seed", str(seed), *args]
+    if stage.name == "to_parquet":
+        args = ["--files", *stage.outputs, *args]
+    return args
+
+
+def stage_key(stage: Stage, args: list[str], manifest: BuildManifest) -> str:
+    return cache_key(
+        script=source_digest(DATA_PATH / stage.script),
+        args=args,
+        inputs=manifest.input_digests([DATA_PATH / path for path in stage.inputs]),
+    )
+
+
+def run_stages(
+    stages: list[Stage],
+    num: int,
+    seed: int,
+    extra_args: list[str],
+    stage_options: dict[str, str],
+    manifest: BuildManifest,
+    force: bool = False,
+) -> pl.DataFrame:
+    """Run the stages that are not current, returning the status and seconds of each stage"""
+    results = []
+    for stage in stages:
+        start = time.perf_counter()
+        args = stage_args(stage, num, seed, extra_args, stage_options)
+        key = stage_key(stage, args, manifest)
+        if not force and manifest.is_current(stage.name, key):
+            status = "cached"
+        else:
+            # Forget the stage first, so a failed run is never mistaken for a current one
+            manifest.invalidate(stage.name)
+            subprocess.run([sys.executable, stage.script, *args], cwd=DATA_PATH, check=True)
+            manifest.record(stage.name, key, [DATA_PATH / path for path in stage.outputs])
+            status = "ran"
+        results.append(
+            {"stage": stage.name, "status": status, "seconds": time.perf_counter() - start}
+        )
+    return pl.DataFrame(results)
+
+
+def run_pipeline(
+    stages: list[Stage], output_format: str, manifest: BuildManifest, force: bool
+) -> pl.DataFrame:
+    extra_args = EXTRA_ARGS
+    if output_format != "parquet":
+        extra_args = [*extra_args, "--output_format", output_format]
+    stages = stages_in_format(stages, output_format)
+    return run_stages(stages, NUM, SEED, extra_args, STAGE_OPTIONS, manifest, force=force)
+
+
+def compare_formats(stages: list[Stage], manifest: BuildManifest) -> pl.DataFrame:
+    """Seconds of each stage when rerunning all of them with parquet and with IPC intermediates"""
+    timings = [
+        run_pipeline(stages, output_format, manifest, force=True)
+        .select("stage", pl.col("seconds").alias(f"{output_format}_s"))
+        for output_format in ("parquet", "ipc")
+    ]
+    # The IPC run has the same stages in the same order, plus the conversion to parquet
+    comparison = timings[1].join(timings[0], on="stage", how="left").select(
+        "stage", "parquet_s", "ipc_s"
+    )
+    comparison = pl.concat([comparison, comparison.sum().with_columns(stage=pl.lit("total"))])
+    return comparison.with_columns(speedup=pl.col("parquet_s") / pl.col("ipc_s"))
+
+
+def main() -> None:
+    (DATA_PATH / "output" / "nodes").mkdir(parents=True, exist_ok=True)
+    (DATA_PATH / "output" / "edges").mkdir(parents=True, exist_ok=True)
+    manifest = BuildManifest(MANIFEST_PATH, root=DATA_PATH)
+    stages = [stage for stage in STAGES if STAGE_NAMES is None or stage.name in STAGE_NAMES]
+    if COMPARE_FORMATS:
+        comparison = compare_formats(stages, manifest)
+        with pl.Config(tbl_rows=len(comparison)):
+            print(f"Stage times for {NUM} persons, parquet vs. IPC intermediates:\n{comparison}")
+        return
+    results = run_pipeline(stages, OUTPUT_FORMAT, manifest, force=FORCE)
+    num_cached = (results["status"] == "cached").sum()
+    with pl.Config(tbl_rows=len(results)):
+        print(results)
+    print(
+        f"Ran {len(results) - num_cached} stages and skipped {num_cached} up-to-date stages "
+        f"in {results['seconds'].sum():.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Generate the dataset, skipping stages whose inputs are unchanged")
+    parser.add_argument("--num", "-n", type=int, default=1000, help="Number of person profiles to generate")
+    parser.add_argument("--seed", "-s", type=int, default=0, help="Random seed")
+    parser.add_argument("--stages", type=str, nargs="+", default=None, choices=[stage.name for stage in STAGES], help="Stages to run (default: all)")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage, even if it is up to date")
+    parser.add_argument("--output_format", type=str, default="parquet", choices=OUTPUT_FORMATS, help="Format of the files passed between scripts (parquet is always written for the loaders)")
+    parser.add_argument("--compare_formats", action="store_true", help="Rerun every stage with each format and compare the stage times")
+    for stage in STAGES:
+        for option in stage.options:
+            parser.add_argument(option, type=str, default=None, help=f"Passed to {stage.script} only")
+    args, extra_args = parser.parse_known_args()
+    # fmt: on
+
+    NUM = args.num
+    SEED = args.seed
+    STAGE_NAMES = args.stages
+    FORCE = args.force
+    OUTPUT_FORMAT = args.output_format
+    COMPARE_FORMATS = args.compare_formats
+    EXTRA_ARGS = extra_args
+    STAGE_OPTIONS = {
+        option: getattr(args, option.lstrip("-"))
+        for stage in STAGES
+        for option in stage.options
+        if getattr(args, option.lstrip("-")) is not None
+    }
+
+    main()
@@ -6,15 +6,12 @@ cd data
 # Specify number of person profiles (integer) as an argument
 # Default value is 1000
 echo "Generating $1 samples of data";
+# Optional parquet writer settings passed to every script, e.g.
+# PARQUET_ARGS="--compression snappy --row_group_size 65536" bash generate_data.sh 100000
+PARQUET_ARGS=${PARQUET_ARGS-}
 
-# Nodes
-python create_nodes_person.py -n ${1-1000}
-python create_nodes_location.py
-python create_nodes_interests.py
-
-# Edges
-python create_edges_follows.py
-python create_edges_location.py
-python create_edges_interests.py
-python create_edges_location_city_state.py
-python create_edges_location_state_country.py
+# Run every generator script in order through pipeline.py, which skips the scripts whose
+# inputs, arguments and source are unchanged since their last run. To rerun all of them:
+# PIPELINE_ARGS=--force bash generate_data.sh 100000
+PIPELINE_ARGS=${PIPELINE_ARGS-}
+python pipeline.py -n ${1-1000} $PIPELINE_ARGS $PARQUET_ARGS
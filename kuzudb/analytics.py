@@ -0,0 +1,360 @@
+"""
+Whole-graph analytics over the `Follows` graph: PageRank, weakly connected components (WCC) and
+degree centrality, in Kùzu and in NumPy.
+
+Kùzu runs PageRank and WCC with its built-in graph algorithms on a projected graph of `Person`
+nodes and `Follows` edges, where this version of Kùzu has them, and degree centrality as a
+Cypher aggregation. The NumPy comparator iterates over the CSR edge arrays exported from the same
+database (`workload/snapshot.py`), with the same PageRank formulation as Kùzu: no redistribution
+of the rank of persons who follow nobody.
+
+Each run records its wall time, the iterations to converge (which Kùzu doesn't report) and the
+peak RSS above the RSS before it. The top-k persons of each algorithm are then written back to the
+database, into a separate `PersonAnalytics` node table keyed by person ID: `pageRank`,
+`degreeCentrality`, and `componentID` for the members of the k largest components. The `Person`
+table itself is left as `build_graph.py` created it, since COPY into it maps columns by position.
+Projecting a graph and writing the results both need the database opened read-write.
+
+    python analytics.py --top_k 10 --rounds 3
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import kuzu
+import numpy as np
+import polars as pl
+
+import query  # noqa: F401 (adds the repo root to the path)
+from workload.csr import CSR
+from workload.instrument import PeakRss, measure
+from workload.snapshot import export_kuzu
+
+PROJECTED_GRAPH = "follows_graph"
+RESULTS_TABLE = "PersonAnalytics"
+# Kùzu's PageRank defaults
+DAMPING = 0.85
+MAX_ITERATIONS = 20
+TOLERANCE = 1e-7
+
+
+@dataclass(frozen=True)
+class AnalyticsRun:
+    algorithm: str
+    engine: str
+    seconds: float
+    # Iterations to converge, where the engine reports them
+    iterations: int | None
+    # Peak RSS during the run above the RSS before it, if it could be measured
+    peak_rss_mb: float | None
+    # `id` of every person and the algorithm's value for it
+    result: pl.DataFrame
+
+
+def run_algorithm(
+    algorithm: str, engine: str, func: Callable[[], tuple[pl.DataFrame, int | None]]
+) -> AnalyticsRun:
+    with PeakRss() as peak_rss, measure("analytics", algorithm=algorithm, engine=engine):
+        start = time.perf_counter()
+        result, iterations = func()
+        seconds = time.perf_counter() - start
+    return AnalyticsRun(
+        algorithm=algorithm,
+        engine=engine,
+        seconds=seconds,
+        iterations=iterations,
+        peak_rss_mb=peak_rss.delta_mb,
+        result=result,
+    )
+
+
+# --- Kùzu ---
+
+
+class KuzuAnalytics:
+    def __init__(self, conn: kuzu.Connection) -> None:
+        self.conn = conn
+        functions = conn.execute("CALL show_functions() RETURN name").get_as_pl()["name"]
+        self.has_algorithms = {"PAGE_RANK", "WEAKLY_CONNECTED_COMPONENT"} <= set(functions)
+
+    def project(self) -> None:
+        """(Re)create the projected graph that the algorithms run on"""
+        try:
+            self.conn.execute(f"CALL drop_projected_graph('{PROJECTED_GRAPH}')")
+        except RuntimeError:
+            pass
+        self.conn.execute(
+            f"CALL create_projected_graph('{PROJECTED_GRAPH}', ['Person'], ['Follows'])"
+        )
+
+    def page_rank(
+        self,
+        damping: float = DAMPING,
+        max_iterations: int = MAX_ITERATIONS,
+        tolerance: float = TOLERANCE,
+    ) -> pl.DataFrame:
+        # The algorithm's options must be literals, not parameters
+        return self.conn.execute(
+            f"""
+            CALL page_rank('{PROJECTED_GRAPH}', dampingFactor := {float(damping)},
+                           maxIterations := {int(max_iterations)}, tolerance := {float(tolerance)})
+            RETURN node.id AS id, rank AS pageRank
+            ORDER BY id
+            """
+        ).get_as_pl()
+
+    def wcc(self) -> pl.DataFrame:
+        return self.conn.execute(
+            f"""
+            CALL weakly_connected_component('{PROJECTED_GRAPH}')
+            RETURN node.id AS id, group_id AS componentID
+            ORDER BY id
+            """
+        ).get_as_pl()
+
+    def degree_centrality(self) -> pl.DataFrame:
+        degrees = self.conn.execute(
+            """
+            MATCH (p:Person)
+            OPTIONAL MATCH (p)-[:Follows]-(other:Person)
+            RETURN p.id AS id, count(other) AS degree
+            ORDER BY id
+            """
+        ).get_as_pl()
+        return degrees.select("id", normalize_degrees(degrees["degree"]).alias("degreeCentrality"))
+
+    def write_results(self, results: pl.DataFrame) -> None:
+        """Replace the results table with one row per person in `results`, keyed by `id`"""
+        self.conn.execute(f"DROP TABLE IF EXISTS {RESULTS_TABLE}")
+        self.conn.execute(
+            f"""
+            CREATE NODE TABLE
+                {RESULTS_TABLE}(
+                    id INT64,
+                    pageRank DOUBLE,
+                    degreeCentrality DOUBLE,
+                    componentID INT64,
+                    PRIMARY KEY (id)
+                )
+            """
+        )
+        self.conn.execute(
+            f"""
+            UNWIND $rows AS row
+            CREATE (:{RESULTS_TABLE} {{
+                id: row.id, pageRank: row.pageRank, degreeCentrality: row.degreeCentrality,
+                componentID: row.componentID
+            }})
+            """,
+            parameters={"rows": results.to_dicts()},
+        )
+
+
+def normalize_degrees(degrees: pl.Series) -> pl.Series:
+    """Degree centrality: the number of connections over the number of other persons"""
+    return degrees / max(len(degrees) - 1, 1)
+
+
+# --- NumPy comparator ---
+
+
+def page_rank_numpy(
+    follows: CSR,
+    damping: float = DAMPING,
+    max_iterations: int = MAX_ITERATIONS,
+    tolerance: float = TOLERANCE,
+) -> tuple[np.ndarray, int]:
+    """PageRank by power iteration, until the L1 change is below the tolerance"""
+    num_nodes = follows.num_nodes
+    source, target = follows.edges()
+    out_degrees = follows.degrees()
+    ranks = np.full(num_nodes, 1 / num_nodes)
+    for iteration in range(1, max_iterations + 1):
+        shares = np.divide(ranks, out_degrees, out=np.zeros(num_nodes), where=out_degrees > 0)
+        new_ranks = (1 - damping) / num_nodes + damping * np.bincount(
+            target, weights=shares[source], minlength=num_nodes
+        )
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks, iteration
+
+
+def wcc_numpy(follows: CSR) -> tuple[np.ndarray, int]:
+    """
+    Label each node with the lowest index in its component, by propagating the lower label over
+    every edge in both directions and then pointer jumping, until no label changes
+    """
+    source, target = follows.edges()
+    labels = np.arange(follows.num_nodes)
+    iteration = 0
+    while True:
+        iteration += 1
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, target, labels[source])
+        np.minimum.at(new_labels, source, labels[target])
+        new_labels = new_labels[new_labels]
+        if (new_labels == labels).all():
+            return labels, iteration
+        labels = new_labels
+
+
+def degrees_numpy(follows: CSR) -> np.ndarray:
+    return follows.degrees() + np.bincount(follows.neighbors, minlength=follows.num_nodes)
+
+
+def same_partition(a: pl.Series, b: pl.Series) -> bool:
+    """Whether two component labellings group the nodes the same way, whatever the labels"""
+    pairs = pl.DataFrame({"a": a, "b": b}).unique()
+    return pairs["a"].n_unique() == pairs["b"].n_unique() == pairs.height
+
+
+# --- Top-k ---
+
+
+def top_k(result: pl.DataFrame, k: int) -> pl.DataFrame:
+    value = result.columns[1]
+    return result.sort([value, "id"], descending=[True, False]).head(k)
+
+
+def largest_components(result: pl.DataFrame, k: int) -> pl.DataFrame:
+    """Members of the k largest components, labelled by the component's lowest person ID"""
+    components = result.group_by("componentID").agg(
+        pl.len().alias("size"), pl.col("id").min().alias("label")
+    )
+    largest = components.sort(["size", "label"], descending=[True, False]).head(k)
+    return result.join(largest, on="componentID").select("id", pl.col("label").alias("componentID"))
+
+
+def run_analytics(
+    conn: kuzu.Connection, rounds: int = 1
+) -> tuple[list[AnalyticsRun], dict[str, pl.DataFrame]]:
+    """Run every algorithm in each engine, returning all runs and the results to write back"""
+    kuzu_analytics = KuzuAnalytics(conn)
+    graph = export_kuzu(conn)
+    ids = graph.persons["id"]
+    follows = graph.follows
+
+    def numpy_page_rank() -> tuple[pl.DataFrame, int]:
+        ranks, iterations = page_rank_numpy(follows)
+        return pl.DataFrame({"id": ids, "pageRank": ranks}), iterations
+
+    def numpy_wcc() -> tuple[pl.DataFrame, int]:
+        labels, iterations = wcc_numpy(follows)
+        return pl.DataFrame({"id": ids, "componentID": labels}), iterations
+
+    def numpy_degree_centrality() -> tuple[pl.DataFrame, None]:
+        degrees = pl.Series(degrees_numpy(follows))
+        return pl.DataFrame({"id": ids, "degreeCentrality": normalize_degrees(degrees)}), None
+
+    algorithms = {
+        ("degree_centrality", "numpy"): numpy_degree_centrality,
+        ("degree_centrality", "kuzu"): lambda: (kuzu_analytics.degree_centrality(), None),
+        ("page_rank", "numpy"): numpy_page_rank,
+        ("wcc", "numpy"): numpy_wcc,
+    }
+    if kuzu_analytics.has_algorithms:
+        kuzu_analytics.project()
+        algorithms[("page_rank", "kuzu")] = lambda: (kuzu_analytics.page_rank(), None)
+        algorithms[("wcc", "kuzu")] = lambda: (kuzu_analytics.wcc(), None)
+    runs = [
+        run_algorithm(algorithm, engine, func)
+        for (algorithm, engine), func in algorithms.items()
+        for _ in range(rounds)
+    ]
+    # Prefer Kùzu's own results for writing back
+    results = {}
+    for run in runs:
+        if run.algorithm not in results or run.engine == "kuzu":
+            results[run.algorithm] = run.result
+    return runs, results
+
+
+def write_top_k(conn: kuzu.Connection, results: dict[str, pl.DataFrame], k: int) -> None:
+    """Write the top-k of each algorithm, with nulls for persons outside an algorithm's top-k"""
+    top = [
+        top_k(results["page_rank"], k),
+        top_k(results["degree_centrality"], k),
+        largest_components(results["wcc"], k),
+    ]
+    combined = top[0]
+    for frame in top[1:]:
+        combined = combined.join(frame, on="id", how="full", coalesce=True)
+    KuzuAnalytics(conn).write_results(
+        combined.select(
+            "id",
+            pl.col("pageRank").cast(pl.Float64),
+            pl.col("degreeCentrality").cast(pl.Float64),
+            pl.col("componentID").cast(pl.Int64),
+        )
+    )
+
+
+def main(conn: kuzu.Connection) -> None:
+    runs, results = run_analytics(conn, ROUNDS)
+    summary = (
+        pl.DataFrame(
+            [
+                {
+                    "algorithm": run.algorithm,
+                    "engine": run.engine,
+                    "seconds": run.seconds,
+                    "iterations": run.iterations,
+                    "peak_rss_mb": run.peak_rss_mb,
+                }
+                for run in runs
+            ],
+            schema_overrides={"iterations": pl.Int64, "peak_rss_mb": pl.Float64},
+        )
+        .group_by("algorithm", "engine", maintain_order=True)
+        .agg(
+            pl.col("seconds").median().alias("median_s"),
+            pl.col("iterations").max(),
+            pl.col("peak_rss_mb").max(),
+        )
+    )
+    print(f"Analytics over {ROUNDS} rounds each:\n{summary}")
+
+    by_engine = {(run.algorithm, run.engine): run.result for run in runs}
+    if ("page_rank", "kuzu") in by_engine:
+        kuzu_ranks = by_engine[("page_rank", "kuzu")]["pageRank"]
+        numpy_ranks = by_engine[("page_rank", "numpy")]["pageRank"]
+        print(f"PageRank max abs difference: {(kuzu_ranks - numpy_ranks).abs().max():.3g}")
+        kuzu_wcc = by_engine[("wcc", "kuzu")]["componentID"]
+        numpy_wcc = by_engine[("wcc", "numpy")]["componentID"]
+        print(f"WCC partitions agree: {same_partition(kuzu_wcc, numpy_wcc)}")
+    num_components = results["wcc"]["componentID"].n_unique()
+    print(f"{num_components} weakly connected component(s)")
+
+    write_top_k(conn, results, TOP_K)
+    top = conn.execute(
+        f"""
+        MATCH (a:{RESULTS_TABLE}) WHERE a.pageRank IS NOT NULL
+        MATCH (p:Person {{id: a.id}})
+        RETURN p.id AS id, p.name AS name, a.pageRank AS pageRank,
+               a.degreeCentrality AS degreeCentrality
+        ORDER BY pageRank DESC
+        """
+    ).get_as_pl()
+    print(f"Wrote the top {TOP_K} results back to {RESULTS_TABLE}:\n{top}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Run PageRank, WCC and degree centrality in Kùzu and NumPy")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database (opened read-write)")
+    parser.add_argument("--top_k", "-k", type=int, default=10, help="Number of top results to write back")
+    parser.add_argument("--rounds", "-r", type=int, default=3, help="Runs of each algorithm")
+    args = parser.parse_args()
+    # fmt: on
+
+    TOP_K = args.top_k
+    ROUNDS = args.rounds
+    db = kuzu.Database(args.db)
+    # Default num_threads=0 uses as many threads as hardware and utilization allows
+    CONNECTION = kuzu.Connection(db, num_threads=0)
+
+    main(CONNECTION)
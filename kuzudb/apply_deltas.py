@@ -0,0 +1,117 @@
+"""
+Apply the delta batches from `data/create_deltas.py` to an existing Kùzu database, in order, and
+time each step.
+
+New persons are created from `LOAD FROM` with their properties named, rather than with COPY, which
+maps the file's columns to the table's by position and so fails once other properties were added to
+`Person`. Their cities are appended with COPY. The follows, unfollows and relocations refer to
+persons already in the database, so they are read with `LOAD FROM` and matched on person ID: new
+`Follows` edges get the same `weight` as `build_graph.py` gives the initial ones, and a relocation
+deletes the person's `LivesIn` edge before creating the new one.
+
+    python apply_deltas.py --deltas ../data/output/deltas
+"""
+
+import argparse
+from pathlib import Path
+
+import kuzu
+import polars as pl
+from codetiming import Timer
+
+import query  # noqa: F401 (adds the repo root to the path)
+from workload.instrument import measure
+
+# Statements of each step, in the order they are applied, formatted with the batch directory. Each
+# node is looked up in its own MATCH, as Kùzu 0.9 plans a comma-separated pattern of two ID
+# lookups as a join over one of the tables, which is ~30x slower
+STEPS = {
+    "persons": [
+        """
+        LOAD FROM '{batch}/persons.parquet'
+        CREATE (:Person {{
+            id: id, name: name, gender: gender, birthday: birthday, age: age, isMarried: isMarried
+        }})
+        """
+    ],
+    "lives_in": ["COPY LivesIn FROM '{batch}/lives_in.parquet'"],
+    "unfollows": [
+        """
+        LOAD FROM '{batch}/unfollows.parquet'
+        MATCH (a:Person {{id: `from`}})
+        MATCH (a)-[f:Follows]->(b:Person {{id: `to`}})
+        DELETE f
+        """
+    ],
+    "follows": [
+        """
+        LOAD FROM '{batch}/follows.parquet'
+        MATCH (a:Person {{id: `from`}})
+        MATCH (b:Person {{id: `to`}})
+        CREATE (a)-[:Follows {{weight: 1 + abs(a.age - b.age)}}]->(b)
+        """
+    ],
+    "relocations": [
+        """
+        LOAD FROM '{batch}/relocations.parquet'
+        MATCH (p:Person {{id: `from`}})
+        MATCH (p)-[l:LivesIn]->(:City)
+        DELETE l
+        """,
+        """
+        LOAD FROM '{batch}/relocations.parquet'
+        MATCH (p:Person {{id: `from`}})
+        MATCH (c:City {{id: `to`}})
+        CREATE (p)-[:LivesIn]->(c)
+        """,
+    ],
+}
+
+
+def batch_paths(deltas_path: Path, batches: list[int] | None = None) -> list[Path]:
+    """Batch directories in order, all of them unless `batches` are given"""
+    paths = sorted(path for path in deltas_path.iterdir() if path.is_dir() and path.name.isdigit())
+    if batches is not None:
+        paths = [path for path in paths if int(path.name) in batches]
+    return paths
+
+
+def apply_batch(conn: kuzu.Connection, batch_path: Path) -> dict[str, float]:
+    """Apply one batch, returning the seconds spent on each step"""
+    timings = {"batch": int(batch_path.name)}
+    for step, statements in STEPS.items():
+        with (
+            Timer(name=step, logger=None) as timer,
+            measure("delta", batch=timings["batch"], step=step),
+        ):
+            for statement in statements:
+                conn.execute(statement.format(batch=batch_path.resolve()))
+        timings[f"{step}_s"] = timer.last
+    return timings
+
+
+def main(conn: kuzu.Connection) -> None:
+    paths = batch_paths(DELTAS_PATH, BATCHES)
+    if not paths:
+        raise FileNotFoundError(f"No delta batches in {DELTAS_PATH}; run data/create_deltas.py")
+    timings = pl.DataFrame([apply_batch(conn, path) for path in paths])
+    timings = timings.with_columns(pl.sum_horizontal(pl.exclude("batch")).alias("total_s"))
+    with pl.Config(tbl_cols=len(timings.columns)):
+        print(f"Applied {len(paths)} delta batches from {DELTAS_PATH}:\n{timings}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Apply delta batches of persons, follows, unfollows and relocations")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database (modified in place)")
+    parser.add_argument("--deltas", type=Path, default=Path("../data/output/deltas"), help="Directory of the delta batches")
+    parser.add_argument("--batches", type=int, nargs="+", default=None, help="Batches to apply (default: all, in order)")
+    args = parser.parse_args()
+    # fmt: on
+
+    DELTAS_PATH = args.deltas
+    BATCHES = args.batches
+    db = kuzu.Database(args.db)
+    CONNECTION = kuzu.Connection(db)
+
+    main(CONNECTION)
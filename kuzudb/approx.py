@@ -0,0 +1,167 @@
+"""
+Approximate path counts for queries 8 and 9, with confidence intervals.
+
+The number of paths `a -> b -> c` is a sum over persons of the paths that start (or pass through)
+each person, so it can be estimated from the paths of a uniform random sample of persons, scaled
+up by the population size, with a normal-approximation confidence interval.
+
+- Sampling the start persons `a` (the default) is close to sampling `Follows` edges, and each
+  person's contribution is the sum of the out-degrees of the persons it follows, which varies
+  little from person to person
+- Sampling the middle persons `b` gives contributions of in-degree × out-degree, which is
+  dominated by the few super nodes, so its intervals are much wider for the same sample size
+
+The sampled IDs are passed to the Cypher query as a list parameter, and the per-person counts
+come back grouped by ID.
+
+    python approx.py --fractions 0.001 0.01 0.1 --repeats 5
+"""
+
+import argparse
+import math
+import statistics
+import time
+from dataclasses import dataclass
+
+import kuzu
+import numpy as np
+import polars as pl
+
+from query import QUERIES_BY_ID, Params, execute_query
+
+
+@dataclass(frozen=True)
+class Estimate:
+    query: int
+    estimate: float
+    lower: float
+    upper: float
+    confidence: float
+    sample_size: int
+    seconds: float
+
+    @property
+    def relative_half_width(self) -> float:
+        return (self.upper - self.lower) / 2 / self.estimate if self.estimate else math.inf
+
+
+def sampled_paths_query(query_id: int, sample_on: str) -> str:
+    """Cypher for the number of paths of each sampled person (persons with none are left out)"""
+    node = {"start": "a", "middle": "b"}[sample_on]
+    filters = " AND b.age < $age_1 AND c.age > $age_2" if query_id == 9 else ""
+    return f"""
+        MATCH (a:Person)-[:Follows]->(b:Person)-[:Follows]->(c:Person)
+        WHERE {node}.id IN $ids{filters}
+        RETURN {node}.id AS id, count(*) AS numPaths
+    """
+
+
+class PathCountEstimator:
+    def __init__(self, conn: kuzu.Connection) -> None:
+        self.conn = conn
+        persons = conn.execute("MATCH (p:Person) RETURN p.id AS id").get_as_pl()
+        self.person_ids = persons["id"].to_numpy()
+
+    def estimate(
+        self,
+        query_id: int,
+        params: Params | None = None,
+        fraction: float = 0.01,
+        confidence: float = 0.95,
+        sample_on: str = "start",
+        seed: int | None = None,
+    ) -> Estimate:
+        if query_id not in (8, 9):
+            raise ValueError(f"Only queries 8 and 9 can be approximated, not query {query_id}")
+        params = QUERIES_BY_ID[query_id].bind(params)
+        start = time.perf_counter()
+        population = len(self.person_ids)
+        sample_size = min(max(math.ceil(fraction * population), 2), population)
+        ids = np.random.default_rng(seed).choice(self.person_ids, sample_size, replace=False)
+        counts = self.conn.execute(
+            sampled_paths_query(query_id, sample_on), parameters={**params, "ids": ids.tolist()}
+        ).get_as_pl()
+        # Sampled persons without any paths count as zeros
+        paths = np.zeros(sample_size)
+        paths[: counts.height] = counts["numPaths"].to_numpy()
+        estimate = float(population * paths.mean())
+        # Standard error of the total, with the finite population correction
+        variance = (1 - sample_size / population) * float(paths.var(ddof=1)) / sample_size
+        z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        half_width = z * population * math.sqrt(variance)
+        return Estimate(
+            query=query_id,
+            estimate=estimate,
+            lower=estimate - half_width,
+            upper=estimate + half_width,
+            confidence=confidence,
+            sample_size=sample_size,
+            seconds=time.perf_counter() - start,
+        )
+
+
+def run_query8_approx(estimator: PathCountEstimator, **kwargs) -> Estimate:
+    "Estimate the number of second-degree paths in the graph"
+    return estimator.estimate(8, **kwargs)
+
+
+def run_query9_approx(
+    estimator: PathCountEstimator, params: Params | None = None, **kwargs
+) -> Estimate:
+    "Estimate the number of paths through persons below a certain age to persons above a certain age"
+    return estimator.estimate(9, params, **kwargs)
+
+
+def main(conn: kuzu.Connection) -> None:
+    estimator = PathCountEstimator(conn)
+    results = []
+    for query_id in (8, 9):
+        start = time.perf_counter()
+        exact = execute_query(conn, query_id, verbose=False)["numPaths"][0]
+        exact_seconds = time.perf_counter() - start
+        for sample_on in SAMPLE_ON:
+            for fraction in FRACTIONS:
+                estimates = [
+                    estimator.estimate(query_id, fraction=fraction, sample_on=sample_on, seed=seed)
+                    for seed in range(REPEATS)
+                ]
+                results.append(
+                    {
+                        "query": query_id,
+                        "sample_on": sample_on,
+                        "fraction": fraction,
+                        "exact": exact,
+                        "mean_estimate": statistics.mean(e.estimate for e in estimates),
+                        "mean_error_pct": 100
+                        * statistics.mean(abs(e.estimate - exact) / exact for e in estimates),
+                        "ci_half_width_pct": 100
+                        * statistics.mean(e.relative_half_width for e in estimates),
+                        "ci_coverage": statistics.mean(
+                            e.lower <= exact <= e.upper for e in estimates
+                        ),
+                        "approx_s": statistics.mean(e.seconds for e in estimates),
+                        "exact_s": exact_seconds,
+                    }
+                )
+    results_df = pl.DataFrame(results)
+    with pl.Config(tbl_rows=len(results_df), tbl_cols=len(results_df.columns)):
+        print(f"Approximate vs. exact path counts over {REPEATS} samples each:\n{results_df}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Benchmark sampled path-count estimates against the exact counts")
+    parser.add_argument("--fractions", "-f", type=float, nargs="+", default=[0.001, 0.01, 0.1], help="Fractions of persons to sample")
+    parser.add_argument("--sample_on", nargs="+", choices=["start", "middle"], default=["start", "middle"], help="Which person on the path to sample")
+    parser.add_argument("--repeats", "-r", type=int, default=5, help="Samples (with different seeds) per setting")
+    args = parser.parse_args()
+    # fmt: on
+
+    FRACTIONS = args.fractions
+    SAMPLE_ON = args.sample_on
+    REPEATS = args.repeats
+    db = kuzu.Database("./social_network", read_only=True)
+    # Default num_threads=0 uses as many threads as hardware and utilization allows
+    CONNECTION = kuzu.Connection(db, num_threads=0)
+
+    main(CONNECTION)
@@ -1,11 +1,18 @@
 """
 Use the `pytest-benchmark` library to more formally benchmark the Kùzu queries with warmup and iterations.
 `pip install pytest-benchmark`
+
+Every query in the shared registry is benchmarked with the same harness as the other backends,
+and its result is checked against the NumPy reference engine's results for the generated
+dataset (`workload/reference.py`), so the benchmark works at any dataset size.
 """
 import kuzu
+import numpy as np
 import pytest
 
-import query
+import query  # noqa: F401 (adds the repo root to the path)
+from workload import QUERIES, QUERIES_BY_ID, KuzuBackend, benchmark_query
+from workload.reference import ReferenceBackend
 
 
 @pytest.fixture
@@ -16,120 +23,28 @@ def connection():
     yield conn
 
 
-def test_benchmark_query1(benchmark, connection):
-    result = benchmark(query.run_query1, connection)
-    result = result.to_dicts()
-
-    assert len(result) == 3
-    assert result[0]["personID"] == 85723
-    assert result[1]["personID"] == 68753
-    assert result[2]["personID"] == 54696
-    assert result[0]["numFollowers"] == 4998
-    assert result[1]["numFollowers"] == 4985
-    assert result[2]["numFollowers"] == 4976
-
-
-def test_benchmark_query2(benchmark, connection):
-    result = benchmark(query.run_query2, connection)
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["name"] == "Melissa Murphy"
-    assert result[0]["numFollowers"] == 4998
-    assert result[0]["city"] == "Austin"
-    assert result[0]["state"] == "Texas"
-    assert result[0]["country"] == "United States"
-
-
-def test_benchmark_query3(benchmark, connection):
-    result = benchmark(query.run_query3, connection, {"country": "United States"})
-    result = result.to_dicts()
-
-    assert len(result) == 5
-    assert result[0]["city"] == "Austin"
-    assert result[1]["city"] == "Kansas City"
-    assert result[2]["city"] == "Miami"
-    assert result[3]["city"] == "San Antonio"
-    assert result[4]["city"] == "Houston"
-
-
-def test_benchmark_query4(benchmark, connection):
-    result = benchmark(query.run_query4, connection, {"age_lower": 30, "age_upper": 40})
-    result = result.to_dicts()
-
-    assert len(result) == 3
-    assert result[0]["countries"] == "United States"
-    assert result[1]["countries"] == "Canada"
-    assert result[2]["countries"] == "United Kingdom"
-    assert result[0]["personCounts"] == 30680
-    assert result[1]["personCounts"] == 3045
-    assert result[2]["personCounts"] == 1801
+@pytest.fixture(scope="session")
+def reference():
+    return ReferenceBackend.from_parquet()
 
 
-def test_benchmark_query5(benchmark, connection):
-    result = benchmark(
-        query.run_query5,
-        connection,
-        {
-            "gender": "male",
-            "city": "London",
-            "country": "United Kingdom",
-            "interest": "fine dining",
-        },
-    )
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPersons"] == 52
-
+@pytest.mark.parametrize("spec", QUERIES, ids=lambda spec: f"query{spec.id}")
+def test_benchmark_query(benchmark, connection, reference, spec):
+    benchmark_query(benchmark, KuzuBackend(connection), spec, reference=reference)
 
-def test_benchmark_query6(benchmark, connection):
-    result = benchmark(
-        query.run_query6,
-        connection,
-        {
-            "gender": "female",
-            "interest": "tennis"
-        },
-    )
-    result = result.to_dicts()
 
-    assert len(result) == 5
-    assert result[0]["numPersons"] == 66
-    assert result[0]["city"] in ("Houston", "Birmingham")
-    assert result[0]["country"] in ("United States", "United Kingdom")
+@pytest.fixture(scope="session")
+def person_pairs(reference):
+    """Random (source, target) pairs of persons for the shortest path queries"""
+    ids = reference.graph.persons["id"].to_numpy()
+    return np.random.default_rng(0).choice(ids, (5, 2), replace=False).tolist()
 
 
-def test_benchmark_query7(benchmark, connection):
-    result = benchmark(
-        query.run_query7,
-        connection,
-        {
-            "country": "United States",
-            "age_lower": 23,
-            "age_upper": 30,
-            "interest": "photography",
-        },
+@pytest.mark.parametrize("pair", range(5), ids=lambda pair: f"pair{pair}")
+@pytest.mark.parametrize("query_id", [12, 13], ids=lambda query_id: f"query{query_id}")
+def test_benchmark_shortest_path(benchmark, connection, reference, person_pairs, query_id, pair):
+    source_id, target_id = person_pairs[pair]
+    params = {"source_id": source_id, "target_id": target_id}
+    benchmark_query(
+        benchmark, KuzuBackend(connection), QUERIES_BY_ID[query_id], params, reference=reference
     )
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPersons"] == 141
-    assert result[0]["state"] == "California"
-    assert result[0]["country"] == "United States"
-
-
-def test_benchmark_query8(benchmark, connection):
-    result = benchmark(query.run_query8, connection)
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPaths"] == 58431994
-
-
-def test_benchmark_query9(benchmark, connection):
-    result = benchmark(query.run_query9, connection, {"age_1": 50, "age_2": 25})
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPaths"] == 45578816
@@ -1,13 +1,25 @@
+import argparse
 import asyncio
 import shutil
+import sys
 from pathlib import Path
+from typing import Any
 
 import kuzu
 from codetiming import Timer
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from workload.build_cache import BuildManifest, cache_key, file_digest, source_digest  # noqa: E402
+from workload.instrument import measure  # noqa: E402
+
 DATA_PATH = Path(__file__).resolve().parents[1] / "data"
 NODES_PATH = DATA_PATH / "output" / "nodes"
 EDGES_PATH = DATA_PATH / "output" / "edges"
+# Files whose content changes whenever the database is opened for writing: Kùzu 0.9 rewrites the
+# catalog and metadata on close. Writes to the data go to `data.kz`, the indexes or the WAL, and
+# schema changes, which only touch the catalog, are caught by comparing `database_schema`.
+VOLATILE_FILES = {".lock", "catalog.kz", "metadata.kz"}
+CATALOG_FILE = "catalog.kz"
 
 
 async def create_person_node_table(conn: kuzu.AsyncConnection) -> None:
@@ -94,7 +106,47 @@ async def create_edge_tables(conn: kuzu.AsyncConnection) -> None:
     await conn.execute("CREATE REL TABLE StateIn(FROM State TO Country)")
 
 
-async def main(conn: kuzu.AsyncConnection) -> None:
+async def create_cell_tables(conn: kuzu.AsyncConnection) -> None:
+    # Optional grid cell -> city lookup table for the geospatial queries
+    await conn.execute(
+        """
+        CREATE NODE TABLE
+            Cell(
+                id INT64,
+                lat_min DOUBLE,
+                lon_min DOUBLE,
+                size DOUBLE,
+                num_cities INT64,
+                PRIMARY KEY (id)
+            )
+        """
+    )
+    await conn.execute("CREATE REL TABLE InCell(FROM City TO Cell)")
+
+
+async def copy_from(conn: kuzu.AsyncConnection, table: str, path: Path) -> None:
+    with measure("copy", table=table, file=path.name):
+        await conn.execute(f"COPY {table} FROM '{path}';")
+
+
+async def set_follows_weights(conn: kuzu.AsyncConnection) -> None:
+    """
+    The generated `Follows` edges carry no properties, so the weighted shortest path query uses a
+    weight derived from the data: 1 plus the age difference of the two persons
+    """
+    await conn.execute("ALTER TABLE Follows ADD weight INT64")
+    with measure("set_follows_weights"):
+        await conn.execute(
+            """
+            MATCH (a:Person)-[f:Follows]->(b:Person)
+            SET f.weight = 1 + abs(a.age - b.age)
+            """
+        )
+
+
+async def main(
+    conn: kuzu.AsyncConnection, nodes_path: Path = NODES_PATH, edges_path: Path = EDGES_PATH
+) -> None:
     with Timer(name="nodes", text="Nodes loaded in {:.4f}s"):
         # Nodes
         await create_person_node_table(conn)
@@ -102,30 +154,194 @@ async def main(conn: kuzu.AsyncConnection) -> None:
         await create_state_node_table(conn)
         await create_country_node_table(conn)
         await create_interest_node_table(conn)
-        await conn.execute(f"COPY Person FROM '{NODES_PATH}/persons.parquet';")
-        await conn.execute(f"COPY City FROM '{NODES_PATH}/cities.parquet';")
-        await conn.execute(f"COPY State FROM '{NODES_PATH}/states.parquet';")
-        await conn.execute(f"COPY Country FROM '{NODES_PATH}/countries.parquet';")
-        await conn.execute(f"COPY Interest FROM '{NODES_PATH}/interests.parquet';")
+        await copy_from(conn, "Person", nodes_path / "persons.parquet")
+        await copy_from(conn, "City", nodes_path / "cities.parquet")
+        await copy_from(conn, "State", nodes_path / "states.parquet")
+        await copy_from(conn, "Country", nodes_path / "countries.parquet")
+        await copy_from(conn, "Interest", nodes_path / "interests.parquet")
 
     with Timer(name="edges", text="Edges loaded in {:.4f}s"):
         # Edges
         await create_edge_tables(conn)
-        await conn.execute(f"COPY Follows FROM '{EDGES_PATH}/follows.parquet';")
-        await conn.execute(f"COPY LivesIn FROM '{EDGES_PATH}/lives_in.parquet';")
-        await conn.execute(f"COPY HasInterest FROM '{EDGES_PATH}/interested_in.parquet';")
-        await conn.execute(f"COPY CityIn FROM '{EDGES_PATH}/city_in.parquet';")
-        await conn.execute(f"COPY StateIn FROM '{EDGES_PATH}/state_in.parquet';")
+        await copy_from(conn, "Follows", edges_path / "follows.parquet")
+        await copy_from(conn, "LivesIn", edges_path / "lives_in.parquet")
+        await copy_from(conn, "HasInterest", edges_path / "interested_in.parquet")
+        await copy_from(conn, "CityIn", edges_path / "city_in.parquet")
+        await copy_from(conn, "StateIn", edges_path / "state_in.parquet")
+
+    if (nodes_path / "cells.parquet").exists():
+        with Timer(name="cells", text="Grid cells loaded in {:.4f}s"):
+            await create_cell_tables(conn)
+            await copy_from(conn, "Cell", nodes_path / "cells.parquet")
+            await copy_from(conn, "InCell", edges_path / "city_in_cell.parquet")
+
+    with Timer(name="weights", text="Follows weights set in {:.4f}s"):
+        await set_follows_weights(conn)
 
     print("Successfully loaded nodes and edges into KùzuDB!")
 
 
-if __name__ == "__main__":
-    DB_NAME = "social_network"
+def input_paths(nodes_path: Path = NODES_PATH, edges_path: Path = EDGES_PATH) -> list[Path]:
+    """The parquet files that `main` copies from"""
+    nodes = ["persons", "cities", "states", "countries", "interests"]
+    edges = ["follows", "lives_in", "interested_in", "city_in", "state_in"]
+    paths = [nodes_path / f"{name}.parquet" for name in nodes]
+    paths += [edges_path / f"{name}.parquet" for name in edges]
+    if (nodes_path / "cells.parquet").exists():
+        paths += [nodes_path / "cells.parquet", edges_path / "city_in_cell.parquet"]
+    return paths
+
+
+def build_key(nodes_path: Path = NODES_PATH, edges_path: Path = EDGES_PATH) -> str:
+    """Cache key of a database built from the given files by this script and Kùzu version"""
+    return cache_key(
+        script=source_digest(Path(__file__)),
+        kuzu=kuzu.__version__,
+        inputs={
+            f"{path.parent.name}/{path.name}": file_digest(path)
+            for path in input_paths(nodes_path, edges_path)
+        },
+    )
+
+
+def manifest_path(db_path: Path) -> Path:
+    """Kept next to the database directory rather than in it, which Kùzu owns"""
+    return db_path.with_name(f"{db_path.name}.build_manifest.json")
+
+
+def database_files(db_path: Path) -> list[Path]:
+    return sorted(
+        path for path in db_path.iterdir() if path.is_file() and path.name not in VOLATILE_FILES
+    )
+
+
+def file_stats(db_path: Path) -> dict[str, list[int]]:
+    """Size and modification time of every file in the database, the volatile ones included"""
+    return {
+        path.name: [path.stat().st_size, path.stat().st_mtime_ns]
+        for path in sorted(db_path.iterdir())
+        if path.is_file()
+    }
+
+
+def database_schema(db_path: Path) -> dict[str, dict[str, Any]]:
+    """The type and the properties (as `table_info` lists them) of every table in the database"""
+    db = kuzu.Database(str(db_path), read_only=True)
+    conn = kuzu.Connection(db)
+    schema = {}
+    for table in conn.execute("CALL show_tables() RETURN name, type").get_as_pl().iter_rows():
+        name, table_type = table
+        properties = conn.execute(f"CALL table_info('{name}') RETURN *").get_as_pl()
+        schema[name] = {
+            "type": table_type,
+            "properties": [[str(value) for value in row] for row in properties.iter_rows()],
+        }
+    conn.close()
+    db.close()
+    return schema
+
+
+def is_current(db_path: Path, key: str) -> bool:
+    """
+    Whether the database at `db_path` was built with this key and its files and schema are
+    unchanged since, so that one modified in place (e.g. by `apply_deltas.py` or an `ALTER TABLE`)
+    is not mistaken for a fresh build.
+
+    A file whose size and modification time are as recorded is taken to be unchanged, so only
+    the files written since the last check are hashed, and the database is only opened to compare
+    its schema when the catalog was written. Once those pass, their new times are recorded.
+    """
+    if not manifest_path(db_path).is_file():
+        return False
+    manifest = BuildManifest(manifest_path(db_path), root=db_path)
+    entry = manifest.steps.get("database")
+    if entry is None or entry["key"] != key:
+        return False
+    files = database_files(db_path)
+    if set(entry["outputs"]) != {path.name for path in files}:
+        return False
+    stats = file_stats(db_path)
+    recorded = entry.get("stats", {})
+    for path in files:
+        if stats[path.name] != recorded.get(path.name):
+            if manifest.digest(path) != entry["outputs"][path.name]:
+                return False
+    if stats.get(CATALOG_FILE) != recorded.get(CATALOG_FILE):
+        # Opened read-only, which leaves the files and their times as they are
+        if entry.get("schema") != database_schema(db_path):
+            return False
+    if stats != recorded:
+        entry["stats"] = stats
+        manifest.save()
+    return True
+
+
+def build(db_path: Path, nodes_path: Path = NODES_PATH, edges_path: Path = EDGES_PATH) -> None:
     # Delete directory each time till we have MERGE FROM available in kuzu
-    shutil.rmtree(DB_NAME, ignore_errors=True)
-    # Create database
-    db = kuzu.Database(f"./{DB_NAME}")
-    CONNECTION = kuzu.AsyncConnection(db)
+    shutil.rmtree(db_path, ignore_errors=True)
+    manifest_path(db_path).unlink(missing_ok=True)
+    db = kuzu.Database(str(db_path))
+    asyncio.run(main(kuzu.AsyncConnection(db), nodes_path, edges_path))
+    # Closing checkpoints the write-ahead log into the data files before they are hashed
+    db.close()
+
+
+def copy_database(src_path: Path, dst_path: Path) -> None:
+    """
+    Copy a database and its manifest, whose paths are relative to the database. The files keep
+    their modification times, so the copy is also current without hashing it.
+    """
+    shutil.rmtree(dst_path, ignore_errors=True)
+    shutil.copytree(src_path, dst_path)
+    shutil.copy2(manifest_path(src_path), manifest_path(dst_path))
+
+
+def build_cached(
+    db_path: Path,
+    nodes_path: Path = NODES_PATH,
+    edges_path: Path = EDGES_PATH,
+    cache_path: Path | None = None,
+    force: bool = False,
+) -> str:
+    """
+    Build the database at `db_path` unless the one already there was built from the same parquet
+    files. With a `cache_path`, every build is also kept as a snapshot named after its key, and a
+    matching snapshot is copied into place instead of building again. Returns "reused", "copied"
+    or "built".
+    """
+    with Timer(name="inputs", text="Input files hashed in {:.4f}s"):
+        key = build_key(nodes_path, edges_path)
+    if not force and db_path.is_dir() and is_current(db_path, key):
+        return "reused"
+    snapshot_path = cache_path / key[:16] if cache_path is not None else None
+    if not force and snapshot_path is not None and snapshot_path.is_dir():
+        if is_current(snapshot_path, key):
+            copy_database(snapshot_path, db_path)
+            return "copied"
+    build(db_path, nodes_path, edges_path)
+    manifest = BuildManifest(manifest_path(db_path), root=db_path)
+    # Read before listing the files, in case opening the database creates any
+    schema = database_schema(db_path)
+    manifest.record(
+        "database", key, database_files(db_path), schema=schema, stats=file_stats(db_path)
+    )
+    if snapshot_path is not None:
+        copy_database(db_path, snapshot_path)
+    return "built"
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Load the parquet files into a Kùzu database, unless it is up to date")
+    parser.add_argument("--db", type=Path, default=Path("./social_network"), help="Path to the Kùzu database")
+    parser.add_argument("--cache_dir", type=Path, default=None, help="Keep a snapshot of every build here, and copy a matching one instead of rebuilding")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the database is up to date")
+    args = parser.parse_args()
+    # fmt: on
 
-    asyncio.run(main(CONNECTION))
+    with Timer(name="build", text="Database ready in {:.4f}s"):
+        status = build_cached(args.db, cache_path=args.cache_dir, force=args.force)
+    if status == "reused":
+        print(f"Database at {args.db} is up to date with the parquet files, not rebuilding")
+    elif status == "copied":
+        print(f"Copied the matching snapshot from {args.cache_dir} to {args.db}")
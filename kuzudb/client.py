@@ -0,0 +1,98 @@
+"""
+Thin client for the query server in `server.py`: one persistent socket, one line of JSON per
+request and per response, and only the standard library plus polars to wrap the result.
+
+    python client.py --query 3 --params '{"country": "Canada"}'
+    python client.py --rounds 100
+"""
+
+import argparse
+import json
+import socket
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+
+SOCKET_PATH = Path("/tmp/kuzu_social_network.sock")
+
+
+class QueryError(Exception):
+    pass
+
+
+class QueryClient:
+    def __init__(self, socket_path: Path = SOCKET_PATH, port: int | None = None) -> None:
+        if port is not None:
+            self.sock = socket.create_connection(("127.0.0.1", port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(str(socket_path))
+        self.file = self.sock.makefile("rwb")
+
+    def __enter__(self) -> "QueryClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def request(self, request: dict[str, Any]) -> dict[str, Any]:
+        self.file.write(json.dumps(request).encode() + b"\n")
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if not response["ok"]:
+            raise QueryError(response["error"])
+        return response
+
+    def query(self, query_id: int, params: dict[str, Any] | None = None) -> pl.DataFrame:
+        return pl.DataFrame(self.request({"query": query_id, "params": params})["rows"])
+
+
+def main() -> None:
+    with QueryClient(SOCKET, PORT) as client:
+        if QUERY is not None:
+            print(client.query(QUERY, PARAMS))
+            return
+        # Round-trip latency for every query, compared with the time spent in Kùzu
+        results = []
+        for query_id in range(1, 10):
+            round_trips, server_times = [], []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                response = client.request({"query": query_id})
+                round_trips.append(time.perf_counter() - start)
+                server_times.append(response["elapsed_s"])
+            results.append(
+                {
+                    "query": query_id,
+                    "round_trip_ms": 1000 * statistics.median(round_trips),
+                    "server_ms": 1000 * statistics.median(server_times),
+                }
+            )
+    print(f"Median latency over {ROUNDS} requests:\n{pl.DataFrame(results)}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Query the Kùzu query server")
+    parser.add_argument("--socket", type=Path, default=SOCKET_PATH, help="Unix socket the server listens on")
+    parser.add_argument("--port", type=int, default=None, help="Connect to this localhost TCP port instead")
+    parser.add_argument("--query", "-q", type=int, default=None, help="Run one query and print its result")
+    parser.add_argument("--params", type=json.loads, default=None, help="Query parameters as JSON")
+    parser.add_argument("--rounds", "-r", type=int, default=20, help="Requests per query when timing")
+    args = parser.parse_args()
+    # fmt: on
+
+    SOCKET = args.socket
+    PORT = args.port
+    QUERY = args.query
+    PARAMS = args.params
+    ROUNDS = args.rounds
+    main()
@@ -0,0 +1,204 @@
+"""
+Per-query time budgets for the Kùzu queries, with a graceful fallback when a budget runs out.
+
+Each query runs with Kùzu's query timeout set to its budget, so a slow query is interrupted
+inside the database instead of blocking the caller. When that happens, the caller gets the
+last result computed for the same query and parameters (flagged `stale`), or for the path-count
+queries 8 and 9 a sampled estimate (flagged `approximate`, see `approx.py`). Only when neither
+is available is `DeadlineExceeded` raised. Every outcome is counted per query, so the rate of
+deadline hits can be monitored.
+
+    python deadline.py --budget_ms 50 --rounds 3 --warm_cache
+"""
+
+import argparse
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import kuzu
+import polars as pl
+
+from approx import Estimate, PathCountEstimator
+from query import QUERIES, QUERIES_BY_ID, Params, execute_query
+
+# Kùzu's error message when a query hits its timeout or is interrupted
+INTERRUPTED = "Interrupted"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class DeadlineResult:
+    result: pl.DataFrame
+    # "fresh", "stale" (cached from an earlier run) or "approximate" (sampled estimate)
+    status: str
+    seconds: float
+    # For stale results: how long ago the cached result was computed
+    age_s: float | None = None
+    # For approximate results: the estimate with its confidence interval
+    estimate: Estimate | None = None
+
+
+@dataclass
+class DeadlineCounters:
+    requests: Counter = field(default_factory=Counter)
+    deadline_hits: Counter = field(default_factory=Counter)
+    stale: Counter = field(default_factory=Counter)
+    approximate: Counter = field(default_factory=Counter)
+    failed: Counter = field(default_factory=Counter)
+
+    def as_frame(self) -> pl.DataFrame:
+        return pl.DataFrame(
+            [
+                {
+                    "query": query_id,
+                    "requests": self.requests[query_id],
+                    "deadline_hits": self.deadline_hits[query_id],
+                    "stale": self.stale[query_id],
+                    "approximate": self.approximate[query_id],
+                    "failed": self.failed[query_id],
+                }
+                for query_id in sorted(self.requests)
+            ]
+        )
+
+
+class DeadlineExecutor:
+    def __init__(
+        self,
+        conn: kuzu.Connection,
+        default_budget_s: float = 1.0,
+        budgets_s: dict[int, float] | None = None,
+        fallback_fraction: float = 0.01,
+        fallback_budget_s: float | None = None,
+    ) -> None:
+        self.conn = conn
+        self.default_budget_s = default_budget_s
+        self.budgets_s = budgets_s or {}
+        self.fallback_fraction = fallback_fraction
+        # Budget for computing an approximate answer, by default the same as the query's
+        self.fallback_budget_s = fallback_budget_s
+        self.counters = DeadlineCounters()
+        # (query, params) -> (result, time it was computed)
+        self.cache: dict[tuple, tuple[pl.DataFrame, float]] = {}
+        self._estimator: PathCountEstimator | None = None
+
+    def budget_s(self, query_id: int) -> float:
+        return self.budgets_s.get(query_id, self.default_budget_s)
+
+    def interrupt(self) -> None:
+        """Interrupt the running query from another thread, which triggers the fallback"""
+        self.conn.interrupt()
+
+    def execute(self, query_id: int, params: Params, budget_s: float) -> pl.DataFrame:
+        self.conn.set_query_timeout(max(int(budget_s * 1000), 1))
+        try:
+            return execute_query(self.conn, query_id, params, verbose=False)
+        except RuntimeError as e:
+            if INTERRUPTED in str(e):
+                raise DeadlineExceeded(f"Query {query_id} exceeded its {budget_s}s budget") from e
+            raise
+        finally:
+            self.conn.set_query_timeout(0)
+
+    def run(
+        self, query_id: int, params: Params | None = None, budget_s: float | None = None
+    ) -> DeadlineResult:
+        params = QUERIES_BY_ID[query_id].bind(params)
+        budget_s = budget_s if budget_s is not None else self.budget_s(query_id)
+        key = (query_id, tuple(sorted(params.items())))
+        self.counters.requests[query_id] += 1
+        start = time.perf_counter()
+        try:
+            result = self.execute(query_id, params, budget_s)
+            self.cache[key] = (result, time.time())
+            return DeadlineResult(result, "fresh", time.perf_counter() - start)
+        except DeadlineExceeded:
+            self.counters.deadline_hits[query_id] += 1
+            if key in self.cache:
+                self.counters.stale[query_id] += 1
+                result, computed_at = self.cache[key]
+                return DeadlineResult(
+                    result, "stale", time.perf_counter() - start, age_s=time.time() - computed_at
+                )
+            if query_id in (8, 9):
+                estimate = self.approximate(query_id, params, self.fallback_budget_s or budget_s)
+                if estimate is not None:
+                    self.counters.approximate[query_id] += 1
+                    result = pl.DataFrame({"numPaths": [round(estimate.estimate)]})
+                    return DeadlineResult(
+                        result, "approximate", time.perf_counter() - start, estimate=estimate
+                    )
+            self.counters.failed[query_id] += 1
+            raise
+
+    def approximate(self, query_id: int, params: Params, budget_s: float) -> Estimate | None:
+        """Estimate a path count, itself within the budget, or None if that times out too"""
+        if self._estimator is None:
+            # Lists the person IDs once, outside of any budget
+            self._estimator = PathCountEstimator(self.conn)
+        self.conn.set_query_timeout(max(int(budget_s * 1000), 1))
+        try:
+            return self._estimator.estimate(query_id, params, fraction=self.fallback_fraction)
+        except RuntimeError as e:
+            if INTERRUPTED in str(e):
+                return None
+            raise
+        finally:
+            self.conn.set_query_timeout(0)
+
+
+def main(conn: kuzu.Connection) -> None:
+    executor = DeadlineExecutor(
+        conn,
+        BUDGET_MS / 1000,
+        fallback_fraction=FALLBACK_FRACTION,
+        fallback_budget_s=FALLBACK_BUDGET_MS / 1000 if FALLBACK_BUDGET_MS else None,
+    )
+    if WARM_CACHE:
+        for spec in QUERIES:
+            executor.run(spec.id, budget_s=3600)
+        executor.counters = DeadlineCounters()
+    latencies = []
+    for _ in range(ROUNDS):
+        for spec in QUERIES:
+            try:
+                outcome = executor.run(spec.id)
+                latencies.append({"query": spec.id, "status": outcome.status, "s": outcome.seconds})
+            except DeadlineExceeded:
+                latencies.append({"query": spec.id, "status": "failed", "s": None})
+    summary = (
+        pl.DataFrame(latencies)
+        .group_by("query", "status")
+        .agg(pl.len().alias("count"), pl.col("s").max().alias("max_s"))
+        .sort("query", "status")
+    )
+    with pl.Config(tbl_rows=len(summary)):
+        print(f"Outcomes with a {BUDGET_MS}ms budget per query:\n{summary}")
+        print(f"Counters:\n{executor.counters.as_frame()}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Run the queries with a time budget and fall back when it runs out")
+    parser.add_argument("--budget_ms", "-b", type=float, default=100, help="Time budget per query, in milliseconds")
+    parser.add_argument("--fallback_fraction", type=float, default=0.01, help="Fraction of persons sampled for approximate path counts")
+    parser.add_argument("--fallback_budget_ms", type=float, default=None, help="Time budget for an approximate answer (default: same as --budget_ms)")
+    parser.add_argument("--rounds", "-r", type=int, default=3, help="Runs of the whole suite")
+    parser.add_argument("--warm_cache", action="store_true", help="Run every query once without a budget first, so that stale results are available")
+    args = parser.parse_args()
+    # fmt: on
+
+    BUDGET_MS = args.budget_ms
+    FALLBACK_FRACTION = args.fallback_fraction
+    FALLBACK_BUDGET_MS = args.fallback_budget_ms
+    ROUNDS = args.rounds
+    WARM_CACHE = args.warm_cache
+    db = kuzu.Database("./social_network", read_only=True)
+    # Default num_threads=0 uses as many threads as hardware and utilization allows
+    CONNECTION = kuzu.Connection(db, num_threads=0)
+
+    main(CONNECTION)
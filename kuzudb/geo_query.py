@@ -0,0 +1,216 @@
+"""
+Geospatial queries over the `City` coordinates, pruned by the grid cells that
+`data/create_nodes_cells.py` assigns cities to (loaded as `Cell` nodes and `InCell` edges by
+`build_graph.py`).
+
+* Persons within a radius: the cells overlapping the bounding box of the circle are computed up
+  front (`workload/geo.py`), so only the cities in those cells get an exact haversine distance
+* Nearest city with a population above a threshold: the same radius search, starting at one cell
+  and doubling the radius until a qualifying city is found within it
+
+Each query also has a full-scan form, which computes the distance to every city, as the baseline
+for the benchmark over several radii.
+
+    python geo_query.py --radii 10 50 200 1000 --points 20
+"""
+
+import argparse
+import math
+import time
+
+import kuzu
+import numpy as np
+import polars as pl
+
+import query  # noqa: F401 (adds the repo root to the path)
+from workload.geo import EARTH_RADIUS_KM, KM_PER_DEGREE, cells_within
+
+# Haversine distance in km from ($lat, $lon) to the city `c`
+DISTANCE = f"""
+    2 * {EARTH_RADIUS_KM} * asin(sqrt(
+        pow(sin(radians(c.lat - $lat) / 2), 2)
+        + cos(radians($lat)) * cos(radians(c.lat)) * pow(sin(radians(c.lon - $lon) / 2), 2)
+    ))
+"""
+
+# Cities in the listed cells, or every city
+PRUNED_CITIES = """
+    UNWIND CAST($cells AS INT64[]) AS cell
+    MATCH (:Cell {id: cell})<-[:InCell]-(c:City)
+"""
+ALL_CITIES = "MATCH (c:City)"
+
+
+def persons_within_cypher(cities: str) -> str:
+    return f"""
+        {cities}
+        WITH c, {DISTANCE} AS distance
+        WHERE distance <= $radius_km
+        MATCH (p:Person)-[:LivesIn]->(c)
+        RETURN count(p) AS numPersons
+    """
+
+
+def cities_within_cypher(cities: str) -> str:
+    return f"""
+        {cities}
+        WHERE c.population > $population_above
+        WITH c, {DISTANCE} AS distance
+        WHERE distance <= $radius_km
+        RETURN c.id AS id, c.city AS city, c.country AS country, c.population AS population, distance
+        ORDER BY distance, id
+        LIMIT 1
+    """
+
+
+class GeoQueries:
+    def __init__(self, conn: kuzu.Connection) -> None:
+        self.conn = conn
+        cells = conn.execute(
+            "MATCH (c:Cell) RETURN c.id AS id, c.size AS size, c.num_cities AS num_cities"
+        ).get_as_pl()
+        if cells["size"].n_unique() != 1:
+            raise ValueError("Cell table is empty or has mixed sizes, rerun create_nodes_cells.py")
+        self.cell_size = float(cells["size"][0])
+        self.num_cities = dict(zip(cells["id"].to_list(), cells["num_cities"].to_list()))
+
+    def cells(self, lat: float, lon: float, radius_km: float) -> list[int]:
+        return cells_within(lat, lon, radius_km, self.cell_size).tolist()
+
+    def cities_checked(self, lat: float, lon: float, radius_km: float) -> int:
+        """Number of cities whose distance the pruned search computes"""
+        return sum(self.num_cities.get(cell, 0) for cell in self.cells(lat, lon, radius_km))
+
+    def persons_within(self, lat: float, lon: float, radius_km: float, prune: bool = True) -> int:
+        """Number of persons who live in a city within `radius_km` of a point"""
+        params = {"lat": lat, "lon": lon, "radius_km": radius_km}
+        if prune:
+            cypher = persons_within_cypher(PRUNED_CITIES)
+            params["cells"] = self.cells(lat, lon, radius_km)
+        else:
+            cypher = persons_within_cypher(ALL_CITIES)
+        return self.conn.execute(cypher, parameters=params).get_as_pl()["numPersons"][0]
+
+    def nearest_city(
+        self, lat: float, lon: float, population_above: int = 0, prune: bool = True
+    ) -> dict | None:
+        """
+        The closest city to a point with a population above `population_above` (ties broken by
+        city ID), or None if there is no such city
+        """
+        params = {"lat": lat, "lon": lon, "population_above": population_above}
+        if not prune:
+            params["radius_km"] = math.pi * EARTH_RADIUS_KM
+            result = self.conn.execute(cities_within_cypher(ALL_CITIES), parameters=params)
+            rows = result.get_as_pl().to_dicts()
+            return rows[0] if rows else None
+        # A city within the search radius is the nearest one, since every closer city lies in the
+        # cells of the same radius
+        radius_km = self.cell_size * KM_PER_DEGREE
+        while True:
+            radius_km = min(radius_km, math.pi * EARTH_RADIUS_KM)
+            params["radius_km"] = radius_km
+            params["cells"] = self.cells(lat, lon, radius_km)
+            result = self.conn.execute(cities_within_cypher(PRUNED_CITIES), parameters=params)
+            rows = result.get_as_pl().to_dicts()
+            if rows or radius_km >= math.pi * EARTH_RADIUS_KM:
+                return rows[0] if rows else None
+            radius_km *= 2
+
+
+def sample_points(
+    conn: kuzu.Connection, num_points: int, seed: int = 0
+) -> list[tuple[float, float]]:
+    """Random city locations, so that the searches start where persons live"""
+    cities = conn.execute(
+        "MATCH (c:City) RETURN c.lat AS lat, c.lon AS lon ORDER BY c.id"
+    ).get_as_pl()
+    rows = np.random.default_rng(seed).choice(len(cities), num_points, replace=False)
+    return [cities.row(int(i)) for i in rows]
+
+
+def time_runs(func, points: list[tuple[float, float]]) -> tuple[float, list]:
+    """Median seconds per point, and the results"""
+    latencies, results = [], []
+    for lat, lon in points:
+        start = time.perf_counter()
+        results.append(func(lat, lon))
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)), results
+
+
+def main(conn: kuzu.Connection) -> None:
+    geo = GeoQueries(conn)
+    points = sample_points(conn, NUM_POINTS, SEED)
+    rows = []
+    for radius_km in RADII:
+        pruned_s, pruned = time_runs(
+            lambda lat, lon: geo.persons_within(lat, lon, radius_km), points
+        )
+        scan_s, scanned = time_runs(
+            lambda lat, lon: geo.persons_within(lat, lon, radius_km, prune=False), points
+        )
+        assert pruned == scanned, f"Pruned and full-scan results differ at {radius_km} km"
+        rows.append(
+            {
+                "query": f"persons within {radius_km:g} km",
+                "cells_probed": float(
+                    np.mean([len(geo.cells(lat, lon, radius_km)) for lat, lon in points])
+                ),
+                "cities_checked": float(
+                    np.mean([geo.cities_checked(lat, lon, radius_km) for lat, lon in points])
+                ),
+                "mean_result": float(np.mean(pruned)),
+                "pruned_ms": 1000 * pruned_s,
+                "full_scan_ms": 1000 * scan_s,
+                "speedup": scan_s / pruned_s,
+            }
+        )
+    pruned_s, pruned = time_runs(
+        lambda lat, lon: geo.nearest_city(lat, lon, POPULATION_ABOVE), points
+    )
+    scan_s, scanned = time_runs(
+        lambda lat, lon: geo.nearest_city(lat, lon, POPULATION_ABOVE, prune=False), points
+    )
+    assert [r and r["id"] for r in pruned] == [r and r["id"] for r in scanned]
+    rows.append(
+        {
+            "query": f"nearest city above {POPULATION_ABOVE:,}",
+            "cells_probed": None,
+            "cities_checked": None,
+            "mean_result": float(np.mean([r["distance"] for r in pruned if r])),
+            "pruned_ms": 1000 * pruned_s,
+            "full_scan_ms": 1000 * scan_s,
+            "speedup": scan_s / pruned_s,
+        }
+    )
+    results_df = pl.DataFrame(
+        rows, schema_overrides={"cells_probed": pl.Float64, "cities_checked": pl.Float64}
+    )
+    with pl.Config(tbl_cols=len(results_df.columns), fmt_str_lengths=40):
+        print(
+            f"Median per query over {NUM_POINTS} points, {geo.cell_size:g} degree cells, "
+            f"{sum(geo.num_cities.values())} cities:\n{results_df}"
+        )
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Time radius and nearest-city queries with and without grid cell pruning")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database")
+    parser.add_argument("--radii", type=float, nargs="+", default=[10, 50, 200, 1000], help="Search radii in km")
+    parser.add_argument("--points", type=int, default=20, help="Number of random city locations to search around")
+    parser.add_argument("--population_above", type=int, default=1_000_000, help="Population threshold of the nearest-city query")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for sampling points")
+    args = parser.parse_args()
+    # fmt: on
+
+    RADII = args.radii
+    NUM_POINTS = args.points
+    POPULATION_ABOVE = args.population_above
+    SEED = args.seed
+    db = kuzu.Database(args.db, read_only=True)
+    # Default num_threads=0 uses as many threads as hardware and utilization allows
+    CONNECTION = kuzu.Connection(db, num_threads=0)
+
+    main(CONNECTION)
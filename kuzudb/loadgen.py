@@ -0,0 +1,274 @@
+"""
+Open-loop load generator: send a weighted mix of the registry's queries at a target arrival rate,
+and sweep the rate up to saturation to get latency under load.
+
+`benchmark_query.py` runs closed-loop, each call starting when the last one returns, so a slow
+query delays the calls behind it instead of queueing them, and their wait is never measured
+("coordinated omission"). Here the arrival times are drawn up front from a Poisson process
+(exponential gaps at the target rate), and an asyncio loop dispatches each query at its arrival
+time to worker threads that borrow a connection from a pool, whether or not earlier queries have
+returned. Each query is what the matching `run_queryN` runs, with the registry's default parameters.
+
+Two latencies are recorded for every query into log-bucketed histograms:
+
+* service time: the time on a connection, which is what a closed-loop benchmark reports
+* response time: from the scheduled arrival to the result, including any wait for a connection
+  and any lag of the dispatcher, so it is corrected for coordinated omission by construction
+
+A rate is saturated once the completion rate falls below the arrival rate by more than the
+tolerance, as the backlog then grows for as long as the load lasts. The sweep stops there.
+
+    python loadgen.py --connections 4 --start_rate 10 --duration 10
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import kuzu
+import numpy as np
+import polars as pl
+
+from query import QUERIES_BY_ID, execute_query
+from server import ConnectionPool
+
+PERCENTILES = [50, 90, 99, 99.9]
+# Lookups weighted above the whole-graph aggregations. Query 4's variable-length path over any
+# relationship takes seconds on Kùzu 0.9, so it would swamp the mix; add it with `--mix 4=...`
+DEFAULT_MIX = ["1=1", "2=1", "3=2", "5=4", "6=4", "7=4", "8=1", "9=1"]
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in log-spaced buckets, each `precision` wider than the one before, so that
+    any percentile is reported to within that relative error however wide the range
+    """
+
+    def __init__(self, lowest_s: float = 1e-6, highest_s: float = 3600.0, precision: float = 0.01):
+        self.lowest_s = lowest_s
+        self.growth = math.log1p(precision)
+        num_buckets = math.ceil(math.log(highest_s / lowest_s) / self.growth) + 1
+        self.counts = np.zeros(num_buckets, dtype=np.int64)
+
+    def record(self, seconds: float | np.ndarray) -> None:
+        values = np.maximum(np.asarray(seconds, dtype=np.float64), self.lowest_s)
+        buckets = np.floor(np.log(values / self.lowest_s) / self.growth).astype(np.int64)
+        np.add.at(self.counts, np.minimum(buckets, len(self.counts) - 1), 1)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def upper_bounds(self) -> np.ndarray:
+        return self.lowest_s * np.exp(self.growth * np.arange(1, len(self.counts) + 1))
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile"""
+        if self.total == 0:
+            return math.nan
+        rank = max(math.ceil(q / 100 * self.total), 1)
+        return float(self.upper_bounds()[np.searchsorted(np.cumsum(self.counts), rank)])
+
+    def to_frame(self) -> pl.DataFrame:
+        """Non-empty buckets, with the cumulative fraction of latencies up to each"""
+        nonzero = np.flatnonzero(self.counts)
+        return pl.DataFrame(
+            {
+                "upper_ms": 1000 * self.upper_bounds()[nonzero],
+                "count": self.counts[nonzero],
+                "percentile": 100 * np.cumsum(self.counts[nonzero]) / max(self.total, 1),
+            }
+        )
+
+
+def poisson_schedule(
+    rate: float, duration_s: float, query_ids: list[int], weights: list[float], seed: int = 0
+) -> list[tuple[float, int]]:
+    """Arrival offsets of a Poisson process over `duration_s`, each with a query from the mix"""
+    rng = np.random.default_rng(seed)
+    # Draw enough gaps to cover the duration with overwhelming probability, then cut
+    num_gaps = int(rate * duration_s + 10 * math.sqrt(rate * duration_s) + 10)
+    arrivals = np.cumsum(rng.exponential(1 / rate, num_gaps))
+    arrivals = arrivals[arrivals < duration_s]
+    queries = random.Random(seed).choices(query_ids, weights, k=len(arrivals))
+    return list(zip(arrivals.tolist(), queries))
+
+
+@dataclass
+class StepResult:
+    rate: float
+    duration_s: float
+    num_requests: int
+    achieved_rate: float
+    service: LatencyHistogram
+    response: LatencyHistogram
+
+    def saturated(self, tolerance: float) -> bool:
+        # Against the arrivals actually drawn, which vary around the target rate
+        return self.achieved_rate < (1 - tolerance) * self.num_requests / self.duration_s
+
+    def summary(self) -> dict[str, float]:
+        row = {
+            "offered_per_s": self.rate,
+            "achieved_per_s": self.achieved_rate,
+            "requests": self.num_requests,
+            "service_p50_ms": 1000 * self.service.percentile(50),
+            "service_p99_ms": 1000 * self.service.percentile(99),
+        }
+        for q in PERCENTILES:
+            row[f"response_p{q:g}_ms"] = 1000 * self.response.percentile(q)
+        row["response_max_ms"] = 1000 * self.response.percentile(100)
+        return row
+
+
+class LoadGenerator:
+    def __init__(self, db: kuzu.Database, num_connections: int, num_threads: int = 1) -> None:
+        self.pool = ConnectionPool(db, num_connections, num_threads)
+        self.executor = ThreadPoolExecutor(num_connections, thread_name_prefix="kuzu-load")
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def run_one(self, query_id: int) -> tuple[float, float]:
+        """Run a query on a pooled connection, returning its service time and completion time"""
+        with self.pool.connection() as conn:
+            start = time.perf_counter()
+            execute_query(conn, query_id, verbose=False)
+            finished = time.perf_counter()
+        return finished - start, finished
+
+    async def run_step(self, schedule: list[tuple[float, int]]) -> tuple[float, np.ndarray]:
+        """
+        Dispatch each query at its arrival offset from now, without waiting for earlier ones.
+        Returns the start time and the (scheduled, service, finished) time of every query.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        futures = []
+        for offset, query_id in schedule:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            futures.append(loop.run_in_executor(self.executor, self.run_one, query_id))
+        results = await asyncio.gather(*futures)
+        scheduled = start + np.array([offset for offset, _ in schedule])
+        return start, np.column_stack([scheduled, np.array(results).reshape(-1, 2)])
+
+    def run_rate(
+        self, rate: float, duration_s: float, query_ids: list[int], weights: list[float], seed: int
+    ) -> StepResult:
+        schedule = poisson_schedule(rate, duration_s, query_ids, weights, seed)
+        start, times = asyncio.run(self.run_step(schedule))
+        scheduled, service, finished = times.T
+        service_histogram, response_histogram = LatencyHistogram(), LatencyHistogram()
+        service_histogram.record(service)
+        response_histogram.record(finished - scheduled)
+        # Completions over the time to finish them all, which exceeds the duration once saturated
+        elapsed = max(finished.max() - start, duration_s) if len(finished) else duration_s
+        return StepResult(
+            rate=rate,
+            duration_s=duration_s,
+            num_requests=len(schedule),
+            achieved_rate=len(schedule) / elapsed,
+            service=service_histogram,
+            response=response_histogram,
+        )
+
+    def warm_up(self, query_ids: list[int]) -> None:
+        for query_id in query_ids:
+            self.run_one(query_id)
+
+
+def sweep_rates(start_rate: float, factor: float, max_steps: int) -> list[float]:
+    return [start_rate * factor**step for step in range(max_steps)]
+
+
+def parse_mix(mix: list[str]) -> tuple[list[int], list[float]]:
+    """Query IDs and weights from `id=weight` pairs (a bare `id` has weight 1)"""
+    query_ids, weights = [], []
+    for item in mix:
+        query_id, _, weight = item.partition("=")
+        if int(query_id) not in QUERIES_BY_ID:
+            raise ValueError(f"Unknown query `{query_id}`")
+        query_ids.append(int(query_id))
+        weights.append(float(weight) if weight else 1.0)
+    return query_ids, weights
+
+
+def main() -> None:
+    query_ids, weights = parse_mix(MIX)
+    rates = RATES or sweep_rates(START_RATE, FACTOR, MAX_STEPS)
+    db = kuzu.Database(DB_PATH, read_only=True)
+    generator = LoadGenerator(db, NUM_CONNECTIONS, NUM_THREADS)
+    generator.warm_up(query_ids)
+    steps = []
+    try:
+        for step, rate in enumerate(rates):
+            result = generator.run_rate(rate, DURATION_S, query_ids, weights, SEED + step)
+            steps.append(result)
+            print(f"{rate:.1f}/s offered, {result.achieved_rate:.1f}/s achieved")
+            if result.saturated(TOLERANCE):
+                print(f"Saturated at {rate:.1f}/s")
+                break
+    finally:
+        generator.close()
+
+    summary = pl.DataFrame([step.summary() for step in steps])
+    with pl.Config(tbl_cols=len(summary.columns)):
+        print(
+            f"Latency vs offered load on {NUM_CONNECTIONS} connections, "
+            f"mix {dict(zip(query_ids, weights))}:\n{summary}"
+        )
+    if OUTPUT:
+        histograms = pl.concat(
+            [
+                getattr(step, kind)
+                .to_frame()
+                .select(
+                    pl.lit(step.rate).alias("offered_per_s"),
+                    pl.lit(kind).alias("latency"),
+                    pl.all(),
+                )
+                for step in steps
+                for kind in ["service", "response"]
+            ]
+        )
+        histograms.write_parquet(OUTPUT)
+        print(f"Wrote the latency histograms to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Open-loop Poisson load over a Kùzu connection pool, swept to saturation")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database")
+    parser.add_argument("--mix", type=str, nargs="+", default=DEFAULT_MIX, help="Queries and their weights in the mix, as `id=weight`")
+    parser.add_argument("--rates", type=float, nargs="+", default=None, help="Arrival rates to run, in queries per second (default: a geometric sweep)")
+    parser.add_argument("--start_rate", type=float, default=10.0, help="First rate of the geometric sweep")
+    parser.add_argument("--factor", type=float, default=2.0, help="Rate multiplier between steps of the sweep")
+    parser.add_argument("--max_steps", type=int, default=10, help="Most steps in the sweep")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="Seconds of arrivals at each rate")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Shortfall of the achieved rate below the offered rate that counts as saturated")
+    parser.add_argument("--connections", "-c", type=int, default=4, help="Number of pooled connections (and worker threads)")
+    parser.add_argument("--num_threads", type=int, default=1, help="Kùzu threads per connection")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the arrival times and the query mix")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Optional parquet file to write the histograms to")
+    args = parser.parse_args()
+    # fmt: on
+
+    DB_PATH = args.db
+    MIX = args.mix
+    RATES = args.rates
+    START_RATE = args.start_rate
+    FACTOR = args.factor
+    MAX_STEPS = args.max_steps
+    DURATION_S = args.duration
+    TOLERANCE = args.tolerance
+    NUM_CONNECTIONS = args.connections
+    NUM_THREADS = args.num_threads
+    SEED = args.seed
+    OUTPUT = args.output
+    main()
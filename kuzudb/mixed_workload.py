@@ -0,0 +1,293 @@
+"""
+Mixed read/write workload: a writer stream of new `Follows` and `LivesIn` edges at a target rate,
+while reader threads run the registry's queries, to measure how Kùzu's single writer and its
+checkpoints affect the readers.
+
+Kùzu runs one write transaction at a time alongside any number of read transactions, and
+checkpoints the write-ahead log (WAL) into the database files once it outgrows a threshold. A
+checkpoint waits for the running transactions to finish and holds up new ones while it runs, so it
+is where writers and readers stall each other. Each phase runs the readers closed-loop for a fixed
+duration, first alone as the baseline, then with the writer at every batch size: one edge per
+transaction, and batches of edges in one `UNWIND` transaction. The writer is paced to the target
+rate in edges per second, and a commit that shrinks the WAL file is counted as a checkpoint.
+A checkpoint that times out waiting for the readers' transactions to finish rolls its write
+transaction back, and is counted separately; its edges are not counted as written.
+
+For each phase, it reports the writer's achieved rate and commit latency, the checkpoints and their
+duration, and the readers' throughput and latency percentiles, relative to the baseline and during
+checkpoints. It runs on a temporary copy of the database, since the writer adds edges to it.
+
+    python mixed_workload.py --rate 500 --batch_sizes 1 100 --readers 4 --duration 10
+"""
+
+import argparse
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import kuzu
+import numpy as np
+import polars as pl
+
+from loadgen import DEFAULT_MIX, parse_mix
+from query import execute_query
+
+CREATE_FOLLOWS = """
+    UNWIND $rows AS row
+    MATCH (a:Person {id: row.from}), (b:Person {id: row.to})
+    CREATE (a)-[:Follows {weight: 1 + abs(a.age - b.age)}]->(b)
+"""
+CREATE_LIVES_IN = """
+    UNWIND $rows AS row
+    MATCH (p:Person {id: row.from}), (c:City {id: row.to})
+    CREATE (p)-[:LivesIn]->(c)
+"""
+
+
+@dataclass
+class WriterStats:
+    num_edges: int = 0
+    # Start and end of every write transaction, and its outcome: "commit", "checkpoint" if the WAL
+    # shrank during it, or "checkpoint_timeout" if its checkpoint gave up waiting for the readers
+    commits: list[tuple[float, float]] = field(default_factory=list)
+    outcomes: list[str] = field(default_factory=list)
+
+
+class EdgeWriter:
+    """Creates random `Follows` and `LivesIn` edges between existing nodes, paced to a rate"""
+
+    def __init__(self, conn: kuzu.Connection, db_path: str, lives_in_share: float, seed: int):
+        self.conn = conn
+        self.wal_path = os.path.join(db_path, ".wal")
+        self.person_ids = conn.execute("MATCH (p:Person) RETURN p.id").get_as_pl()[:, 0].to_numpy()
+        self.city_ids = conn.execute("MATCH (c:City) RETURN c.id").get_as_pl()[:, 0].to_numpy()
+        self.lives_in_share = lives_in_share
+        self.rng = np.random.default_rng(seed)
+
+    def wal_size(self) -> int:
+        return os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0
+
+    def batch(self, size: int) -> tuple[str, list[dict[str, int]]]:
+        """A batch of either kind of edge, with the kind drawn by `lives_in_share`"""
+        sources = self.rng.choice(self.person_ids, size)
+        if self.rng.random() < self.lives_in_share:
+            cypher, targets = CREATE_LIVES_IN, self.rng.choice(self.city_ids, size)
+        else:
+            cypher, targets = CREATE_FOLLOWS, self.rng.choice(self.person_ids, size)
+        rows = [{"from": int(a), "to": int(b)} for a, b in zip(sources, targets)]
+        return cypher, rows
+
+    def run(self, rate: float, batch_size: int, stop: threading.Event) -> WriterStats:
+        """
+        Commit a batch every `batch_size / rate` seconds until stopped, starting the next one at
+        once when a commit runs late
+        """
+        stats = WriterStats()
+        interval = batch_size / rate
+        next_start = time.perf_counter()
+        while not stop.is_set():
+            delay = next_start - time.perf_counter()
+            if delay > 0 and stop.wait(delay):
+                break
+            cypher, rows = self.batch(batch_size)
+            wal_size = self.wal_size()
+            start = time.perf_counter()
+            try:
+                self.conn.execute(cypher, parameters={"rows": rows})
+            except RuntimeError as e:
+                if "checkpoint" not in str(e):
+                    raise
+                outcome = "checkpoint_timeout"
+            else:
+                outcome = "checkpoint" if self.wal_size() < wal_size else "commit"
+                stats.num_edges += batch_size
+            stats.commits.append((start, time.perf_counter()))
+            stats.outcomes.append(outcome)
+            next_start = max(next_start + interval, start)
+        return stats
+
+
+def run_reader(
+    conn: kuzu.Connection, query_ids: list[int], seed: int, stop: threading.Event, out: list
+) -> None:
+    """Run queries from the mix closed-loop until stopped, appending (start, end) of each"""
+    rng = np.random.default_rng(seed)
+    while not stop.is_set():
+        query_id = int(rng.choice(query_ids))
+        start = time.perf_counter()
+        execute_query(conn, query_id, verbose=False)
+        out.append((start, time.perf_counter()))
+
+
+def run_phase(
+    db: kuzu.Database,
+    db_path: str,
+    num_readers: int,
+    query_ids: list[int],
+    duration_s: float,
+    rate: float | None = None,
+    batch_size: int = 1,
+    lives_in_share: float = 0.1,
+    seed: int = 0,
+) -> tuple[np.ndarray, WriterStats | None, float]:
+    """
+    Run the readers, and the writer if a rate is given, for `duration_s`. A reader or writer that
+    fails stops the phase early, and its exception is raised here.
+    """
+    stop = threading.Event()
+    reads = [[] for _ in range(num_readers)]
+    workers = [
+        functools.partial(
+            run_reader, kuzu.Connection(db, num_threads=1), query_ids, seed + i, stop, reads[i]
+        )
+        for i in range(num_readers)
+    ]
+    if rate is not None:
+        writer = EdgeWriter(kuzu.Connection(db, num_threads=1), db_path, lives_in_share, seed)
+        workers.append(functools.partial(writer.run, rate, batch_size, stop))
+    with ThreadPoolExecutor(len(workers), thread_name_prefix="mixed-workload") as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(worker) for worker in workers]
+        wait(futures, timeout=duration_s, return_when=FIRST_EXCEPTION)
+        stop.set()
+        # Raises the first failure, after the other workers were told to stop
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    reads = np.array([read for reader in reads for read in reader]).reshape(-1, 2)
+    return reads, futures[-1].result() if rate is not None else None, elapsed
+
+
+def overlapping(intervals: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Which of `intervals` overlap any of `others`, both as (start, end) rows"""
+    if len(others) == 0:
+        return np.zeros(len(intervals), dtype=bool)
+    return (
+        (intervals[:, None, 0] < others[None, :, 1]) & (intervals[:, None, 1] > others[None, :, 0])
+    ).any(axis=1)
+
+
+def summarize(
+    phase: str, reads: np.ndarray, writer: WriterStats | None, elapsed: float, rate: float | None
+) -> dict:
+    latencies = reads[:, 1] - reads[:, 0]
+    row = {
+        "phase": phase,
+        "target_edges_per_s": rate,
+        "edges_per_s": writer.num_edges / elapsed if writer else None,
+        "commit_p50_ms": None,
+        "commit_p99_ms": None,
+        "checkpoints": None,
+        "checkpoint_timeouts": None,
+        "checkpoint_max_ms": None,
+        "reads_per_s": len(reads) / elapsed,
+        "read_p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "read_p99_ms": 1000 * float(np.percentile(latencies, 99)),
+        "read_max_ms": 1000 * float(latencies.max()),
+        "read_p99_in_checkpoint_ms": None,
+    }
+    if writer and writer.commits:
+        commits = np.array(writer.commits)
+        commit_ms = 1000 * (commits[:, 1] - commits[:, 0])
+        outcomes = np.array(writer.outcomes)
+        checkpoints = commits[outcomes != "commit"]
+        row["commit_p50_ms"] = float(np.percentile(commit_ms, 50))
+        row["commit_p99_ms"] = float(np.percentile(commit_ms, 99))
+        row["checkpoints"] = int((outcomes == "checkpoint").sum())
+        row["checkpoint_timeouts"] = int((outcomes == "checkpoint_timeout").sum())
+        if len(checkpoints):
+            row["checkpoint_max_ms"] = float(1000 * (checkpoints[:, 1] - checkpoints[:, 0]).max())
+            during = latencies[overlapping(reads, checkpoints)]
+            if len(during):
+                row["read_p99_in_checkpoint_ms"] = 1000 * float(np.percentile(during, 99))
+    return row
+
+
+def run_workload(
+    db_path: str,
+    num_readers: int,
+    query_ids: list[int],
+    duration_s: float,
+    rate: float,
+    batch_sizes: list[int],
+    lives_in_share: float = 0.1,
+    checkpoint_threshold: int = -1,
+    seed: int = 0,
+) -> pl.DataFrame:
+    """The baseline and one phase per batch size, on the database at `db_path`"""
+    db = kuzu.Database(db_path, checkpoint_threshold=checkpoint_threshold)
+    # Warm up every query before the baseline
+    conn = kuzu.Connection(db, num_threads=1)
+    for query_id in query_ids:
+        execute_query(conn, query_id, verbose=False)
+    readers_only = run_phase(db, db_path, num_readers, query_ids, duration_s)
+    rows = [summarize("readers only", *readers_only, None)]
+    for batch_size in batch_sizes:
+        reads, writer, elapsed = run_phase(
+            db, db_path, num_readers, query_ids, duration_s, rate, batch_size, lives_in_share, seed
+        )
+        rows.append(summarize(f"writer batch {batch_size}", reads, writer, elapsed, rate))
+    results = pl.DataFrame(rows, infer_schema_length=None)
+    baseline = results.row(0, named=True)
+    return results.with_columns(
+        (pl.col("read_p50_ms") / baseline["read_p50_ms"]).alias("read_p50_slowdown"),
+        (pl.col("read_p99_ms") / baseline["read_p99_ms"]).alias("read_p99_slowdown"),
+    )
+
+
+def main() -> None:
+    query_ids, _ = parse_mix(MIX)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "social_network")
+        shutil.copytree(DB_PATH, db_path)
+        results = run_workload(
+            db_path,
+            NUM_READERS,
+            query_ids,
+            DURATION_S,
+            RATE,
+            BATCH_SIZES,
+            LIVES_IN_SHARE,
+            CHECKPOINT_THRESHOLD,
+            SEED,
+        )
+    # One column per phase, as there are more metrics than phases
+    table = results.select(pl.col("phase"), pl.exclude("phase").cast(pl.Float64).round(2))
+    table = table.transpose(include_header=True, header_name="metric", column_names="phase")
+    with pl.Config(tbl_rows=table.height, tbl_cols=table.width):
+        print(
+            f"{NUM_READERS} readers over queries {query_ids} for {DURATION_S:g}s per phase, "
+            f"writer at {RATE:g} edges/s:\n{table}"
+        )
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Measure reader latency and checkpoint stalls under a stream of edge inserts")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database (copied, not modified)")
+    parser.add_argument("--rate", type=float, default=500.0, help="Target edges per second of the writer")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 100], help="Edges per write transaction, one phase each")
+    parser.add_argument("--lives_in_share", type=float, default=0.1, help="Share of the write transactions that create LivesIn rather than Follows edges")
+    parser.add_argument("--readers", "-r", type=int, default=4, help="Number of reader threads, each with its own connection")
+    parser.add_argument("--queries", "-q", type=int, nargs="+", default=parse_mix(DEFAULT_MIX)[0], help="Queries the readers run")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--checkpoint_threshold", type=int, default=-1, help="WAL size in bytes that triggers a checkpoint (-1 keeps Kùzu's default)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the edges and the readers' queries")
+    args = parser.parse_args()
+    # fmt: on
+
+    DB_PATH = args.db
+    RATE = args.rate
+    BATCH_SIZES = args.batch_sizes
+    LIVES_IN_SHARE = args.lives_in_share
+    NUM_READERS = args.readers
+    MIX = [str(query_id) for query_id in args.queries]
+    DURATION_S = args.duration
+    CHECKPOINT_THRESHOLD = args.checkpoint_threshold
+    SEED = args.seed
+    main()
@@ -0,0 +1,120 @@
+"""
+Run the registry's queries on a pool of worker processes, each with its own read-only Kùzu database.
+
+With many concurrent clients in one process, the Python-side work around each query (conversion
+of the result to polars and onward) is serialized by the GIL. Here each worker process opens the
+database with `read_only=True`, so any number of them can share it, and runs the same
+`execute_query` as `query.py`. Results travel back to the caller as Arrow IPC buffers, which are
+cheap to write and read without going through Python objects.
+
+    python process_pool.py --workers 1 2 4 8 --requests 400
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Any
+
+import kuzu
+import polars as pl
+
+from query import QUERIES_BY_ID, Params, execute_query
+
+# Connection of the current worker process, opened by `init_worker`
+_CONNECTION: kuzu.Connection | None = None
+
+
+def init_worker(db_path: str, num_threads: int) -> None:
+    global _CONNECTION
+    db = kuzu.Database(db_path, read_only=True)
+    _CONNECTION = kuzu.Connection(db, num_threads=num_threads)
+
+
+def run_in_worker(query_id: int, params: Params | None) -> bytes:
+    """Run a query on the worker's connection and return the result as an Arrow IPC buffer"""
+    result = execute_query(_CONNECTION, query_id, params, verbose=False)
+    return result.write_ipc(None).getvalue()
+
+
+def read_result(buffer: bytes) -> pl.DataFrame:
+    return pl.read_ipc(io.BytesIO(buffer))
+
+
+class ProcessQueryExecutor:
+    def __init__(self, db_path: str, num_workers: int, num_threads: int = 1) -> None:
+        # Spawn rather than fork, so workers don't inherit the parent's threads
+        self.pool = ProcessPoolExecutor(
+            num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(db_path, num_threads),
+        )
+
+    def __enter__(self) -> "ProcessQueryExecutor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.pool.shutdown()
+
+    def submit(self, query_id: int, params: Params | None = None) -> Future[bytes]:
+        if query_id not in QUERIES_BY_ID:
+            raise ValueError(f"Unknown query `{query_id}`")
+        return self.pool.submit(run_in_worker, query_id, params)
+
+    def run(self, query_id: int, params: Params | None = None) -> pl.DataFrame:
+        return read_result(self.submit(query_id, params).result())
+
+    def warm_up(self, num_workers: int) -> None:
+        """Start every worker (and open its database) before timing"""
+        wait([self.submit(8) for _ in range(num_workers * 2)])
+
+
+def measure_throughput(num_workers: int, query_ids: list[int]) -> dict[str, Any]:
+    with ProcessQueryExecutor(DB_PATH, num_workers, NUM_THREADS) as executor:
+        executor.warm_up(num_workers)
+        start = time.perf_counter()
+        futures = [executor.submit(query_id) for query_id in query_ids]
+        num_bytes = sum(len(future.result()) for future in futures)
+        elapsed = time.perf_counter() - start
+    return {
+        "workers": num_workers,
+        "requests": len(query_ids),
+        "seconds": elapsed,
+        "queries_per_s": len(query_ids) / elapsed,
+        "result_kb": num_bytes / 1024,
+    }
+
+
+def main() -> None:
+    # The same mixed workload for every pool size
+    query_ids = random.Random(SEED).choices(QUERY_IDS, k=NUM_REQUESTS)
+    results = [measure_throughput(num_workers, query_ids) for num_workers in WORKERS]
+    results_df = pl.DataFrame(results).with_columns(
+        (pl.col("queries_per_s") / pl.col("queries_per_s").first()).alias("speedup")
+    )
+    print(f"Throughput for {NUM_REQUESTS} requests over queries {QUERY_IDS}:\n{results_df}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Measure query throughput on a pool of read-only worker processes")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database")
+    parser.add_argument("--workers", "-w", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()], help="Pool sizes to measure")
+    parser.add_argument("--num_threads", type=int, default=1, help="Kùzu threads per worker connection")
+    parser.add_argument("--queries", "-q", type=int, nargs="+", default=sorted(QUERIES_BY_ID), help="Queries in the mixed workload")
+    parser.add_argument("--requests", "-n", type=int, default=400, help="Number of requests per pool size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the order of the mixed workload")
+    args = parser.parse_args()
+    # fmt: on
+
+    DB_PATH = args.db
+    WORKERS = sorted(set(args.workers))
+    NUM_THREADS = args.num_threads
+    QUERY_IDS = args.queries
+    NUM_REQUESTS = args.requests
+    SEED = args.seed
+    main()
@@ -0,0 +1,138 @@
+"""
+Long-lived query server that keeps the Kùzu database open across requests.
+
+The server holds one `kuzu.Database` and a pool of `Connection`s, and answers requests for the
+registry's queries over a Unix socket (or a localhost TCP port). Each request is a line of JSON,
+`{"query": 3, "params": {"country": "Canada"}}`, and each response is a line of JSON holding the
+result rows. Requests are read by an asyncio event loop and dispatched to worker threads, each of
+which borrows a connection from the pool for the duration of the query, so a client pays for a
+socket round-trip instead of interpreter start, imports and opening the database.
+
+    python server.py --connections 4
+    python client.py --query 3 --params '{"country": "Canada"}'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator
+
+import kuzu
+
+from query import QUERIES_BY_ID, execute_query
+
+SOCKET_PATH = Path("/tmp/kuzu_social_network.sock")
+
+# Custom types
+JsonBlob = dict[str, Any]
+
+
+class ConnectionPool:
+    """A fixed set of connections to one database, each used by one thread at a time"""
+
+    def __init__(self, db: kuzu.Database, size: int, num_threads: int = 0) -> None:
+        self.connections: queue.Queue[kuzu.Connection] = queue.Queue()
+        for _ in range(size):
+            self.connections.put(kuzu.Connection(db, num_threads=num_threads))
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[kuzu.Connection]:
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+
+class QueryServer:
+    def __init__(self, db: kuzu.Database, num_connections: int, num_threads: int = 0) -> None:
+        self.pool = ConnectionPool(db, num_connections, num_threads)
+        self.executor = ThreadPoolExecutor(num_connections, thread_name_prefix="kuzu-query")
+        self.num_requests = 0
+
+    def run_query(self, query_id: int, params: JsonBlob | None) -> JsonBlob:
+        """Run a registry query on a pooled connection (called on a worker thread)"""
+        with self.pool.connection() as conn:
+            start = time.perf_counter()
+            result = execute_query(conn, query_id, params, verbose=False)
+            elapsed = time.perf_counter() - start
+        return {"ok": True, "rows": result.to_dicts(), "elapsed_s": elapsed}
+
+    async def handle_request(self, request: Any) -> JsonBlob:
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Invalid request: expected a JSON object"}
+        if request.get("op") == "ping":
+            return {"ok": True}
+        query_id = request.get("query")
+        # Checked before the lookup, since lists and objects are unhashable and `true` equals 1
+        if not isinstance(query_id, int) or isinstance(query_id, bool):
+            return {"ok": False, "error": f"Invalid query ID `{query_id}`, expected an integer"}
+        if query_id not in QUERIES_BY_ID:
+            return {"ok": False, "error": f"Unknown query `{query_id}`"}
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, self.run_query, query_id, request.get("params")
+            )
+        except (ValueError, TypeError, RuntimeError) as e:
+            # Invalid parameters (from the registry) or a failed query (from Kùzu)
+            return {"ok": False, "error": str(e)}
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except ValueError as e:
+                    # Malformed JSON, or bytes that are not UTF-8 (both subclass ValueError)
+                    response = {"ok": False, "error": f"Invalid request: {e}"}
+                self.num_requests += 1
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: Path | None = None, port: int | None = None) -> None:
+        if port is not None:
+            server = await asyncio.start_server(self.handle_client, "127.0.0.1", port)
+            address = f"127.0.0.1:{port}"
+        else:
+            socket_path.unlink(missing_ok=True)
+            server = await asyncio.start_unix_server(self.handle_client, str(socket_path))
+            address = str(socket_path)
+        print(f"Serving Kùzu queries on {address} with {self.pool.connections.qsize()} connections")
+        async with server:
+            await server.serve_forever()
+
+
+def main() -> None:
+    db = kuzu.Database(DB_PATH, read_only=True)
+    server = QueryServer(db, NUM_CONNECTIONS, NUM_THREADS)
+    try:
+        asyncio.run(server.serve(SOCKET, PORT))
+    except KeyboardInterrupt:
+        print(f"Served {server.num_requests} requests")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Serve the Kùzu queries from a long-lived process")
+    parser.add_argument("--db", type=str, default="./social_network", help="Path to the Kùzu database")
+    parser.add_argument("--socket", type=Path, default=SOCKET_PATH, help="Unix socket to listen on")
+    parser.add_argument("--port", type=int, default=None, help="Listen on this localhost TCP port instead of a Unix socket")
+    parser.add_argument("--connections", "-c", type=int, default=4, help="Number of pooled connections (and worker threads)")
+    parser.add_argument("--num_threads", type=int, default=0, help="Threads per connection (0 lets Kùzu decide)")
+    args = parser.parse_args()
+    # fmt: on
+
+    DB_PATH = args.db
+    SOCKET = args.socket
+    PORT = args.port
+    NUM_CONNECTIONS = args.connections
+    NUM_THREADS = args.num_threads
+    main()
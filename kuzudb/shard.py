@@ -0,0 +1,310 @@
+"""
+Sharded mode: persons are split across several Kùzu databases, and a coordinator runs each query
+on every shard in parallel and merges the partial results.
+
+- Persons are assigned to shards by ID hash (`id % num_shards`), or by the country they live in
+  (countries are packed onto shards greedily by number of persons)
+- A shard holds its own persons with their `LivesIn` and `HasInterest` edges, and a full copy of
+  the small City/State/Country/Interest tables and the edges between them
+- A `Follows` edge is stored on the shard that owns the *followed* person, so that every person's
+  follower count is complete on one shard. When the follower lives on another shard, it is added
+  to the followed person's shard as a ghost `Person` that has only an ID: ghosts have no `LivesIn`
+  or `HasInterest` edges, so they never count towards the per-person aggregates of queries 3-7
+- Shards return partial aggregates (counts, and sums and counts in place of averages) without
+  their LIMIT, and the coordinator combines them and applies the ranking and LIMIT of the spec
+
+Queries 1-7 are supported. Queries 8 and 9 count two-hop paths whose edges live on different
+shards, which would need a shuffle of the middle persons' edges between shards.
+
+    python shard.py build --shards 4 --partition country
+    python shard.py query --rounds 5
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import kuzu
+import polars as pl
+
+import build_graph
+import query  # noqa: F401 (adds the repo root to the path)
+from workload import QUERIES, QUERIES_BY_ID, KuzuBackend, Params, QuerySpec, time_suite
+from workload.reference import ReferenceBackend
+
+sys.path.append(str(build_graph.DATA_PATH))
+from parquet_writer import ParquetWriterConfig, write_parquet  # noqa: E402
+
+SHARDS_PATH = Path("./shards")
+
+
+# --- Partitioned build ---
+
+
+def assign_by_hash(persons: pl.DataFrame, num_shards: int) -> pl.DataFrame:
+    return persons.select("id", (pl.col("id") % num_shards).alias("shard"))
+
+
+def assign_by_country(
+    persons: pl.DataFrame, lives_in: pl.DataFrame, cities: pl.DataFrame, num_shards: int
+) -> pl.DataFrame:
+    """Keep everyone in a country on one shard, packing countries from the most persons down"""
+    person_country = lives_in.join(
+        cities.select(pl.col("id").alias("to"), "country"), on="to"
+    ).select(pl.col("from").alias("id"), "country")
+    country_sizes = person_country.group_by("country").len().sort("len", descending=True)
+    loads = [0] * num_shards
+    country_shard = {}
+    for country, size in country_sizes.iter_rows():
+        shard = loads.index(min(loads))
+        country_shard[country] = shard
+        loads[shard] += size
+    shards = pl.DataFrame(
+        {"country": list(country_shard), "shard": list(country_shard.values())},
+        schema={"country": pl.String, "shard": pl.Int64},
+    )
+    return (
+        persons.select("id")
+        .join(person_country.join(shards, on="country"), on="id", how="left")
+        # Persons without a city fall back to the ID hash
+        .select("id", pl.col("shard").fill_null(pl.col("id") % num_shards))
+    )
+
+
+def write_shard_files(
+    shard: int,
+    assignment: pl.DataFrame,
+    data_path: Path,
+    nodes_path: Path,
+    edges_path: Path,
+    config: ParquetWriterConfig = ParquetWriterConfig(),
+) -> dict[str, int]:
+    """Write the parquet files of one shard and return its row counts"""
+    (data_path / "nodes").mkdir(parents=True, exist_ok=True)
+    (data_path / "edges").mkdir(parents=True, exist_ok=True)
+    owned = assignment.filter(pl.col("shard") == shard).select("id")
+
+    persons = pl.read_parquet(nodes_path / "persons.parquet")
+    follows = pl.read_parquet(edges_path / "follows.parquet").join(
+        owned.rename({"id": "to"}), on="to", how="semi"
+    )
+    owned_persons = persons.join(owned, on="id", how="semi")
+    # Followers that live on another shard, as ID-only ghost persons
+    ghosts = follows.select(pl.col("from").alias("id")).unique().join(owned, on="id", how="anti")
+    write_parquet(
+        pl.concat([owned_persons, ghosts], how="diagonal"),
+        data_path / "nodes" / "persons.parquet",
+        config,
+    )
+    write_parquet(follows, data_path / "edges" / "follows.parquet", config)
+    for filename in ("lives_in.parquet", "interested_in.parquet"):
+        edges = pl.read_parquet(edges_path / filename)
+        write_parquet(
+            edges.join(owned.rename({"id": "from"}), on="from", how="semi"),
+            data_path / "edges" / filename,
+            config,
+        )
+    # Replicate the small location and interest tables to every shard
+    for filename in ("cities.parquet", "states.parquet", "countries.parquet", "interests.parquet"):
+        shutil.copy(nodes_path / filename, data_path / "nodes" / filename)
+    for filename in ("city_in.parquet", "state_in.parquet"):
+        shutil.copy(edges_path / filename, data_path / "edges" / filename)
+    return {
+        "shard": shard,
+        "persons": owned_persons.height,
+        "ghost_persons": ghosts.height,
+        "follows": follows.height,
+        "cross_shard_follows": follows.join(
+            owned.rename({"id": "from"}), on="from", how="anti"
+        ).height,
+    }
+
+
+def build_shards(
+    num_shards: int,
+    partition: str,
+    shards_path: Path = SHARDS_PATH,
+    nodes_path: Path = build_graph.NODES_PATH,
+    edges_path: Path = build_graph.EDGES_PATH,
+    config: ParquetWriterConfig = ParquetWriterConfig(),
+) -> pl.DataFrame:
+    shutil.rmtree(shards_path, ignore_errors=True)
+    persons = pl.read_parquet(nodes_path / "persons.parquet", columns=["id"])
+    if partition == "country":
+        assignment = assign_by_country(
+            persons,
+            pl.read_parquet(edges_path / "lives_in.parquet"),
+            pl.read_parquet(nodes_path / "cities.parquet"),
+            num_shards,
+        )
+    else:
+        assignment = assign_by_hash(persons, num_shards)
+
+    stats = []
+    for shard in range(num_shards):
+        data_path = shards_path / "data" / f"shard_{shard}"
+        stats.append(
+            write_shard_files(shard, assignment, data_path, nodes_path, edges_path, config)
+        )
+        db = kuzu.Database(str(shards_path / f"shard_{shard}"))
+        conn = kuzu.AsyncConnection(db)
+        asyncio.run(build_graph.main(conn, data_path / "nodes", data_path / "edges"))
+        conn.close()
+        db.close()
+    manifest = {"partition": partition, "num_shards": num_shards, "shards": stats}
+    (shards_path / "shards.json").write_text(json.dumps(manifest, indent=2))
+    return pl.DataFrame(stats)
+
+
+# --- Scatter-gather queries ---
+
+
+@dataclass(frozen=True)
+class ShardQuery:
+    # Cypher run on every shard, returning partial results
+    cypher: str
+    # Combine the concatenated partial results of all shards into the final result
+    merge: Callable[[QuerySpec, pl.DataFrame], pl.DataFrame]
+
+
+def top_k(spec: QuerySpec, partials: pl.DataFrame) -> pl.DataFrame:
+    """Each row is complete on one shard: rank the union of every shard's top-k"""
+    return partials.sort(spec.rank_by, descending=True).head(spec.limit)
+
+
+def sum_counts(keys: list[str], count: str):
+    """Add up each group's counts over the shards, then rank the groups"""
+
+    def merge(spec: QuerySpec, partials: pl.DataFrame) -> pl.DataFrame:
+        if not keys:
+            return partials.select(pl.col(count).sum())
+        merged = partials.group_by(keys).agg(pl.col(count).sum())
+        ranked = merged.sort([count, *keys], descending=[True] + [False] * len(keys))
+        return ranked.head(spec.limit).select(partials.columns)
+
+    return merge
+
+
+def average_age(spec: QuerySpec, partials: pl.DataFrame) -> pl.DataFrame:
+    return (
+        partials.group_by("city")
+        # Kùzu sums INT64 as INT128, which arrives as a decimal
+        .agg(
+            (pl.col("sumAge").cast(pl.Float64).sum() / pl.col("numAges").sum()).alias("averageAge")
+        )
+        .sort("averageAge", "city")
+        .head(spec.limit)
+    )
+
+
+SHARD_QUERIES = {
+    1: ShardQuery(QUERIES_BY_ID[1].cypher["kuzu"], top_k),
+    2: ShardQuery(QUERIES_BY_ID[2].cypher["kuzu"], top_k),
+    3: ShardQuery(
+        """
+        MATCH (p:Person) -[:LivesIn]-> (c:City) -[*1..2]-> (co:Country)
+        WHERE co.country = $country
+        RETURN c.city AS city, sum(p.age) AS sumAge, count(p.age) AS numAges;
+        """,
+        average_age,
+    ),
+    4: ShardQuery(
+        """
+        MATCH (p:Person)-[:LivesIn]->(ci:City)-[*1..2]->(country:Country)
+        WHERE p.age >= $age_lower AND p.age <= $age_upper
+        RETURN country.country AS countries, count(country) AS personCounts;
+        """,
+        sum_counts(["countries"], "personCounts"),
+    ),
+    5: ShardQuery(QUERIES_BY_ID[5].cypher["kuzu"], sum_counts([], "numPersons")),
+    6: ShardQuery(
+        """
+        MATCH (p:Person)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower($interest)
+        AND lower(p.gender) = lower($gender)
+        WITH p, i
+        MATCH (p)-[:LivesIn]->(c:City)
+        RETURN count(p.id) AS numPersons, c.city AS city, c.country AS country
+        """,
+        sum_counts(["city", "country"], "numPersons"),
+    ),
+    7: ShardQuery(
+        """
+        MATCH (p:Person)-[:LivesIn]->(:City)-[:CityIn]->(s:State)
+        WHERE p.age >= $age_lower AND p.age <= $age_upper AND s.country = $country
+        WITH p, s
+        MATCH (p)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower($interest)
+        RETURN count(p.id) AS numPersons, s.state AS state, s.country AS country
+        """,
+        sum_counts(["state", "country"], "numPersons"),
+    ),
+}
+
+
+class ShardedBackend:
+    """Runs the supported queries on every shard in parallel, through the shared executor"""
+
+    name = "kuzu-sharded"
+
+    def __init__(self, shards_path: Path = SHARDS_PATH, num_threads: int = 0) -> None:
+        manifest = json.loads((shards_path / "shards.json").read_text())
+        self.connections = [
+            kuzu.Connection(
+                kuzu.Database(str(shards_path / f"shard_{shard}"), read_only=True),
+                num_threads=num_threads,
+            )
+            for shard in range(manifest["num_shards"])
+        ]
+        self.executor = ThreadPoolExecutor(len(self.connections))
+
+    def supports(self, spec: QuerySpec) -> bool:
+        return spec.id in SHARD_QUERIES
+
+    def run(self, spec: QuerySpec, params: Params) -> pl.DataFrame:
+        query = SHARD_QUERIES[spec.id]
+        partials = self.executor.map(
+            lambda conn: conn.execute(query.cypher, parameters=params).get_as_pl(),
+            self.connections,
+        )
+        return query.merge(spec, pl.concat(list(partials)))
+
+
+def main() -> None:
+    if COMMAND == "build":
+        stats = build_shards(NUM_SHARDS, PARTITION, SHARDS)
+        print(f"Built {NUM_SHARDS} shards partitioned by {PARTITION}:\n{stats}")
+        return
+    db = kuzu.Database("./social_network", read_only=True)
+    backends = [KuzuBackend(kuzu.Connection(db, num_threads=0)), ShardedBackend(SHARDS)]
+    specs = [spec for spec in QUERIES if spec.id in SHARD_QUERIES]
+    timings = time_suite(
+        backends, specs, rounds=ROUNDS, reference=ReferenceBackend.from_parquet()
+    )
+    summary = timings.pivot(on="backend", index="query", values="mean_s")
+    print(f"Mean run time (s) over {ROUNDS} rounds, results checked:\n{summary}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Build sharded Kùzu databases and run the queries across them")
+    parser.add_argument("command", choices=["build", "query"], help="Build the shards, or time the queries on them against the single database")
+    parser.add_argument("--shards_path", type=Path, default=SHARDS_PATH, help="Directory for the shard databases")
+    parser.add_argument("--shards", "-s", type=int, default=4, help="Number of shards to build")
+    parser.add_argument("--partition", choices=["hash", "country"], default="hash", help="Split persons by ID hash or by country")
+    parser.add_argument("--rounds", "-r", type=int, default=5, help="Timed rounds per query")
+    args = parser.parse_args()
+    # fmt: on
+
+    COMMAND = args.command
+    SHARDS = args.shards_path
+    NUM_SHARDS = args.shards
+    PARTITION = args.partition
+    ROUNDS = args.rounds
+    main()
@@ -0,0 +1,100 @@
+"""
+Sweep parquet writer settings against Kùzu's COPY load time.
+
+For each combination of settings, the generated parquet files are rewritten to a scratch
+directory with `data/parquet_writer.py` and a fresh database is built from them with
+`build_graph.main`, so the data itself is identical across runs and only the file layout varies.
+"""
+
+import argparse
+import asyncio
+import itertools
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import kuzu
+import polars as pl
+from codetiming import Timer
+
+import build_graph
+
+sys.path.append(str(build_graph.DATA_PATH))
+from parquet_writer import COMPRESSION_CODECS, ParquetWriterConfig, write_parquet  # noqa: E402
+
+
+def rewrite_files(config: ParquetWriterConfig, out_path: Path) -> int:
+    """Rewrite every node and edge file with the given settings and return the total bytes written"""
+    total_bytes = 0
+    for kind, src_path in (("nodes", build_graph.NODES_PATH), ("edges", build_graph.EDGES_PATH)):
+        (out_path / kind).mkdir(parents=True, exist_ok=True)
+        for src in sorted(src_path.glob("*.parquet")):
+            dest = out_path / kind / src.name
+            write_parquet(pl.read_parquet(src), dest, config)
+            total_bytes += dest.stat().st_size
+    return total_bytes
+
+
+def time_build(data_path: Path, db_path: Path) -> tuple[float, float]:
+    """Build a fresh database from the rewritten files and return the (nodes, edges) load times"""
+    shutil.rmtree(db_path, ignore_errors=True)
+    db = kuzu.Database(str(db_path))
+    conn = kuzu.AsyncConnection(db)
+    Timer.timers.clear()
+    asyncio.run(build_graph.main(conn, data_path / "nodes", data_path / "edges"))
+    conn.close()
+    db.close()
+    return Timer.timers["nodes"], Timer.timers["edges"]
+
+
+def main() -> None:
+    configs = [
+        ParquetWriterConfig(compression, level, row_group_size, statistics)
+        for compression, level, row_group_size, statistics in itertools.product(
+            COMPRESSION, COMPRESSION_LEVEL, ROW_GROUP_SIZE, STATISTICS
+        )
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for config in configs:
+            data_path = Path(tmp_dir) / "data"
+            shutil.rmtree(data_path, ignore_errors=True)
+            num_bytes = rewrite_files(config, data_path)
+            timings = [time_build(data_path, Path(tmp_dir) / "db") for _ in range(ROUNDS)]
+            nodes_time = min(t[0] for t in timings)
+            edges_time = min(t[1] for t in timings)
+            results.append(
+                {
+                    "compression": config.compression,
+                    "level": config.compression_level,
+                    "row_group_size": config.row_group_size,
+                    "statistics": config.statistics,
+                    "size_mb": num_bytes / 1e6,
+                    "nodes_s": nodes_time,
+                    "edges_s": edges_time,
+                    "total_s": nodes_time + edges_time,
+                }
+            )
+    results_df = pl.DataFrame(results).sort("total_s")
+    with pl.Config(tbl_rows=len(results_df)):
+        print(f"\nKùzu load time by parquet writer settings (best of {ROUNDS} rounds):\n{results_df}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Sweep parquet writer settings against Kùzu load time")
+    parser.add_argument("--compression", nargs="+", default=["uncompressed", "snappy", "zstd"], choices=COMPRESSION_CODECS, help="Compression codecs to sweep")
+    parser.add_argument("--compression_level", nargs="+", type=int, default=[None], help="Compression levels to sweep")
+    parser.add_argument("--row_group_size", nargs="+", type=int, default=[16_384, 100_000, 1_000_000], help="Row group sizes to sweep")
+    parser.add_argument("--statistics", nargs="+", type=int, default=[1], choices=[0, 1], help="Statistics on (1) and/or off (0)")
+    parser.add_argument("--rounds", "-r", type=int, default=3, help="Number of builds per setting")
+    args = parser.parse_args()
+    # fmt: on
+
+    COMPRESSION = args.compression
+    COMPRESSION_LEVEL = args.compression_level
+    ROW_GROUP_SIZE = args.row_group_size
+    STATISTICS = [bool(s) for s in args.statistics]
+    ROUNDS = args.rounds
+    main()
@@ -0,0 +1,89 @@
+"""
+Check Kùzu's PageRank, WCC and degree centrality against the NumPy comparator, and the write-back
+of the top-k results to their own table. Runs on a copy of the database built by `build_graph.py`,
+since projecting a graph and writing the results need it opened read-write.
+"""
+import shutil
+
+import kuzu
+import numpy as np
+import polars as pl
+import pytest
+
+from analytics import (
+    RESULTS_TABLE,
+    page_rank_numpy,
+    run_analytics,
+    same_partition,
+    wcc_numpy,
+    write_top_k,
+)
+from workload.csr import CSR
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    path = tmp_path_factory.mktemp("analytics") / "social_network"
+    shutil.copytree("./social_network", path)
+    return kuzu.Connection(kuzu.Database(str(path)))
+
+
+@pytest.fixture(scope="module")
+def analytics_results(conn):
+    return run_analytics(conn)
+
+
+def test_engines_agree(analytics_results):
+    runs, _ = analytics_results
+    by_engine = {(run.algorithm, run.engine): run.result for run in runs}
+    kuzu_degrees = by_engine[("degree_centrality", "kuzu")]
+    assert kuzu_degrees.equals(by_engine[("degree_centrality", "numpy")])
+    if ("page_rank", "kuzu") not in by_engine:
+        pytest.skip("This version of Kùzu has no graph algorithms")
+    kuzu_ranks = by_engine[("page_rank", "kuzu")]["pageRank"].to_numpy()
+    numpy_ranks = by_engine[("page_rank", "numpy")]["pageRank"].to_numpy()
+    np.testing.assert_allclose(kuzu_ranks, numpy_ranks, atol=1e-9)
+    assert same_partition(
+        by_engine[("wcc", "kuzu")]["componentID"], by_engine[("wcc", "numpy")]["componentID"]
+    )
+
+
+def test_write_top_k(conn, analytics_results):
+    _, results = analytics_results
+    write_top_k(conn, results, 5)
+    top = conn.execute(
+        f"""
+        MATCH (a:{RESULTS_TABLE}) WHERE a.pageRank IS NOT NULL
+        RETURN a.id AS id ORDER BY a.pageRank DESC
+        """
+    ).get_as_pl()
+    expected = results["page_rank"].sort("pageRank", descending=True).head(5)
+    assert top["id"].to_list() == expected["id"].to_list()
+    # Writing again with a smaller k clears the persons that dropped out
+    write_top_k(conn, results, 2)
+    counts = conn.execute(
+        f"""
+        MATCH (a:{RESULTS_TABLE})
+        RETURN count(a.pageRank) AS ranks, count(a.degreeCentrality) AS degrees
+        """
+    ).get_as_pl()
+    assert counts.row(0) == (2, 2)
+    # The Person table keeps the schema that `build_graph.py` and its COPY statements expect
+    properties = conn.execute("CALL table_info('Person') RETURN name").get_as_pl()["name"]
+    assert properties.to_list() == ["id", "name", "gender", "birthday", "age", "isMarried"]
+
+
+def test_wcc_separate_components():
+    # 0 -> 1 <- 2, 3 -> 4, and 5 alone
+    follows = CSR.from_edges(np.array([0, 2, 3]), np.array([1, 1, 4]), 6)
+    labels, _ = wcc_numpy(follows)
+    assert same_partition(pl.Series(labels), pl.Series([0, 0, 0, 1, 1, 2]))
+    assert not same_partition(pl.Series(labels), pl.Series([0, 0, 0, 0, 1, 2]))
+
+
+def test_page_rank_cycle_is_uniform():
+    follows = CSR.from_edges(np.array([0, 1, 2]), np.array([1, 2, 0]), 3)
+    ranks, iterations = page_rank_numpy(follows)
+    np.testing.assert_allclose(ranks, 1 / 3)
+    assert iterations == 1
+
@@ -0,0 +1,45 @@
+"""
+Check the sampled path count estimator of queries 8 and 9 against the exact counts. Needs the
+database built by `build_graph.py`.
+"""
+from dataclasses import replace
+
+import kuzu
+import pytest
+
+from approx import PathCountEstimator
+from query import execute_query
+
+
+@pytest.fixture(scope="module")
+def conn():
+    return kuzu.Connection(kuzu.Database("./social_network", read_only=True))
+
+
+@pytest.fixture(scope="module")
+def estimator(conn):
+    return PathCountEstimator(conn)
+
+
+@pytest.mark.parametrize("sample_on", ["start", "middle"])
+@pytest.mark.parametrize("query_id", [8, 9])
+def test_full_sample_is_exact(conn, estimator, query_id, sample_on):
+    exact = execute_query(conn, query_id, verbose=False)["numPaths"][0]
+    estimate = estimator.estimate(query_id, fraction=1.0, sample_on=sample_on, seed=0)
+    assert estimate.sample_size == len(estimator.person_ids)
+    assert estimate.estimate == pytest.approx(exact)
+    # The finite population correction leaves no sampling error when everyone is sampled
+    assert estimate.lower == estimate.upper == estimate.estimate
+
+
+def test_fixed_seed_is_reproducible(estimator):
+    first = estimator.estimate(9, fraction=0.05, seed=3)
+    second = estimator.estimate(9, fraction=0.05, seed=3)
+    # Equal in everything but the time taken
+    assert replace(first, seconds=0) == replace(second, seconds=0)
+    assert first.lower < first.estimate < first.upper
+
+
+def test_other_queries_are_rejected(estimator):
+    with pytest.raises(ValueError, match="Only queries 8 and 9"):
+        estimator.estimate(3)
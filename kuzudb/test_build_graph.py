@@ -0,0 +1,115 @@
+"""
+Check that `build_graph.py` reuses a database built from the same parquet files, and rebuilds or
+copies a cached snapshot when the files or the database changed since.
+"""
+import shutil
+
+import kuzu
+import polars as pl
+import pytest
+
+import build_graph
+import query  # noqa: F401 (adds the repo root to the path)
+from build_graph import build_cached, manifest_path
+from workload import build_cache
+from workload.build_cache import source_digest
+from workload.reference import EDGES_PATH, NODES_PATH
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    for kind, src_path in (("nodes", NODES_PATH), ("edges", EDGES_PATH)):
+        shutil.copytree(src_path, tmp_path / "data" / kind)
+    return tmp_path / "data"
+
+
+def build(tmp_path, data_path, **kwargs):
+    return build_cached(
+        tmp_path / "social_network", data_path / "nodes", data_path / "edges", **kwargs
+    )
+
+
+def count_follows(db_path) -> int:
+    db = kuzu.Database(str(db_path))
+    count = kuzu.Connection(db).execute("MATCH ()-[f:Follows]->() RETURN count(f)")
+    count = count.get_as_pl().item()
+    db.close()
+    return count
+
+
+def test_database_is_reused_until_inputs_change(tmp_path, data_path):
+    assert build(tmp_path, data_path) == "built"
+    # Opening the database for queries does not invalidate it
+    num_follows = count_follows(tmp_path / "social_network")
+    assert build(tmp_path, data_path) == "reused"
+    follows_path = data_path / "edges" / "follows.parquet"
+    pl.read_parquet(follows_path).head(100).write_parquet(follows_path)
+    assert build(tmp_path, data_path) == "built"
+    assert count_follows(tmp_path / "social_network") == 100 < num_follows
+    assert build(tmp_path, data_path, force=True) == "built"
+
+
+def test_unchanged_database_is_not_hashed_or_opened(tmp_path, data_path, monkeypatch):
+    assert build(tmp_path, data_path) == "built"
+    assert manifest_path(tmp_path / "social_network").is_file()
+    assert not (tmp_path / "social_network" / "build_manifest.json").exists()
+    hashed, opened = [], []
+    file_digest, database_schema = build_cache.file_digest, build_graph.database_schema
+
+    def recording_file_digest(path):
+        hashed.append(path)
+        return file_digest(path)
+
+    def recording_database_schema(path):
+        opened.append(path)
+        return database_schema(path)
+
+    monkeypatch.setattr(build_cache, "file_digest", recording_file_digest)
+    monkeypatch.setattr(build_graph, "database_schema", recording_database_schema)
+
+    assert build(tmp_path, data_path) == "reused"
+    assert hashed == [] and opened == []
+    # Opening for writing rewrites the catalog, so the schema is checked once, but not the data
+    count_follows(tmp_path / "social_network")
+    assert build(tmp_path, data_path) == "reused"
+    assert len(opened) == 1
+    assert all(path.name != "data.kz" for path in hashed)
+    hashed.clear()
+    assert build(tmp_path, data_path) == "reused"
+    assert hashed == [] and len(opened) == 1
+
+
+def test_modified_database_is_replaced_by_snapshot(tmp_path, data_path):
+    cache_path = tmp_path / "cache"
+    assert build(tmp_path, data_path, cache_path=cache_path) == "built"
+    num_follows = count_follows(tmp_path / "social_network")
+    db = kuzu.Database(str(tmp_path / "social_network"))
+    kuzu.Connection(db).execute("MATCH (:Person {id: 1})-[f:Follows]->() DELETE f")
+    db.close()
+    assert build(tmp_path, data_path, cache_path=cache_path) == "copied"
+    assert count_follows(tmp_path / "social_network") == num_follows
+    shutil.rmtree(tmp_path / "social_network")
+    assert build(tmp_path, data_path, cache_path=cache_path) == "copied"
+
+
+def test_schema_change_is_detected(tmp_path, data_path):
+    cache_path = tmp_path / "cache"
+    assert build(tmp_path, data_path, cache_path=cache_path) == "built"
+    db = kuzu.Database(str(tmp_path / "social_network"))
+    kuzu.Connection(db).execute("ALTER TABLE Person ADD pr DOUBLE")
+    db.close()
+    assert build(tmp_path, data_path, cache_path=cache_path) == "copied"
+    db = kuzu.Database(str(tmp_path / "social_network"), read_only=True)
+    properties = kuzu.Connection(db).execute("CALL table_info('Person') RETURN name")
+    properties = properties.get_as_pl()["name"].to_list()
+    db.close()
+    assert "pr" not in properties
+    assert build(tmp_path, data_path, cache_path=cache_path) == "reused"
+
+
+def test_source_digest_follows_local_imports(tmp_path):
+    (tmp_path / "helper.py").write_text("VALUE = 1\n")
+    (tmp_path / "script.py").write_text("import polars\nfrom helper import VALUE\n")
+    digest = source_digest(tmp_path / "script.py")
+    (tmp_path / "helper.py").write_text("VALUE = 2\n")
+    assert source_digest(tmp_path / "script.py") != digest
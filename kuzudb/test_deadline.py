@@ -0,0 +1,46 @@
+"""
+Check the fallbacks of the deadline layer by giving queries budgets far below their run time.
+Needs the database built by `build_graph.py`.
+"""
+import kuzu
+import pytest
+
+from deadline import DeadlineExceeded, DeadlineExecutor
+
+# Short enough to interrupt any of the queries, even on the small sample dataset
+TINY_BUDGET_S = 0.0005
+
+
+@pytest.fixture
+def executor():
+    conn = kuzu.Connection(kuzu.Database("./social_network", read_only=True))
+    return DeadlineExecutor(conn, TINY_BUDGET_S, fallback_fraction=0.2, fallback_budget_s=10)
+
+
+def test_fresh_result_within_budget(executor):
+    outcome = executor.run(9, budget_s=10)
+    assert outcome.status == "fresh"
+    assert executor.counters.deadline_hits[9] == 0
+
+
+def test_stale_result_from_cache(executor):
+    fresh = executor.run(9, budget_s=10)
+    outcome = executor.run(9)
+    assert outcome.status == "stale"
+    assert outcome.result.equals(fresh.result)
+    assert executor.counters.deadline_hits[9] == executor.counters.stale[9] == 1
+
+
+def test_approximate_path_count(executor):
+    outcome = executor.run(9)
+    assert outcome.status == "approximate"
+    assert outcome.estimate.lower <= outcome.result["numPaths"][0] <= outcome.estimate.upper
+    assert executor.counters.approximate[9] == 1
+
+
+def test_no_fallback_available(executor):
+    with pytest.raises(DeadlineExceeded):
+        executor.run(4)
+    assert executor.counters.failed[4] == 1
+    # The timeout is cleared after the query
+    assert executor.run(1, budget_s=10).status == "fresh"
@@ -0,0 +1,112 @@
+"""
+Generate delta batches with `data/create_deltas.py`, apply them to a copy of the database built by
+`build_graph.py`, and check the result against replaying the same parquet files with polars.
+"""
+import shutil
+import subprocess
+import sys
+
+import kuzu
+import polars as pl
+import pytest
+
+import query  # noqa: F401 (adds the repo root to the path)
+from analytics import run_analytics, write_top_k
+from apply_deltas import apply_batch, batch_paths
+from workload.reference import DATA_PATH, EDGES_PATH, NODES_PATH
+
+NUM_BATCHES = 3
+
+
+def generate(output):
+    subprocess.run(
+        [sys.executable, "create_deltas.py", "--batches", str(NUM_BATCHES), "--output", str(output)],
+        cwd=DATA_PATH,
+        check=True,
+        capture_output=True,
+    )
+    return batch_paths(output)
+
+
+@pytest.fixture(scope="module")
+def deltas(tmp_path_factory):
+    return generate(tmp_path_factory.mktemp("deltas"))
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory, deltas):
+    path = tmp_path_factory.mktemp("deltas_db") / "social_network"
+    shutil.copytree("./social_network", path)
+    conn = kuzu.Connection(kuzu.Database(str(path)))
+    for batch_path in deltas:
+        apply_batch(conn, batch_path)
+    return conn
+
+
+def replay(deltas):
+    """Persons, follows and residences after applying every batch, in polars"""
+    persons = pl.read_parquet(NODES_PATH / "persons.parquet")
+    follows = pl.read_parquet(EDGES_PATH / "follows.parquet")
+    lives_in = pl.read_parquet(EDGES_PATH / "lives_in.parquet")
+    for batch_path in deltas:
+        unfollows = pl.read_parquet(batch_path / "unfollows.parquet")
+        # Every unfollow and relocation refers to an edge or person that exists by then
+        assert unfollows.join(follows, on=["from", "to"]).height == unfollows.height
+        new_persons = pl.read_parquet(batch_path / "persons.parquet")
+        relocations = pl.read_parquet(batch_path / "relocations.parquet")
+        assert relocations["from"].is_in(persons["id"]).all()
+        persons = pl.concat([persons, new_persons])
+        new_follows = pl.read_parquet(batch_path / "follows.parquet")
+        assert new_follows.join(follows, on=["from", "to"]).is_empty()
+        follows = pl.concat(
+            [follows.join(unfollows, on=["from", "to"], how="anti"), new_follows]
+        )
+        lives_in = pl.concat(
+            [lives_in, pl.read_parquet(batch_path / "lives_in.parquet")]
+        ).update(relocations, on="from")
+    return persons, follows, lives_in
+
+
+def test_deltas_are_deterministic(tmp_path, deltas):
+    for batch_path, again in zip(deltas, generate(tmp_path)):
+        for file in batch_path.iterdir():
+            assert pl.read_parquet(file).equals(pl.read_parquet(again / file.name))
+
+
+def test_applied_deltas_match_replay(conn, deltas):
+    persons, follows, lives_in = replay(deltas)
+    assert len(deltas) == NUM_BATCHES
+    num_persons = conn.execute("MATCH (p:Person) RETURN count(p)").get_as_pl().item()
+    assert num_persons == persons.height
+    db_follows = conn.execute(
+        "MATCH (a:Person)-[f:Follows]->(b:Person) RETURN a.id AS from, b.id AS to"
+    ).get_as_pl()
+    assert db_follows.sort(["from", "to"]).equals(follows.sort(["from", "to"]))
+    db_lives_in = conn.execute(
+        "MATCH (p:Person)-[:LivesIn]->(c:City) RETURN p.id AS from, c.id AS to"
+    ).get_as_pl()
+    assert db_lives_in.sort("from").equals(lives_in.sort("from"))
+    # New follows get their weight like the initial ones
+    missing = conn.execute(
+        "MATCH ()-[f:Follows]->() WHERE f.weight IS NULL RETURN count(f)"
+    ).get_as_pl().item()
+    assert missing == 0
+
+
+def test_deltas_apply_after_analytics(tmp_path, deltas):
+    """Writing the analytics results back must not break loading new persons"""
+    shutil.copytree("./social_network", tmp_path / "social_network")
+    conn = kuzu.Connection(kuzu.Database(str(tmp_path / "social_network")))
+    _, results = run_analytics(conn)
+    write_top_k(conn, results, 5)
+    apply_batch(conn, deltas[0])
+    new_persons = pl.read_parquet(deltas[0] / "persons.parquet")
+    db_persons = conn.execute(
+        """
+        MATCH (p:Person) WHERE p.id IN $ids
+        RETURN p.id AS id, p.name AS name, p.gender AS gender, p.birthday AS birthday,
+               p.age AS age, p.isMarried AS isMarried
+        """,
+        parameters={"ids": new_persons["id"].to_list()},
+    ).get_as_pl()
+    assert db_persons.sort("id").equals(new_persons.select(db_persons.columns).sort("id"))
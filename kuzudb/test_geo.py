@@ -0,0 +1,73 @@
+"""
+Check the grid-cell pruned radius and nearest-city queries against full scans and a NumPy haversine
+over the parquet files, for randomly sampled points and several radii. Needs the database built by
+`build_graph.py` from data that includes the output of `create_nodes_cells.py`.
+"""
+import kuzu
+import numpy as np
+import polars as pl
+import pytest
+
+from geo_query import GeoQueries, sample_points
+from workload.geo import cells_within, grid_cells, haversine_km
+from workload.reference import EDGES_PATH, NODES_PATH
+
+RADII = [10, 50, 200, 1000]
+
+
+@pytest.fixture(scope="module")
+def geo():
+    return GeoQueries(kuzu.Connection(kuzu.Database("./social_network", read_only=True)))
+
+
+@pytest.fixture(scope="module")
+def cities():
+    cities = pl.read_parquet(NODES_PATH / "cities.parquet")
+    lives_in = pl.read_parquet(EDGES_PATH / "lives_in.parquet")
+    residents = lives_in.group_by("to").len("residents").rename({"to": "id"})
+    return cities.join(residents, on="id", how="left").with_columns(
+        pl.col("residents").fill_null(0)
+    )
+
+
+@pytest.fixture(scope="module")
+def points(geo):
+    # Random cities, plus a point in the ocean and one past the date line
+    return sample_points(geo.conn, 10, seed=1) + [(30.0, -40.0), (60.0, 179.5)]
+
+
+@pytest.mark.parametrize("radius_km", RADII)
+def test_persons_within(geo, cities, points, radius_km):
+    for lat, lon in points:
+        distances = haversine_km(lat, lon, cities["lat"].to_numpy(), cities["lng"].to_numpy())
+        expected = int(cities["residents"].to_numpy()[distances <= radius_km].sum())
+        assert geo.persons_within(lat, lon, radius_km) == expected
+        assert geo.persons_within(lat, lon, radius_km, prune=False) == expected
+
+
+@pytest.mark.parametrize("population_above", [0, 1_000_000])
+def test_nearest_city(geo, cities, points, population_above):
+    candidates = cities.filter(pl.col("population") > population_above)
+    for lat, lon in points:
+        distances = haversine_km(
+            lat, lon, candidates["lat"].to_numpy(), candidates["lng"].to_numpy()
+        )
+        expected = candidates["id"][int(np.lexsort((candidates["id"], distances))[0])]
+        assert geo.nearest_city(lat, lon, population_above)["id"] == expected
+        assert geo.nearest_city(lat, lon, population_above, prune=False)["id"] == expected
+
+
+def test_no_city_above_population(geo):
+    assert geo.nearest_city(40.0, -100.0, 10**12) is None
+
+
+@pytest.mark.parametrize("radius_km", RADII + [5000, 20000])
+def test_cells_within_cover_circle(radius_km):
+    # Every point within the radius falls in one of the cells of the radius
+    rng = np.random.default_rng(radius_km)
+    lat = rng.uniform(-89, 89, 2000)
+    lon = rng.uniform(-180, 180, 2000)
+    for center_lat, center_lon in [(0, 0), (51.5, -0.1), (64.0, 179.9), (-80.0, -179.9)]:
+        inside = haversine_km(center_lat, center_lon, lat, lon) <= radius_km
+        cells = cells_within(center_lat, center_lon, radius_km, 1.0)
+        assert np.isin(grid_cells(lat[inside], lon[inside], 1.0), cells).all()
@@ -0,0 +1,51 @@
+"""
+Check the load generator's latency histogram and Poisson schedule, and run a short low-rate step
+on the database built by `build_graph.py`.
+"""
+import kuzu
+import numpy as np
+import pytest
+
+from loadgen import LatencyHistogram, LoadGenerator, parse_mix, poisson_schedule
+
+
+def test_histogram_percentiles_within_precision():
+    latencies = np.random.default_rng(0).lognormal(np.log(0.01), 1.0, 100_000)
+    histogram = LatencyHistogram(precision=0.01)
+    histogram.record(latencies)
+    assert histogram.total == len(latencies)
+    for q in [50, 90, 99, 99.9, 100]:
+        exact = np.percentile(latencies, q, method="inverted_cdf")
+        assert exact <= histogram.percentile(q) <= exact * 1.0101
+    assert histogram.to_frame()["percentile"][-1] == pytest.approx(100)
+
+
+def test_poisson_schedule():
+    schedule = poisson_schedule(200.0, 50.0, [1, 5], [1.0, 3.0], seed=0)
+    arrivals = np.array([offset for offset, _ in schedule])
+    assert (np.diff(arrivals) > 0).all() and arrivals[-1] < 50
+    assert len(schedule) == pytest.approx(200 * 50, rel=0.05)
+    # Exponential gaps: the standard deviation equals the mean
+    gaps = np.diff(arrivals)
+    assert gaps.std() == pytest.approx(gaps.mean(), rel=0.05)
+    share = np.mean([query_id == 5 for _, query_id in schedule])
+    assert share == pytest.approx(0.75, abs=0.02)
+
+
+def test_parse_mix():
+    assert parse_mix(["1", "5=4"]) == ([1, 5], [1.0, 4.0])
+    with pytest.raises(ValueError):
+        parse_mix(["99"])
+
+
+def test_low_rate_step():
+    db = kuzu.Database("./social_network", read_only=True)
+    generator = LoadGenerator(db, num_connections=2)
+    try:
+        result = generator.run_rate(20.0, 1.0, [3, 8], [1.0, 1.0], seed=0)
+    finally:
+        generator.close()
+    assert result.response.total == result.service.total == result.num_requests > 0
+    # Response time includes the service time
+    assert result.response.percentile(100) >= result.service.percentile(100)
+    assert not result.saturated(0.5)
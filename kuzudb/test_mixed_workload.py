@@ -0,0 +1,59 @@
+"""
+Run short phases of the mixed read/write workload on a copy of the database built by
+`build_graph.py`, checking that every counted edge was written and that the report is complete.
+"""
+import shutil
+
+import kuzu
+import numpy as np
+import pytest
+
+from mixed_workload import EdgeWriter, overlapping, run_phase, run_workload
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "social_network"
+    shutil.copytree("./social_network", path)
+    return str(path)
+
+
+def count_edges(conn: kuzu.Connection) -> int:
+    follows = conn.execute("MATCH ()-[f:Follows]->() RETURN count(f)").get_as_pl().item()
+    lives_in = conn.execute("MATCH ()-[l:LivesIn]->() RETURN count(l)").get_as_pl().item()
+    return follows + lives_in
+
+
+@pytest.mark.parametrize("batch_size", [1, 20])
+def test_written_edges_are_counted(db_path, batch_size):
+    db = kuzu.Database(db_path)
+    before = count_edges(kuzu.Connection(db))
+    reads, writer, elapsed = run_phase(
+        db, db_path, 1, [3, 8], 1.0, rate=200.0, batch_size=batch_size, lives_in_share=0.5
+    )
+    assert len(reads) > 0 and elapsed >= 1.0
+    assert writer.num_edges > 0
+    assert len(writer.commits) == len(writer.outcomes)
+    assert count_edges(kuzu.Connection(db)) - before == writer.num_edges
+
+
+def test_writer_failure_is_raised(db_path, monkeypatch):
+    monkeypatch.setattr(EdgeWriter, "batch", lambda self, size: ("CREATE (:Missing)", []))
+    db = kuzu.Database(db_path)
+    with pytest.raises(RuntimeError, match="Missing"):
+        run_phase(db, db_path, 1, [3], 5.0, rate=100.0)
+
+
+def test_workload_report(db_path):
+    results = run_workload(db_path, 1, [3], 0.5, rate=100.0, batch_sizes=[1, 10])
+    assert results["phase"].to_list() == ["readers only", "writer batch 1", "writer batch 10"]
+    assert results["read_p50_slowdown"][0] == 1.0
+    assert (results["edges_per_s"][1:] > 0).all()
+
+
+def test_overlapping():
+    reads = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 6.0]])
+    stalls = np.array([[0.5, 2.5], [5.0, 5.5]])
+    assert overlapping(reads, stalls).tolist() == [True, True, True]
+    assert overlapping(reads, stalls[1:]).tolist() == [False, False, True]
+    assert not overlapping(reads, np.empty((0, 2))).any()
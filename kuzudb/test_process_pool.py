@@ -0,0 +1,36 @@
+"""
+Check that queries routed through the worker processes return the same results as running them
+in this process. Needs the database built by `build_graph.py`.
+"""
+import kuzu
+import pytest
+
+from process_pool import ProcessQueryExecutor
+from query import QUERIES, execute_query
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessQueryExecutor("./social_network", num_workers=2) as executor:
+        yield executor
+
+
+@pytest.fixture(scope="module")
+def connection():
+    return kuzu.Connection(kuzu.Database("./social_network", read_only=True))
+
+
+@pytest.mark.parametrize("spec", QUERIES, ids=lambda spec: f"query{spec.id}")
+def test_results_match_in_process(executor, connection, spec):
+    expected = execute_query(connection, spec.id, verbose=False)
+    assert executor.run(spec.id).equals(expected)
+
+
+def test_params_are_forwarded(executor):
+    result = executor.run(3, {"country": "Canada"})
+    assert result.height == 5
+
+
+def test_unknown_query(executor):
+    with pytest.raises(ValueError, match="Unknown query"):
+        executor.submit(42)
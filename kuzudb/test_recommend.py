@@ -0,0 +1,53 @@
+"""
+Check the "people you may know" recommendations, per user and batched, against the same ranking
+computed from the parquet files. Needs the database built by `build_graph.py`.
+"""
+import kuzu
+import pytest
+
+from query import run_people_you_may_know, run_people_you_may_know_batch
+from workload.recommend import expected_recommendations, pick_users
+from workload.reference import SocialGraph
+
+
+@pytest.fixture(scope="module")
+def conn():
+    return kuzu.Connection(kuzu.Database("./social_network", read_only=True))
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return SocialGraph.from_parquet()
+
+
+@pytest.fixture(scope="module")
+def users(graph):
+    return pick_users(graph, num_hubs=3, num_ordinary=10, seed=1)
+
+
+@pytest.mark.parametrize("group", ["hub", "ordinary"])
+def test_per_user_matches_expected(conn, graph, users, group):
+    for person_id in users[group]:
+        result = run_people_you_may_know(conn, person_id, limit=10)
+        assert result.equals(expected_recommendations(graph, [person_id], limit=10))
+
+
+def test_batch_matches_expected(conn, graph, users):
+    person_ids = users["hub"] + users["ordinary"]
+    result = run_people_you_may_know_batch(conn, person_ids, limit=5)
+    assert result.equals(expected_recommendations(graph, person_ids, limit=5))
+    assert result["userID"].n_unique() == len(person_ids)
+
+
+def test_no_existing_connections_recommended(conn, graph, users):
+    person_id = users["hub"][0]
+    result = run_people_you_may_know_batch(conn, [person_id], limit=1000)
+    follows = conn.execute(
+        "MATCH (u:Person {id: $id})-[:Follows]-(c:Person) RETURN c.id AS id", {"id": person_id}
+    ).get_as_pl()
+    assert not result["personID"].is_in(follows["id"].to_list() + [person_id]).any()
+
+
+def test_unknown_user(conn):
+    assert run_people_you_may_know(conn, -1).is_empty()
+    assert run_people_you_may_know_batch(conn, [-1]).is_empty()
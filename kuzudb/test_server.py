@@ -0,0 +1,87 @@
+"""
+Run the query server on a temporary Unix socket in a background thread and query it with the
+client. Needs the database built by `build_graph.py`.
+"""
+import asyncio
+import contextlib
+import json
+import socket
+import threading
+import time
+
+import kuzu
+import pytest
+
+from client import QueryClient, QueryError
+from server import QueryServer
+
+
+@pytest.fixture(scope="module")
+def socket_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("server") / "kuzu.sock"
+    server = QueryServer(kuzu.Database("./social_network", read_only=True), num_connections=2)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve(path))
+
+    def run():
+        with contextlib.suppress(asyncio.CancelledError):
+            loop.run_until_complete(task)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while not path.exists():
+        time.sleep(0.01)
+    yield path
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+
+
+def test_query_round_trip(socket_path):
+    with QueryClient(socket_path) as client:
+        result = client.query(3, {"country": "United States"})
+        assert result.columns == ["city", "averageAge"]
+        assert result.height == 5
+        assert client.query(8).columns == ["numPaths"]
+
+
+def test_concurrent_clients(socket_path):
+    def run(results, index):
+        with QueryClient(socket_path) as client:
+            results[index] = client.query(1)
+
+    results = [None] * 4
+    threads = [threading.Thread(target=run, args=(results, i)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result.equals(results[0]) for result in results)
+
+
+def test_errors_are_returned_to_the_client(socket_path):
+    with QueryClient(socket_path) as client:
+        with pytest.raises(QueryError, match="Unknown query"):
+            client.query(42)
+        with pytest.raises(QueryError, match="must be str"):
+            client.query(3, {"country": 1})
+        with pytest.raises(QueryError, match="expected a JSON object"):
+            client.request([1])
+        with pytest.raises(QueryError, match="expected an integer"):
+            client.request({"query": [1]})
+        # The connection is still usable after an error
+        assert client.request({"op": "ping"})["ok"]
+
+
+def test_undecodable_requests_get_an_error(socket_path):
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(str(socket_path))
+        stream = sock.makefile("rwb")
+        for line in [b"not json\n", b"\xff\xfe\n"]:
+            stream.write(line)
+            stream.flush()
+            response = json.loads(stream.readline())
+            assert not response["ok"] and response["error"].startswith("Invalid request")
+        # The connection is still usable after an error
+        stream.write(b'{"op": "ping"}\n')
+        stream.flush()
+        assert json.loads(stream.readline())["ok"]
@@ -0,0 +1,49 @@
+"""
+Build small sharded databases from the generated parquet files and check that the scatter-gather
+results of queries 1-7 match the reference engine.
+"""
+import json
+
+import polars as pl
+import pytest
+
+from shard import ShardedBackend, assign_by_hash, build_shards
+from workload import QUERIES_BY_ID, check, run_query
+from workload.reference import NODES_PATH, ReferenceBackend
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return ReferenceBackend.from_parquet()
+
+
+@pytest.fixture(scope="module", params=[("hash", 2), ("country", 3)], ids=["hash", "country"])
+def shards_path(request, tmp_path_factory):
+    partition, num_shards = request.param
+    path = tmp_path_factory.mktemp("shards") / partition
+    build_shards(num_shards, partition, path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def backend(shards_path):
+    return ShardedBackend(shards_path)
+
+
+def test_shards_own_every_person_once(shards_path):
+    manifest = json.loads((shards_path / "shards.json").read_text())
+    num_persons = pl.read_parquet(NODES_PATH / "persons.parquet").height
+    assert sum(shard["persons"] for shard in manifest["shards"]) == num_persons
+    num_follows = pl.read_parquet(NODES_PATH.parent / "edges" / "follows.parquet").height
+    assert sum(shard["follows"] for shard in manifest["shards"]) == num_follows
+
+
+@pytest.mark.parametrize("query_id", range(1, 8))
+def test_sharded_results_match_reference(backend, reference, query_id):
+    spec = QUERIES_BY_ID[query_id]
+    check(spec, run_query(backend, spec, verbose=False), reference=reference)
+
+
+def test_assign_by_hash():
+    persons = pl.DataFrame({"id": [0, 1, 2, 3, 4]})
+    assert assign_by_hash(persons, 2)["shard"].to_list() == [0, 1, 0, 1, 0]
@@ -0,0 +1,52 @@
+"""
+Check the traversal queries 10-13 for randomly sampled persons and person pairs against the NumPy
+reference engine, beyond the single default parameters that the benchmark uses. Needs the
+database built by `build_graph.py`.
+"""
+import kuzu
+import numpy as np
+import pytest
+
+import query  # noqa: F401 (adds the repo root to the path)
+from workload import QUERIES_BY_ID, KuzuBackend, check
+from workload.reference import ReferenceBackend
+
+
+@pytest.fixture(scope="module")
+def backend():
+    return KuzuBackend(kuzu.Connection(kuzu.Database("./social_network", read_only=True)))
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return ReferenceBackend.from_parquet()
+
+
+@pytest.fixture(scope="module")
+def person_ids(reference):
+    ids = reference.graph.persons["id"].to_numpy()
+    return np.random.default_rng(1).choice(ids, (20, 2), replace=False).tolist()
+
+
+@pytest.mark.parametrize("query_id", [10, 11])
+def test_reachable(backend, reference, person_ids, query_id):
+    spec = QUERIES_BY_ID[query_id]
+    for person_id, _ in person_ids:
+        params = spec.bind({"person_id": person_id})
+        check(spec, backend.run(spec, params), params, reference)
+
+
+@pytest.mark.parametrize("query_id", [12, 13])
+def test_shortest_paths(backend, reference, person_ids, query_id):
+    spec = QUERIES_BY_ID[query_id]
+    for source_id, target_id in person_ids:
+        params = spec.bind({"source_id": source_id, "target_id": target_id})
+        check(spec, backend.run(spec, params), params, reference)
+
+
+@pytest.mark.parametrize("query_id", [12, 13])
+def test_unknown_person_has_no_path(backend, reference, query_id):
+    spec = QUERIES_BY_ID[query_id]
+    params = spec.bind({"source_id": -1})
+    assert backend.run(spec, params).is_empty()
+    assert reference.run(spec, params).is_empty()
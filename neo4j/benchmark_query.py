@@ -1,6 +1,10 @@
 """
 Use the `pytest-benchmark` library to more formally benchmark the Neo4j queries wiht warmup and iterations.
 `pip install pytest-benchmark`
+
+Every query in the shared registry is benchmarked with the same harness as the other backends,
+and its result is checked against the NumPy reference engine's results for the generated
+dataset (`workload/reference.py`), so the benchmark works at any dataset size.
 """
 import os
 
@@ -8,7 +12,9 @@ import pytest
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
-import query
+import query  # noqa: F401 (adds the repo root to the path)
+from workload import QUERIES, Neo4jBackend, benchmark_query
+from workload.reference import ReferenceBackend
 
 load_dotenv()
 
@@ -23,95 +29,14 @@ def session():
             yield session
 
 
-def test_benchmark_query1(benchmark, session):
-    result = benchmark(query.run_query1, session)
-    result = result.to_dicts()
-
-    assert len(result) == 3
-    assert result[0]["personID"] == 85723
-    assert result[1]["personID"] == 68753
-    assert result[2]["personID"] == 54696
-    assert result[0]["numFollowers"] == 4998
-    assert result[1]["numFollowers"] == 4985
-    assert result[2]["numFollowers"] == 4976
-
-
-def test_benchmark_query2(benchmark, session):
-    result = benchmark(query.run_query2, session)
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["name"] == "Melissa Murphy"
-    assert result[0]["numFollowers"] == 4998
-    assert result[0]["city"] == "Austin"
-    assert result[0]["state"] == "Texas"
-    assert result[0]["country"] == "United States"
-
-
-def test_benchmark_query3(benchmark, session):
-    result = benchmark(query.run_query3, session, "United States")
-    result = result.to_dicts()
-
-    assert len(result) == 5
-    assert result[0]["city"] == "Austin"
-    assert result[1]["city"] == "Kansas City"
-    assert result[2]["city"] == "Miami"
-    assert result[3]["city"] == "San Antonio"
-    assert result[4]["city"] == "Houston"
-
-
-def test_benchmark_query4(benchmark, session):
-    result = benchmark(query.run_query4, session, 30, 40)
-    result = result.to_dicts()
-
-    assert len(result) == 3
-    assert result[0]["countries"] == "United States"
-    assert result[1]["countries"] == "Canada"
-    assert result[2]["countries"] == "United Kingdom"
-    assert result[0]["personCounts"] == 30680
-    assert result[1]["personCounts"] == 3045
-    assert result[2]["personCounts"] == 1801
-
-
-def test_benchmark_query5(benchmark, session):
-    result = benchmark(query.run_query5, session, "male", "London", "United Kingdom", "fine dining")
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPersons"] == 52
-
-
-def test_benchmark_query6(benchmark, session):
-    result = benchmark(query.run_query6, session, "female", "tennis")
-    result = result.to_dicts()
-
-    assert len(result) == 5
-    assert result[0]["numPersons"] == 66
-    assert result[0]["city"] in ("Houston", "Birmingham")
-    assert result[0]["country"] in ("United States", "United Kingdom")
-
-
-def test_benchmark_query7(benchmark, session):
-    result = benchmark(query.run_query7, session, "United States", 23, 30, "photography")
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPersons"] == 141
-    assert result[0]["state"] == "California"
-    assert result[0]["country"] == "United States"
-
-
-def test_benchmark_query8(benchmark, session):
-    result = benchmark(query.run_query8, session)
-    result = result.to_dicts()
-
-    assert len(result) == 1
-    assert result[0]["numPaths"] == 58431994
-
+@pytest.fixture(scope="session")
+def reference():
+    return ReferenceBackend.from_parquet()
 
-def test_benchmark_query9(benchmark, session):
-    result = benchmark(query.run_query9, session, 50, 25)
-    result = result.to_dicts()
 
-    assert len(result) == 1
-    assert result[0]["numPaths"] == 45578816
+@pytest.mark.parametrize("spec", QUERIES, ids=lambda spec: f"query{spec.id}")
+def test_benchmark_query(benchmark, session, reference, spec):
+    backend = Neo4jBackend(session)
+    if not backend.supports(spec):
+        pytest.skip(f"Query {spec.id} has no Neo4j Cypher")
+    benchmark_query(benchmark, backend, spec, reference=reference)
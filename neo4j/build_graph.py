@@ -1,13 +1,18 @@
 import argparse
 import asyncio
+import contextlib
 import os
+import sys
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable, Iterator
 
 import polars as pl
+import pyarrow.parquet as pq
 from codetiming import Timer
 from dotenv import load_dotenv
-from neo4j import AsyncGraphDatabase, AsyncManagedTransaction, AsyncSession
+from neo4j import AsyncDriver, AsyncGraphDatabase, AsyncManagedTransaction, AsyncSession
 
 load_dotenv()
 
@@ -23,9 +28,30 @@ NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
 JsonBlob = dict[str, Any]
 
 
-def chunk_iterable(iterable: Iterator, chunk_size: int):
-    for i in range(0, len(iterable), chunk_size):
-        yield iterable[i : i + chunk_size]
+def estimate_row_bytes(parquet_file: pq.ParquetFile, sample_size: int = 100) -> int:
+    """Estimate the in-memory size of one row once it is converted to a Python dict"""
+    sample = next(parquet_file.iter_batches(batch_size=sample_size)).to_pylist()
+    row_bytes = [
+        sys.getsizeof(row) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in row.items())
+        for row in sample
+    ]
+    return max(row_bytes)
+
+
+def iter_parquet_batches(
+    path: Path, batch_size: int, max_batch_bytes: int
+) -> Iterator[list[JsonBlob]]:
+    """
+    Lazily read a parquet file and convert it to dicts one batch at a time, so that only the
+    batch in flight exists as Python objects rather than the whole file.
+    The number of rows per batch is capped so that each batch stays within `max_batch_bytes`.
+    """
+    parquet_file = pq.ParquetFile(path)
+    if parquet_file.metadata.num_rows == 0:
+        return
+    rows_per_batch = max(1, min(batch_size, max_batch_bytes // estimate_row_bytes(parquet_file)))
+    for record_batch in parquet_file.iter_batches(batch_size=rows_per_batch):
+        yield record_batch.to_pylist()
 
 
 # --- Nodes ---
@@ -136,29 +162,183 @@ async def merge_edges_state_in(tx: AsyncManagedTransaction, data: list[JsonBlob]
     print(f"Created {len(data)} state-country edges")
 
 
-# --- Run functions ---
-
-
-async def ingest_person_nodes_in_batches(session: AsyncSession, merge_func: Callable) -> None:
-    persons = pl.read_parquet(f"{NODES_PATH}/persons.parquet")
-    persons_batches = chunk_iterable(persons.to_dicts(), BATCH_SIZE)
-    for i, batch in enumerate(persons_batches, 1):
-        # Create person nodes
-        await session.execute_write(merge_func, data=batch)
-        print(f"Created {len(batch)} person nodes for batch {i}")
-
-
-async def ingest_person_edges_in_batches(session: AsyncSession, merge_func: Callable) -> None:
+# --- Pipeline ---
+
+
+@dataclass(frozen=True)
+class WriteJob:
+    name: str
+    path: Path
+    write_func: Callable
+    # Node labels whose nodes are locked by the writes, used to keep conflicting jobs apart
+    labels: tuple[str, ...]
+    # Batches of nodes with unique IDs can be written concurrently, relationships are not
+    concurrent_writes: bool = False
+
+
+@dataclass
+class StageMetrics:
+    rows: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+
+    def record(self, rows: int, seconds: float) -> None:
+        self.rows += rows
+        self.batches += 1
+        self.busy_seconds += seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.busy_seconds if self.busy_seconds else 0.0
+
+
+@dataclass
+class JobMetrics:
+    name: str
+    prepare: StageMetrics = field(default_factory=StageMetrics)
+    write: StageMetrics = field(default_factory=StageMetrics)
+    wall_seconds: float = 0.0
+
+    def as_row(self) -> JsonBlob:
+        return {
+            "job": self.name,
+            "rows": self.write.rows,
+            "batches": self.write.batches,
+            "prepare_rows_per_s": self.prepare.rows_per_second,
+            "write_rows_per_s": self.write.rows_per_second,
+            "wall_s": self.wall_seconds,
+            "rows_per_s": self.write.rows / self.wall_seconds if self.wall_seconds else 0.0,
+        }
+
+
+NODE_JOBS = [
+    WriteJob("person", NODES_PATH / "persons.parquet", merge_nodes_person, ("Person",), True),
+    WriteJob("interest", NODES_PATH / "interests.parquet", merge_nodes_interests, ("Interest",), True),
+    WriteJob("city", NODES_PATH / "cities.parquet", merge_nodes_cities, ("City",), True),
+    WriteJob("state", NODES_PATH / "states.parquet", merge_nodes_states, ("State",), True),
+    WriteJob("country", NODES_PATH / "countries.parquet", merge_nodes_countries, ("Country",), True),
+]
+
+# fmt: off
+EDGE_JOBS = [
+    WriteJob("follows", EDGES_PATH / "follows.parquet", merge_edges_person, ("Person",)),
+    WriteJob("interested_in", EDGES_PATH / "interested_in.parquet", merge_edges_interested_in, ("Person", "Interest")),
+    WriteJob("lives_in", EDGES_PATH / "lives_in.parquet", merge_edges_lives_in, ("Person", "City")),
+    WriteJob("city_in", EDGES_PATH / "city_in.parquet", merge_edges_city_in, ("City", "State")),
+    WriteJob("state_in", EDGES_PATH / "state_in.parquet", merge_edges_state_in, ("State", "Country")),
+]
+# fmt: on
+
+
+async def produce_batches(
+    job: WriteJob,
+    queue: asyncio.Queue,
+    metrics: JobMetrics,
+    num_writers: int,
+    batch_slots: asyncio.Semaphore,
+    writing: asyncio.Event,
+) -> None:
+    """
+    Read and convert batches in a worker thread, running ahead of the writers by up to the
+    queue size, so that batch preparation overlaps with network and database time. A batch takes
+    one of the shared `batch_slots` before it is converted, and the writer frees it once the batch
+    is written, which bounds the converted batches in memory across all jobs. Nothing is converted
+    until a writer of the job holds a session, so that the slots are never all taken by batches
+    queued for jobs that cannot write them.
+    """
+    await writing.wait()
+    batches = iter_parquet_batches(job.path, BATCH_SIZE, MAX_BATCH_BYTES)
+    while True:
+        await batch_slots.acquire()
+        start = time.perf_counter()
+        try:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            metrics.prepare.record(len(batch), time.perf_counter() - start)
+            await queue.put(batch)
+        except BaseException:
+            batch_slots.release()
+            raise
+    batch_slots.release()
+    # One sentinel per writer
+    for _ in range(num_writers):
+        await queue.put(None)
+
+
+async def write_batches(
+    driver: AsyncDriver,
+    job: WriteJob,
+    queue: asyncio.Queue,
+    metrics: JobMetrics,
+    sessions: asyncio.Semaphore,
+    batch_slots: asyncio.Semaphore,
+    writing: asyncio.Event,
+) -> None:
+    async with sessions:
+        async with driver.session(database="neo4j") as session:
+            writing.set()
+            while (batch := await queue.get()) is not None:
+                try:
+                    start = time.perf_counter()
+                    await session.execute_write(job.write_func, data=batch)
+                    metrics.write.record(len(batch), time.perf_counter() - start)
+                finally:
+                    del batch
+                    batch_slots.release()
+
+
+async def run_job(
+    driver: AsyncDriver,
+    job: WriteJob,
+    label_locks: dict[str, asyncio.Lock],
+    sessions: asyncio.Semaphore,
+    batch_slots: asyncio.Semaphore,
+) -> JobMetrics:
+    metrics = JobMetrics(job.name)
+    num_writers = WRITERS_PER_JOB if job.concurrent_writes else 1
+    async with contextlib.AsyncExitStack() as stack:
+        # Take the label locks in a fixed order so that jobs sharing labels cannot deadlock
+        for label in sorted(job.labels):
+            await stack.enter_async_context(label_locks[label])
+        start = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+        writing = asyncio.Event()
+        # A failing writer cancels the producer and the other writers, instead of leaving the
+        # producer blocked on a full queue
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(
+                produce_batches(job, queue, metrics, num_writers, batch_slots, writing)
+            )
+            for _ in range(num_writers):
+                tasks.create_task(
+                    write_batches(driver, job, queue, metrics, sessions, batch_slots, writing)
+                )
+        metrics.wall_seconds = time.perf_counter() - start
+    return metrics
+
+
+async def run_pipeline(driver: AsyncDriver, jobs: list[WriteJob]) -> list[JobMetrics]:
     """
-    Unlike person nodes, edges are just integer pairs, so we can have very large batches
-    without running into memory issues when UNWINDing in Cypher.
+    Run all jobs at once: jobs whose node labels overlap wait for each other, the total number
+    of write sessions in flight is capped at MAX_SESSIONS, and the total number of converted
+    batches in memory (queued or being written) at MAX_BATCHES_IN_MEMORY. A failing job cancels
+    the others.
     """
-    follows = pl.read_parquet(f"{EDGES_PATH}/follows.parquet")
-    follows_batches = chunk_iterable(follows.to_dicts(), chunk_size=BATCH_SIZE)
-    for i, batch in enumerate(follows_batches, 1):
-        # Create person-follower edges
-        await session.execute_write(merge_func, data=batch)
-        print(f"Created {len(batch)} person-follower edges for batch {i}")
+    label_locks = {label: asyncio.Lock() for job in jobs for label in job.labels}
+    sessions = asyncio.Semaphore(MAX_SESSIONS)
+    batch_slots = asyncio.Semaphore(MAX_BATCHES_IN_MEMORY)
+    async with asyncio.TaskGroup() as tasks:
+        runs = [
+            tasks.create_task(run_job(driver, job, label_locks, sessions, batch_slots))
+            for job in jobs
+        ]
+    return [run.result() for run in runs]
+
+
+def print_metrics(stage: str, metrics: list[JobMetrics]) -> None:
+    metrics_df = pl.DataFrame([m.as_row() for m in metrics])
+    print(f"{stage} throughput per job:\n{metrics_df}")
 
 
 async def create_indexes_and_constraints(session: AsyncSession) -> None:
@@ -174,57 +354,37 @@ async def create_indexes_and_constraints(session: AsyncSession) -> None:
         await session.run(query)
 
 
-async def write_nodes(session: AsyncSession) -> None:
-    await ingest_person_nodes_in_batches(session, merge_nodes_person)
-    # Write interest nodes
-    interests = pl.read_parquet(f"{NODES_PATH}/interests.parquet")
-    await session.execute_write(merge_nodes_interests, data=interests.to_dicts())
-    # Write city nodes
-    cities = pl.read_parquet(f"{NODES_PATH}/cities.parquet")
-    await session.execute_write(merge_nodes_cities, data=cities.to_dicts())
-    # Write state nodes
-    states = pl.read_parquet(f"{NODES_PATH}/states.parquet")
-    await session.execute_write(merge_nodes_states, data=states.to_dicts())
-    # Write country nodes
-    countries = pl.read_parquet(f"{NODES_PATH}/countries.parquet")
-    await session.execute_write(merge_nodes_countries, data=countries.to_dicts())
-
-
-async def write_edges(session: AsyncSession) -> None:
-    await ingest_person_edges_in_batches(session, merge_edges_person)
-    # Write person-interest edges
-    interests = pl.read_parquet(f"{EDGES_PATH}/interested_in.parquet")
-    await session.execute_write(merge_edges_interested_in, data=interests.to_dicts())
-    # Write person-city edges
-    cities = pl.read_parquet(f"{EDGES_PATH}/lives_in.parquet")
-    await session.execute_write(merge_edges_lives_in, data=cities.to_dicts())
-    # Write city-state edges
-    states = pl.read_parquet(f"{EDGES_PATH}/city_in.parquet")
-    await session.execute_write(merge_edges_city_in, data=states.to_dicts())
-    # Write state-country edges
-    countries = pl.read_parquet(f"{EDGES_PATH}/state_in.parquet")
-    await session.execute_write(merge_edges_state_in, data=countries.to_dicts())
-
-
 async def main() -> None:
     async with AsyncGraphDatabase.driver(URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
         async with driver.session(database="neo4j") as session:
             # Create indexes and constraints
             await create_indexes_and_constraints(session)
-            with Timer(name="nodes", text="Nodes loaded in {:.4f}s"):
-                # Write nodes
-                await write_nodes(session)
-            with Timer(name="edges", text="Edges loaded in {:.4f}s"):
-                # Write edges after nodes have been created
-                await write_edges(session)
+        with Timer(name="nodes", text="Nodes loaded in {:.4f}s"):
+            # Write nodes
+            node_metrics = await run_pipeline(driver, NODE_JOBS)
+        with Timer(name="edges", text="Edges loaded in {:.4f}s"):
+            # Write edges after nodes have been created
+            edge_metrics = await run_pipeline(driver, EDGE_JOBS)
+    print_metrics("Nodes", node_metrics)
+    print_metrics("Edges", edge_metrics)
 
 
 if __name__ == "__main__":
     # fmt: off
     parser = argparse.ArgumentParser("Build Neo4j graph from files")
     parser.add_argument("--batch_size", "-b", type=int, default=500_000, help="Batch size of nodes to ingest at a time")
+    parser.add_argument("--max_batch_mb", type=int, default=512, help="Cap on the in-memory size of a converted batch (MB)")
+    parser.add_argument("--max_sessions", type=int, default=4, help="Max number of write sessions in flight at a time")
+    parser.add_argument("--writers_per_job", type=int, default=2, help="Concurrent writers for a node type")
+    parser.add_argument("--queue_depth", type=int, default=2, help="Number of prepared batches buffered ahead of the writers")
+    parser.add_argument("--max_batches_in_memory", type=int, default=4, help="Max converted batches in memory over all jobs, queued or being written")
     args = parser.parse_args()
     # fmt: on
 
     BATCH_SIZE = args.batch_size
+    MAX_BATCH_BYTES = args.max_batch_mb * 1024 * 1024
+    MAX_SESSIONS = args.max_sessions
+    WRITERS_PER_JOB = args.writers_per_job
+    QUEUE_DEPTH = args.queue_depth
+    MAX_BATCHES_IN_MEMORY = args.max_batches_in_memory
     asyncio.run(main())
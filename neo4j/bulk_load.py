@@ -0,0 +1,300 @@
+"""
+Alternate loader for Neo4j that streams Arrow batches instead of converting whole files via `to_dicts()`.
+
+- Each file is read as an Arrow table and split into blocks over disjoint ranges of the nodes it
+  writes (`id` for nodes, both `from` and `to` for edges), and the blocks are written in rounds of
+  concurrent sessions that never lock the same node, so that followers of a super node do not
+  contend for its lock
+- Rows are converted to Python dicts one batch at a time, right before they are sent
+- When the input is known to be deduplicated, `CREATE` is used in place of `MERGE`, which skips
+  the existence check per row
+- The batch size is tuned per session from the observed write throughput
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from codetiming import Timer
+from neo4j import AsyncDriver, AsyncGraphDatabase, AsyncManagedTransaction
+
+from build_graph import (
+    EDGES_PATH,
+    NEO4J_PASSWORD,
+    NEO4J_USER,
+    NODES_PATH,
+    URI,
+    create_indexes_and_constraints,
+)
+
+DATABASE = "neo4j"
+
+# Custom types
+JsonBlob = dict[str, Any]
+
+
+@dataclass(frozen=True)
+class LoadSpec:
+    name: str
+    path: Path
+    # The columns holding the IDs of the nodes each row locks, and the label of those nodes
+    node_columns: tuple[tuple[str, str], ...]
+    create_query: str
+    merge_query: str
+
+
+def node_spec(name: str, filename: str, label: str, id_property: str) -> LoadSpec:
+    return LoadSpec(
+        name=name,
+        path=NODES_PATH / filename,
+        node_columns=(("id", label),),
+        create_query=f"""
+            UNWIND $data AS row
+            CREATE (n:{label} {{{id_property}: row.id}})
+                SET n += row
+        """,
+        merge_query=f"""
+            UNWIND $data AS row
+            MERGE (n:{label} {{{id_property}: row.id}})
+                SET n += row
+        """,
+    )
+
+
+def edge_spec(
+    name: str, filename: str, source: tuple[str, str], target: tuple[str, str], rel: str
+) -> LoadSpec:
+    match = f"""
+            UNWIND $data AS row
+            MATCH (a:{source[0]} {{{source[1]}: row.from}})
+            MATCH (b:{target[0]} {{{target[1]}: row.to}})
+    """
+    return LoadSpec(
+        name=name,
+        path=EDGES_PATH / filename,
+        node_columns=(("from", source[0]), ("to", target[0])),
+        create_query=f"{match}        CREATE (a)-[:{rel}]->(b)\n",
+        merge_query=f"{match}        MERGE (a)-[:{rel}]->(b)\n",
+    )
+
+
+NODE_SPECS = [
+    node_spec("person", "persons.parquet", "Person", "personID"),
+    node_spec("interest", "interests.parquet", "Interest", "interestID"),
+    node_spec("city", "cities.parquet", "City", "cityID"),
+    node_spec("state", "states.parquet", "State", "stateID"),
+    node_spec("country", "countries.parquet", "Country", "countryID"),
+]
+
+# fmt: off
+EDGE_SPECS = [
+    edge_spec("follows", "follows.parquet", ("Person", "personID"), ("Person", "personID"), "FOLLOWS"),
+    edge_spec("interested_in", "interested_in.parquet", ("Person", "personID"), ("Interest", "interestID"), "HAS_INTEREST"),
+    edge_spec("lives_in", "lives_in.parquet", ("Person", "personID"), ("City", "cityID"), "LIVES_IN"),
+    edge_spec("city_in", "city_in.parquet", ("City", "cityID"), ("State", "stateID"), "CITY_IN"),
+    edge_spec("state_in", "state_in.parquet", ("State", "stateID"), ("Country", "countryID"), "STATE_IN"),
+]
+# fmt: on
+
+
+class BatchSizeTuner:
+    """
+    Hill-climb the batch size on observed rows/sec: keep stepping in the same direction
+    (by `factor`) while throughput improves, and reverse direction once it gets worse.
+    """
+
+    def __init__(self, initial: int, min_size: int, max_size: int, factor: float = 2.0) -> None:
+        self.min_size = min_size
+        self.max_size = max_size
+        self.factor = factor
+        self.batch_size = min(max(initial, min_size), max_size)
+        self.direction = 1
+        self.last_throughput: float | None = None
+        self.history: list[tuple[int, float]] = []
+
+    def record(self, rows: int, seconds: float) -> None:
+        throughput = rows / max(seconds, 1e-9)
+        self.history.append((rows, throughput))
+        # A short trailing batch says nothing about the current batch size
+        if rows < self.batch_size:
+            return
+        if self.last_throughput is not None and throughput < self.last_throughput:
+            self.direction = -self.direction
+        self.last_throughput = throughput
+        step = self.factor if self.direction > 0 else 1 / self.factor
+        self.batch_size = int(min(max(self.batch_size * step, self.min_size), self.max_size))
+
+
+@dataclass
+class LoadStats:
+    name: str
+    rows: int = 0
+    batches: int = 0
+    batch_sizes: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Block:
+    table: pa.Table
+    # (label, range index) of every node range the block's rows lock
+    locks: frozenset[tuple[str, int]]
+
+
+def partition_by_range(
+    table: pa.Table, node_columns: tuple[tuple[str, str], ...], num_partitions: int
+) -> list[list[pa.Table]]:
+    """
+    Split a table into blocks over disjoint ranges of the IDs in each of its node columns, and
+    group the blocks into rounds of at most `num_partitions` blocks that share no node range, so
+    that the sessions writing a round's blocks concurrently never lock the same node. Columns of
+    the same label share range bounds, and are split into `num_partitions` ranges each so that a
+    round can still fill every session.
+    """
+    if table.num_rows == 0:
+        return []
+    labels = [label for _, label in node_columns]
+    bounds = {}
+    for label in set(labels):
+        values = np.concatenate(
+            [table[column].to_numpy() for column, other in node_columns if other == label]
+        )
+        num_ranges = num_partitions * labels.count(label)
+        quantiles = np.linspace(0, 1, num_ranges + 1)[1:-1]
+        bounds[label] = np.unique(np.quantile(values, quantiles, method="higher"))
+    ranges = np.stack(
+        [
+            np.searchsorted(bounds[label], table[column].to_numpy(), side="right")
+            for column, label in node_columns
+        ],
+        axis=1,
+    )
+    keys, block_ids = np.unique(ranges, axis=0, return_inverse=True)
+    order = np.argsort(block_ids.ravel(), kind="stable")
+    starts = np.searchsorted(block_ids.ravel()[order], np.arange(len(keys) + 1))
+    blocks = [
+        Block(
+            table.take(order[starts[i] : starts[i + 1]]),
+            frozenset(zip(labels, (int(index) for index in key))),
+        )
+        for i, key in enumerate(keys)
+    ]
+    # Greedily fill each round with the largest blocks that share no range with it
+    blocks.sort(key=lambda block: -block.table.num_rows)
+    rounds = []
+    while blocks:
+        round_blocks, locked, remaining = [], set(), []
+        for block in blocks:
+            if len(round_blocks) < num_partitions and locked.isdisjoint(block.locks):
+                round_blocks.append(block.table)
+                locked |= block.locks
+            else:
+                remaining.append(block)
+        rounds.append(round_blocks)
+        blocks = remaining
+    return rounds
+
+
+def iter_arrow_batches(table: pa.Table, tuner: BatchSizeTuner) -> Iterator[list[JsonBlob]]:
+    """Convert a table to lists of dicts one batch at a time, sized by the tuner as it goes"""
+    offset = 0
+    while offset < table.num_rows:
+        batch = table.slice(offset, tuner.batch_size)
+        offset += batch.num_rows
+        yield batch.to_pylist()
+
+
+async def write_batch(tx: AsyncManagedTransaction, query: str, data: list[JsonBlob]) -> None:
+    await tx.run(query, data=data)
+
+
+async def load_partition(
+    driver: AsyncDriver, query: str, table: pa.Table, tuner: BatchSizeTuner, stats: LoadStats
+) -> None:
+    async with driver.session(database=DATABASE) as session:
+        for batch in iter_arrow_batches(table, tuner):
+            start = time.perf_counter()
+            await session.execute_write(write_batch, query, batch)
+            tuner.record(len(batch), time.perf_counter() - start)
+            stats.rows += len(batch)
+            stats.batches += 1
+            stats.batch_sizes.append(len(batch))
+
+
+async def load_file(
+    driver: AsyncDriver,
+    spec: LoadSpec,
+    *,
+    assume_unique: bool,
+    num_workers: int,
+    initial_batch_size: int,
+    min_batch_size: int,
+    max_batch_size: int,
+) -> LoadStats:
+    table = pq.read_table(spec.path)
+    query = spec.create_query if assume_unique else spec.merge_query
+    stats = LoadStats(spec.name)
+    rounds = partition_by_range(table, spec.node_columns, num_workers)
+    # Each worker keeps its tuned batch size from one round to the next
+    tuners = [
+        BatchSizeTuner(initial_batch_size, min_batch_size, max_batch_size)
+        for _ in range(num_workers)
+    ]
+    for partitions in rounds:
+        await asyncio.gather(
+            *(
+                load_partition(driver, query, partition, tuner, stats)
+                for partition, tuner in zip(partitions, tuners)
+            )
+        )
+    print(
+        f"Loaded {stats.rows} {spec.name} rows in {stats.batches} batches "
+        f"over {sum(len(partitions) for partitions in rounds)} sessions in {len(rounds)} rounds"
+    )
+    return stats
+
+
+async def load_all(driver: AsyncDriver, specs: list[LoadSpec], **kwargs: Any) -> list[LoadStats]:
+    return [await load_file(driver, spec, **kwargs) for spec in specs]
+
+
+async def main() -> None:
+    kwargs = dict(
+        assume_unique=ASSUME_UNIQUE,
+        num_workers=NUM_WORKERS,
+        initial_batch_size=INITIAL_BATCH_SIZE,
+        min_batch_size=MIN_BATCH_SIZE,
+        max_batch_size=MAX_BATCH_SIZE,
+    )
+    async with AsyncGraphDatabase.driver(URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
+        async with driver.session(database=DATABASE) as session:
+            await create_indexes_and_constraints(session)
+        with Timer(name="nodes", text="Nodes loaded in {:.4f}s"):
+            await load_all(driver, NODE_SPECS, **kwargs)
+        with Timer(name="edges", text="Edges loaded in {:.4f}s"):
+            await load_all(driver, EDGE_SPECS, **kwargs)
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Bulk load the Neo4j graph from Arrow batches")
+    parser.add_argument("--assume_unique", action="store_true", help="Input has no duplicates: use CREATE instead of MERGE")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Number of concurrent write sessions per file")
+    parser.add_argument("--initial_batch_size", type=int, default=20_000, help="Starting batch size per session")
+    parser.add_argument("--min_batch_size", type=int, default=1_000, help="Lower bound for the tuned batch size")
+    parser.add_argument("--max_batch_size", type=int, default=500_000, help="Upper bound for the tuned batch size")
+    args = parser.parse_args()
+    # fmt: on
+
+    ASSUME_UNIQUE = args.assume_unique
+    NUM_WORKERS = args.workers
+    INITIAL_BATCH_SIZE = args.initial_batch_size
+    MIN_BATCH_SIZE = args.min_batch_size
+    MAX_BATCH_SIZE = args.max_batch_size
+    asyncio.run(main())
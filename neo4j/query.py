@@ -1,13 +1,24 @@
 """
 Run a series of queries on the Neo4j database
+The queries themselves are defined once for all backends in `workload/registry.py`
+
+    python query.py        # the quick queries
+    python query.py --all  # also the whole-graph traversals, which take seconds each
 """
+import argparse
 import os
+import sys
+from pathlib import Path
 
 import polars as pl
 from codetiming import Timer
 from dotenv import load_dotenv
 from neo4j import GraphDatabase, Session
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from workload import QUERIES, QUERIES_BY_ID, Neo4jBackend, Params, run_query  # noqa: E402
+from workload.recommend import people_you_may_know, people_you_may_know_batch  # noqa: E402
+
 load_dotenv()
 # Config
 URI = "bolt://localhost:7687"
@@ -15,184 +26,121 @@ NEO4J_USER = os.environ.get("NEO4J_USER")
 NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
 
 
-def run_query1(session: Session) -> None:
+def execute_query(
+    session: Session, query_id: int, params: Params | None = None, verbose: bool = True
+) -> pl.DataFrame:
+    "Run a query from the shared registry, using its default parameters unless given"
+    return run_query(Neo4jBackend(session), QUERIES_BY_ID[query_id], params, verbose)
+
+
+def run_query1(session: Session) -> pl.DataFrame:
     "Who are the top 3 most-followed persons in the network?"
-    query = """
-        MATCH (follower:Person)-[:FOLLOWS]->(person:Person)
-        RETURN person.personID AS personID, person.name AS name, count(follower) AS numFollowers
-        ORDER BY numFollowers DESC LIMIT 3
-    """
-    print(f"\nQuery 1:\n {query}")
-    # with Timer(name="query1", text="Query 1 completed in {:.6f}s"):
-    response = session.run(query)
-    result = pl.from_dicts(response.data())
-    print(f"Top 3 most-followed persons:\n{result}")
-    return result
-
-
-def run_query2(session: Session) -> None:
+    return execute_query(session, 1)
+
+
+def run_query2(session: Session) -> pl.DataFrame:
     "In which city does the most-followed person in the network live?"
-    query = """
-        MATCH (follower:Person) -[:FOLLOWS]-> (person:Person)
-        WITH person, count(follower) as followers
-        ORDER BY followers DESC LIMIT 1
-        MATCH (person) -[:LIVES_IN]-> (city:City)
-        RETURN person.name AS name, followers AS numFollowers, city.city AS city, city.state AS state, city.country AS country
-    """
-    print(f"\nQuery 2:\n {query}")
-    response = session.run(query)
-    result = pl.from_dicts(response.data())
-    print(f"City in which most-followed person lives:\n{result}")
-    return result
-
-
-def run_query3(session: Session, country: str) -> None:
+    return execute_query(session, 2)
+
+
+def run_query3(session: Session, country: str) -> pl.DataFrame:
     "Which 5 cities in a particular country have the lowest average age in the network?"
-    query = """
-        MATCH (p:Person) -[:LIVES_IN]-> (c:City) -[*1..2]-> (co:Country)
-        WHERE co.country = $country
-        RETURN c.city AS city, avg(p.age) AS averageAge
-        ORDER BY averageAge LIMIT 5
-    """
-    print(f"\nQuery 3:\n {query}")
-    response = session.run(query, country=country)
-    result = pl.from_dicts(response.data())
-    print(f"Cities with lowest average age in {country}:\n{result}")
-    return result
-
-
-def run_query4(session: Session, age_lower: int, age_upper: int) -> None:
+    return execute_query(session, 3, {"country": country})
+
+
+def run_query4(session: Session, age_lower: int, age_upper: int) -> pl.DataFrame:
     "How many persons between a certain age range are in each country?"
-    query = """
-        MATCH (p:Person)-[:LIVES_IN]->(ci:City)-[*1..2]->(country:Country)
-        WHERE p.age >= $age_lower AND p.age <= $age_upper
-        RETURN country.country AS countries, count(country) AS personCounts
-        ORDER BY personCounts DESC LIMIT 3
-    """
-    print(f"\nQuery 4:\n {query}")
-    response = session.run(query, age_lower=age_lower, age_upper=age_upper)
-    result = pl.from_dicts(response.data())
-    print(f"Persons between ages {age_lower}-{age_upper} in each country:\n{result}")
-    return result
-
-
-def run_query5(session: Session, gender: str, city: str, country: str, interest: str) -> None:
+    return execute_query(session, 4, {"age_lower": age_lower, "age_upper": age_upper})
+
+
+def run_query5(
+    session: Session, gender: str, city: str, country: str, interest: str
+) -> pl.DataFrame:
     "How many men in a particular city have an interest in the same thing?"
-    query = """
-        MATCH (p:Person)-[:HAS_INTEREST]->(i:Interest)
-        WHERE tolower(i.interest) = tolower($interest)
-        AND tolower(p.gender) = tolower($gender)
-        WITH p, i
-        MATCH (p)-[:LIVES_IN]->(c:City)
-        WHERE c.city = $city AND c.country = $country
-        RETURN count(p) AS numPersons
-    """
-    print(f"\nQuery 5:\n {query}")
-    response = session.run(query, gender=gender, city=city, country=country, interest=interest)
-    result = pl.from_dicts(response.data())
-    print(
-        f"Number of {gender} users in {city}, {country} who have an interest in {interest}:\n{result}"
-    )
-    return result
-
-
-def run_query6(session: Session, gender: str, interest: str) -> None:
+    params = {"gender": gender, "city": city, "country": country, "interest": interest}
+    return execute_query(session, 5, params)
+
+
+def run_query6(session: Session, gender: str, interest: str) -> pl.DataFrame:
     "Which city has the maximum number of people of a particular gender that share a particular interest"
-    query = """
-        MATCH (p:Person)-[:HAS_INTEREST]->(i:Interest)
-        WHERE tolower(i.interest) = tolower($interest)
-        AND tolower(p.gender) = tolower($gender)
-        WITH p, i
-        MATCH (p)-[:LIVES_IN]->(c:City)
-        RETURN count(p) AS numPersons, c.city AS city, c.country AS country
-        ORDER BY numPersons DESC LIMIT 5
-    """
-    print(f"\nQuery 6:\n {query}")
-    response = session.run(query, gender=gender, interest=interest)
-    result = pl.from_dicts(response.data())
-    print(f"Cities with the most {gender} users who have an interest in {interest}:\n{result}")
-    return result
+    return execute_query(session, 6, {"gender": gender, "interest": interest})
 
 
 def run_query7(
     session: Session, country: str, age_lower: int, age_upper: int, interest: str
-) -> None:
+) -> pl.DataFrame:
     "Which U.S. state has the maximum number of persons between a specified age who enjoy a particular interest?"
-    query = """
-        MATCH (p:Person)-[:LIVES_IN]->(:City)-[:CITY_IN]->(s:State)
-        WHERE p.age >= $age_lower AND p.age <= $age_upper AND s.country = $country
-        WITH p, s
-        MATCH (p)-[:HAS_INTEREST]->(i:Interest)
-        WHERE tolower(i.interest) = tolower($interest)
-        RETURN count(p) AS numPersons, s.state AS state, s.country AS country
-        ORDER BY numPersons DESC LIMIT 1
-    """
-    print(f"\nQuery 7:\n {query}")
-    response = session.run(
-        query, country=country, age_lower=age_lower, age_upper=age_upper, interest=interest
-    )
-    result = pl.from_dicts(response.data())
-    print(
-        f"""
-        State in {country} with the most users between ages {age_lower}-{age_upper} who have an interest in {interest}:\n{result}
-        """
-    )
-    return result
-
-
-def run_query8(session: Session) -> None:
+    params = {
+        "country": country,
+        "age_lower": age_lower,
+        "age_upper": age_upper,
+        "interest": interest,
+    }
+    return execute_query(session, 7, params)
+
+
+def run_query8(session: Session) -> pl.DataFrame:
     "How many second-degree paths exist in the graph?"
-    query = """
-        MATCH (a:Person)-[r1:FOLLOWS]->(b:Person)-[r2:FOLLOWS]->(c:Person)
-        RETURN count(*) AS numPaths
-    """
-
-    print(f"\nQuery 8:\n {query}")
-    response = session.run(query)
-    result = pl.from_dicts(response.data())
-    print(
-        f"""
-        Number of second-degree paths:\n{result}
-        """
-    )
-    return result
-
-
-def run_query9(session: Session, age_1: int, age_2: int) -> None:
+    return execute_query(session, 8)
+
+
+def run_query9(session: Session, age_1: int, age_2: int) -> pl.DataFrame:
     "How many paths exist in the graph through persons below a certain age to persons above a certain age?"
-    query = """
-        MATCH (a:Person)-[r1:FOLLOWS]->(b:Person)-[r2:FOLLOWS]->(c:Person)
-        WHERE b.age < $age_1 AND c.age > $age_2
-        RETURN count(*) as numPaths
-    """
-
-    print(f"\nQuery 9:\n {query}")
-    response = session.run(query, age_1=age_1, age_2=age_2)
-    result = pl.from_dicts(response.data())
-    print(
-        f"""
-        Number of paths through persons below {age_1} to persons above {age_2}:\n{result}
-        """
-    )
-    return result
-
-
-def main() -> None:
+    return execute_query(session, 9, {"age_1": age_1, "age_2": age_2})
+
+
+def run_query10(session: Session, person_id: int) -> pl.DataFrame:
+    "How many persons can a person reach within 3 hops?"
+    return execute_query(session, 10, {"person_id": person_id})
+
+
+def run_query11(session: Session, person_id: int) -> pl.DataFrame:
+    "How many persons can a person reach within 4 hops?"
+    return execute_query(session, 11, {"person_id": person_id})
+
+
+def run_query12(session: Session, source_id: int, target_id: int) -> pl.DataFrame:
+    "How many hops is the shortest path from one person to another?"
+    return execute_query(session, 12, {"source_id": source_id, "target_id": target_id})
+
+
+def run_query14(session: Session) -> pl.DataFrame:
+    "How many follow triangles (a follows b follows c follows a) are in the graph?"
+    return execute_query(session, 14)
+
+
+def run_query15(session: Session) -> pl.DataFrame:
+    "Which 10 persons are in the most follow triangles?"
+    return execute_query(session, 15)
+
+
+def run_people_you_may_know(session: Session, person_id: int, limit: int = 10) -> pl.DataFrame:
+    "Whom might a person know, by mutual connections and shared interests?"
+    return people_you_may_know(Neo4jBackend(session), person_id, limit)
+
+
+def run_people_you_may_know_batch(
+    session: Session, person_ids: list[int], limit: int = 10
+) -> pl.DataFrame:
+    "Whom might each of many persons know, answered in a single query?"
+    return people_you_may_know_batch(Neo4jBackend(session), person_ids, limit)
+
+
+def main(include_heavy: bool = False) -> None:
     with GraphDatabase.driver(URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
         with driver.session(database="neo4j") as session:
             with Timer(name="queries", text="Neo4j query script completed in {:.6f}s"):
-                # fmt: off
-                _ = run_query1(session)
-                _ = run_query2(session)
-                _ = run_query3(session, country="United States")
-                _ = run_query4(session, age_lower=30, age_upper=40)
-                _ = run_query5(session, gender="male", city="London", country="United Kingdom", interest="fine dining")
-                _ = run_query6(session, gender="female", interest="tennis")
-                _ = run_query7(session, country="United States", age_lower=23, age_upper=30, interest="photography")
-                _ = run_query8(session)
-                _ = run_query9(session, age_1=50, age_2=25)
-                # fmt: on
+                for spec in QUERIES:
+                    # Skip queries that need Kùzu features (the weighted shortest path)
+                    if Neo4jBackend(session).supports(spec) and (include_heavy or not spec.heavy):
+                        _ = execute_query(session, spec.id)
 
 
 if __name__ == "__main__":
-    main()
+    # fmt: off
+    parser = argparse.ArgumentParser("Run the benchmark queries on the Neo4j database")
+    parser.add_argument("--all", action="store_true", help="Also run the whole-graph traversals (queries 10-15), which take seconds each")
+    args = parser.parse_args()
+    # fmt: on
+
+    main(include_heavy=args.all)
@@ -0,0 +1,153 @@
+"""
+Check the bulk loader against a fake driver that records every batch it receives, so no running
+Neo4j instance is needed.
+"""
+import asyncio
+import dataclasses
+
+import polars as pl
+import pyarrow as pa
+import pytest
+
+import bulk_load
+
+
+class FakeTransaction:
+    def __init__(self, session: "FakeSession") -> None:
+        self.session = session
+
+    async def run(self, query: str, **params) -> None:
+        driver = self.session.driver
+        driver.batches.append((self.session.session_id, query, params["data"]))
+        driver.concurrent |= {
+            frozenset((self.session.session_id, other))
+            for other in driver.active
+            if other != self.session.session_id
+        }
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeDriver", session_id: int) -> None:
+        self.driver = driver
+        self.session_id = session_id
+
+    async def __aenter__(self) -> "FakeSession":
+        self.driver.active.add(self.session_id)
+        self.driver.max_active = max(self.driver.max_active, len(self.driver.active))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.driver.active.discard(self.session_id)
+
+    async def execute_write(self, func, *args, **kwargs):
+        # Yield control so that concurrent sessions interleave like they would over the network
+        await asyncio.sleep(0)
+        return await func(FakeTransaction(self), *args, **kwargs)
+
+
+class FakeDriver:
+    def __init__(self) -> None:
+        self.batches: list[tuple[int, str, list[dict]]] = []
+        self.num_sessions = 0
+        # Sessions open at the moment, and the pairs of sessions that wrote while both were open
+        self.active: set[int] = set()
+        self.max_active = 0
+        self.concurrent: set[frozenset[int]] = set()
+
+    def session(self, **kwargs) -> FakeSession:
+        self.num_sessions += 1
+        return FakeSession(self, self.num_sessions)
+
+
+@pytest.fixture
+def follows_spec(tmp_path):
+    edges = pl.DataFrame({"from": [i % 97 + 1 for i in range(5000)], "to": list(range(5000))})
+    edges.write_parquet(tmp_path / "follows.parquet")
+    spec = bulk_load.edge_spec(
+        "follows", "follows.parquet", ("Person", "personID"), ("Person", "personID"), "FOLLOWS"
+    )
+    return dataclasses.replace(spec, path=tmp_path / "follows.parquet")
+
+
+def load(driver: FakeDriver, spec: bulk_load.LoadSpec, **kwargs) -> bulk_load.LoadStats:
+    options = dict(
+        assume_unique=True,
+        num_workers=4,
+        initial_batch_size=100,
+        min_batch_size=50,
+        max_batch_size=800,
+    )
+    options.update(kwargs)
+    return asyncio.run(bulk_load.load_file(driver, spec, **options))
+
+
+def test_every_row_is_sent_exactly_once(follows_spec):
+    driver = FakeDriver()
+    stats = load(driver, follows_spec)
+    rows = [row for _, _, batch in driver.batches for row in batch]
+
+    assert stats.rows == 5000
+    assert sorted(row["to"] for row in rows) == list(range(5000))
+
+
+def test_concurrent_sessions_lock_disjoint_nodes(follows_spec):
+    driver = FakeDriver()
+    load(driver, follows_spec)
+    # Both ends of a follows edge are persons, so both are locked by the write
+    ids_by_session: dict[int, set[int]] = {}
+    for session_id, _, batch in driver.batches:
+        ids = ids_by_session.setdefault(session_id, set())
+        ids.update(row["from"] for row in batch)
+        ids.update(row["to"] for row in batch)
+
+    assert driver.max_active == 4
+    assert driver.concurrent
+    for pair in driver.concurrent:
+        first, second = pair
+        assert ids_by_session[first].isdisjoint(ids_by_session[second])
+
+
+def test_rounds_share_no_node_range():
+    table = pa.table({"from": [i % 97 + 1 for i in range(5000)], "to": list(range(5000))})
+    rounds = bulk_load.partition_by_range(table, (("from", "Person"), ("to", "Person")), 4)
+
+    assert sum(partition.num_rows for partitions in rounds for partition in partitions) == 5000
+    assert all(len(partitions) <= 4 for partitions in rounds)
+    for partitions in rounds:
+        ids = [set(p["from"].to_pylist()) | set(p["to"].to_pylist()) for p in partitions]
+        assert sum(map(len, ids)) == len(set().union(*ids))
+
+
+def test_create_or_merge(follows_spec):
+    driver = FakeDriver()
+    load(driver, follows_spec, assume_unique=True)
+    assert all("CREATE (a)-[:FOLLOWS]->(b)" in query for _, query, _ in driver.batches)
+
+    driver = FakeDriver()
+    load(driver, follows_spec, assume_unique=False)
+    assert all("MERGE (a)-[:FOLLOWS]->(b)" in query for _, query, _ in driver.batches)
+
+
+def test_batch_sizes_stay_within_bounds():
+    table = pa.table({"id": list(range(20_000))})
+    tuner = bulk_load.BatchSizeTuner(100, 50, 800)
+    batch_sizes = []
+    for batch in bulk_load.iter_arrow_batches(table, tuner):
+        batch_sizes.append(len(batch))
+        # Simulated write times with the best throughput at 400 rows, instead of the wall clock
+        tuner.record(len(batch), 1 + (len(batch) / 400) ** 2)
+
+    assert sum(batch_sizes) == 20_000
+    assert max(batch_sizes) <= 800
+    # Only the trailing batch may fall below the lower bound
+    assert all(size >= 50 for size in batch_sizes[:-1])
+    assert len(set(batch_sizes)) > 1
+
+
+def test_tuner_reverses_when_throughput_drops():
+    tuner = bulk_load.BatchSizeTuner(1000, 100, 100_000)
+    tuner.record(1000, 1.0)
+    assert tuner.batch_size == 2000
+    # Half the throughput of the previous batch: step back down
+    tuner.record(2000, 4.0)
+    assert tuner.batch_size == 1000
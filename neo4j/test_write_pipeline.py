@@ -0,0 +1,93 @@
+"""
+Check the bounds and the failure handling of the write pipeline in `build_graph.py` against a fake
+driver, so no running Neo4j instance is needed.
+"""
+import asyncio
+
+import polars as pl
+import pytest
+
+import build_graph
+
+
+class FakeSession:
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def execute_write(self, func, *args, **kwargs):
+        # Yield control so that concurrent sessions interleave like they would over the network
+        await asyncio.sleep(0)
+        return await func(None, *args, **kwargs)
+
+
+class FakeDriver:
+    def session(self, **kwargs) -> FakeSession:
+        return FakeSession()
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    # Set under `__main__` when the script is run
+    monkeypatch.setattr(build_graph, "BATCH_SIZE", 10, raising=False)
+    monkeypatch.setattr(build_graph, "MAX_BATCH_BYTES", 1 << 20, raising=False)
+    monkeypatch.setattr(build_graph, "QUEUE_DEPTH", 2, raising=False)
+    monkeypatch.setattr(build_graph, "WRITERS_PER_JOB", 2, raising=False)
+    monkeypatch.setattr(build_graph, "MAX_SESSIONS", 4, raising=False)
+    monkeypatch.setattr(build_graph, "MAX_BATCHES_IN_MEMORY", 3, raising=False)
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    """Node jobs with disjoint labels, so that they all run at once"""
+    paths = []
+    for name in ["a", "b", "c"]:
+        pl.DataFrame({"id": list(range(200))}).write_parquet(tmp_path / f"{name}.parquet")
+        paths.append((name, tmp_path / f"{name}.parquet"))
+    return paths
+
+
+def test_converted_batches_are_capped_across_jobs(jobs, monkeypatch):
+    in_memory = {"now": 0, "peak": 0, "rows": 0}
+    iter_parquet_batches = build_graph.iter_parquet_batches
+
+    def counting_batches(*args):
+        for batch in iter_parquet_batches(*args):
+            in_memory["now"] += 1
+            in_memory["peak"] = max(in_memory["peak"], in_memory["now"])
+            yield batch
+
+    async def write(tx, data) -> None:
+        await asyncio.sleep(0)
+        in_memory["now"] -= 1
+        in_memory["rows"] += len(data)
+
+    monkeypatch.setattr(build_graph, "iter_parquet_batches", counting_batches)
+    write_jobs = [build_graph.WriteJob(name, path, write, (name,), True) for name, path in jobs]
+    metrics = asyncio.run(build_graph.run_pipeline(FakeDriver(), write_jobs))
+
+    assert in_memory["rows"] == 600
+    assert [m.write.rows for m in metrics] == [200, 200, 200]
+    assert in_memory["peak"] <= 3
+
+
+def test_failing_writer_cancels_the_pipeline(jobs):
+    async def fail(tx, data) -> None:
+        raise RuntimeError("write failed")
+
+    async def write(tx, data) -> None:
+        await asyncio.sleep(0)
+
+    (name, path), *others = jobs
+    write_jobs = [build_graph.WriteJob(name, path, fail, (name,), True)]
+    write_jobs += [build_graph.WriteJob(name, path, write, (name,), True) for name, path in others]
+
+    async def run() -> None:
+        # Without cancellation the producer of the failing job blocks on the full queue
+        await asyncio.wait_for(build_graph.run_pipeline(FakeDriver(), write_jobs), timeout=10)
+
+    with pytest.raises(ExceptionGroup) as error:
+        asyncio.run(run())
+    assert error.group_contains(RuntimeError, match="write failed")
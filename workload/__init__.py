@@ -0,0 +1,44 @@
+"""
+Query workload shared by the Kùzu and Neo4j scripts: the query registry, backend adapters and
+a backend-agnostic executor for running and timing the queries.
+"""
+
+from workload.backends import CypherBackend, KuzuBackend, Neo4jBackend
+from workload.executor import (
+    Backend,
+    Timing,
+    benchmark_query,
+    check,
+    run_query,
+    time_query,
+    time_suite,
+)
+from workload.registry import (
+    QUERIES,
+    QUERIES_BY_ID,
+    Expected,
+    Params,
+    QuerySpec,
+    check_ranking,
+    check_result,
+)
+
+__all__ = [
+    "QUERIES",
+    "QUERIES_BY_ID",
+    "Backend",
+    "CypherBackend",
+    "Expected",
+    "KuzuBackend",
+    "Neo4jBackend",
+    "Params",
+    "QuerySpec",
+    "Timing",
+    "benchmark_query",
+    "check",
+    "check_ranking",
+    "check_result",
+    "run_query",
+    "time_query",
+    "time_suite",
+]
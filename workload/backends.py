@@ -0,0 +1,46 @@
+"""
+Adapters that run the registry's Cypher on each database.
+They only rely on the connection/session objects passed in, so importing this module does not
+require either database client to be installed.
+"""
+
+from abc import ABC, abstractmethod
+
+import polars as pl
+
+from workload.registry import Params, QuerySpec
+
+
+class CypherBackend(ABC):
+    """Runs the spec's Cypher text for this backend's `name`"""
+
+    name: str
+
+    def supports(self, spec: QuerySpec) -> bool:
+        return self.name in spec.cypher
+
+    def run(self, spec: QuerySpec, params: Params) -> pl.DataFrame:
+        return self.execute(spec.cypher[self.name], params)
+
+    @abstractmethod
+    def execute(self, query: str, params: Params) -> pl.DataFrame: ...
+
+
+class KuzuBackend(CypherBackend):
+    name = "kuzu"
+
+    def __init__(self, conn) -> None:
+        self.conn = conn
+
+    def execute(self, query: str, params: Params) -> pl.DataFrame:
+        return self.conn.execute(query, parameters=params).get_as_pl()
+
+
+class Neo4jBackend(CypherBackend):
+    name = "neo4j"
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def execute(self, query: str, params: Params) -> pl.DataFrame:
+        return pl.from_dicts(self.session.run(query, parameters=params).data())
@@ -0,0 +1,154 @@
+"""
+Batched execution of the per-entity queries 5-7 for many parameter combinations at once.
+
+A dashboard that calls query 5 once per (gender, city, country, interest) pays for a full plan and
+traversal per call. Here the whole list of parameter combinations is passed as one `$params` list,
+`UNWIND` into the pattern and aggregated per combination, so the database plans and runs a single
+query. Results come back keyed by the parameter columns, with the same rows per combination as the
+per-call query would return (including zero counts for query 5). The batched Cypher is kept in the
+registry next to the per-call Cypher (`QuerySpec.batched_cypher`).
+
+    python -m workload.batch --backend kuzu --sizes 10 100 1000
+"""
+
+import argparse
+import contextlib
+import random
+import time
+from pathlib import Path
+
+import polars as pl
+
+from workload.backends import CypherBackend
+from workload.registry import QUERIES, QUERIES_BY_ID, Params, QuerySpec
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data"
+NODES_PATH = DATA_PATH / "output" / "nodes"
+
+
+# Queries with a batched form in the registry
+BATCHED_QUERY_IDS = [spec.id for spec in QUERIES if spec.batched_cypher]
+
+
+def drop_param_columns(spec: QuerySpec, result: pl.DataFrame) -> pl.DataFrame:
+    """Drop result columns that repeat a parameter (like the country of query 7)"""
+    return result.drop([col for col in spec.params if col in result.columns])
+
+
+def run_batched(
+    backend: CypherBackend, query_id: int, params_list: list[Params]
+) -> pl.DataFrame:
+    """
+    Run one query for every parameter combination in a single round trip. The result has the
+    parameter columns followed by the query's own columns, ranked and limited per combination.
+    """
+    spec = QUERIES_BY_ID[query_id]
+    if not spec.batched_cypher:
+        raise ValueError(f"Query {query_id} has no batched form")
+    bound = [{**spec.bind(params), "batch_index": i} for i, params in enumerate(params_list)]
+    keys = pl.DataFrame(bound, schema={**spec.params_schema(), "batch_index": pl.Int64})
+    cypher = spec.batched_cypher[backend.name]
+    result = drop_param_columns(spec, backend.execute(cypher, {"params": bound}))
+    if not spec.rank_by:
+        # One aggregate row per combination, which is zero where nothing matched
+        result = keys.join(result, on="batch_index", how="left").with_columns(
+            pl.col(col).fill_null(0) for col in result.columns if col != "batch_index"
+        )
+    else:
+        # Rank within each combination, breaking ties on the remaining columns
+        tie_breakers = [col for col in result.columns if col not in ("batch_index", *spec.rank_by)]
+        result = (
+            keys.join(result, on="batch_index")
+            .sort(
+                ["batch_index", *spec.rank_by, *tie_breakers],
+                descending=[False, *[True] * len(spec.rank_by), *[False] * len(tie_breakers)],
+            )
+            .group_by("batch_index", maintain_order=True)
+            .head(spec.limit)
+        )
+    return result.sort("batch_index", maintain_order=True).drop("batch_index")
+
+
+def run_loop(backend: CypherBackend, query_id: int, params_list: list[Params]) -> pl.DataFrame:
+    """The per-call equivalent of `run_batched`, one query per parameter combination"""
+    spec = QUERIES_BY_ID[query_id]
+    frames = []
+    for params in params_list:
+        bound = spec.bind(params)
+        result = drop_param_columns(spec, backend.run(spec, bound))
+        frames.append(
+            pl.DataFrame([bound] * result.height, schema=spec.params_schema()).hstack(result)
+        )
+    return pl.concat(frames)
+
+
+def sample_params(query_id: int, num: int, seed: int = 0) -> list[Params]:
+    """Random parameter combinations for a query, drawn from the values in the dataset"""
+    rng = random.Random(seed)
+    cities = pl.read_parquet(NODES_PATH / "cities.parquet").select("city", "country").rows()
+    countries = pl.read_parquet(NODES_PATH / "countries.parquet")["country"].to_list()
+    interests = pl.read_parquet(NODES_PATH / "interests.parquet")["interest"].to_list()
+    params_list = []
+    for _ in range(num):
+        gender = rng.choice(["male", "female"])
+        interest = rng.choice(interests)
+        if query_id == 5:
+            city, country = rng.choice(cities)
+            params = {"gender": gender, "city": city, "country": country, "interest": interest}
+        elif query_id == 6:
+            params = {"gender": gender, "interest": interest}
+        else:
+            age_lower = rng.randint(18, 60)
+            params = {
+                "country": rng.choice(countries),
+                "age_lower": age_lower,
+                "age_upper": age_lower + rng.randint(5, 15),
+                "interest": interest,
+            }
+        params_list.append(params)
+    return params_list
+
+
+def main() -> None:
+    from workload.compare import open_backend
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        backend = open_backend(BACKEND, stack)
+        for query_id in QUERY_IDS:
+            for size in SIZES:
+                params_list = sample_params(query_id, size)
+                timings = {}
+                for name, func in (("loop", run_loop), ("batched", run_batched)):
+                    start = time.perf_counter()
+                    func(backend, query_id, params_list)
+                    timings[name] = time.perf_counter() - start
+                results.append(
+                    {
+                        "query": query_id,
+                        "combinations": size,
+                        "loop_s": timings["loop"],
+                        "batched_s": timings["batched"],
+                        "loop_per_s": size / timings["loop"],
+                        "batched_per_s": size / timings["batched"],
+                        "speedup": timings["loop"] / timings["batched"],
+                    }
+                )
+    results_df = pl.DataFrame(results)
+    with pl.Config(tbl_rows=len(results_df), tbl_cols=len(results_df.columns)):
+        print(f"Batched vs. per-call execution on {BACKEND}:\n{results_df}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Compare batched and per-call execution of queries 5-7")
+    parser.add_argument("--backend", "-b", choices=["kuzu", "neo4j"], default="kuzu", help="Backend to run on")
+    parser.add_argument("--queries", "-q", type=int, nargs="+", default=BATCHED_QUERY_IDS, choices=BATCHED_QUERY_IDS, help="Queries to batch")
+    parser.add_argument("--sizes", "-s", type=int, nargs="+", default=[10, 100, 1000], help="Numbers of parameter combinations")
+    args = parser.parse_args()
+    # fmt: on
+
+    BACKEND = args.backend
+    QUERY_IDS = args.queries
+    SIZES = args.sizes
+    main()
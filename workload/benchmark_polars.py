@@ -0,0 +1,26 @@
+"""
+Use the `pytest-benchmark` library to benchmark the Polars dataframe backend on the same query
+specs and assertions as the Kùzu and Neo4j benchmarks.
+`pip install pytest-benchmark`
+
+    pytest workload/benchmark_polars.py
+"""
+import pytest
+
+from workload import QUERIES, benchmark_query
+from workload.polars_backend import PolarsBackend
+from workload.reference import ReferenceBackend
+
+
+@pytest.fixture(scope="session")
+def reference():
+    return ReferenceBackend.from_parquet()
+
+
+@pytest.mark.parametrize("engine", ["streaming", "in-memory"])
+@pytest.mark.parametrize("spec", QUERIES, ids=lambda spec: f"query{spec.id}")
+def test_benchmark_query(benchmark, reference, spec, engine):
+    backend = PolarsBackend(engine=engine)
+    if not backend.supports(spec):
+        pytest.skip(f"Query {spec.id} has no Polars plan")
+    benchmark_query(benchmark, backend, spec, reference=reference)
@@ -0,0 +1,130 @@
+"""
+Content-hash build cache for the data generators and the database loaders.
+
+A build step is identified by a key hashed from everything that determines its output: the source
+of the script that runs it (including the local modules it imports), its parameters, and the
+content hashes of its input files. A `BuildManifest` records, per step, the key of the last run
+and the content hashes of the files it wrote. A step is current, and can be skipped, when its key
+is unchanged and its outputs still exist with the recorded hashes, so an output that was edited,
+regenerated with other settings or deleted is rebuilt.
+"""
+
+import ast
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+REPO_PATH = Path(__file__).resolve().parents[1]
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def local_imports(script: Path) -> set[Path]:
+    """
+    The script and the modules of this repository it imports, directly or through each other,
+    found next to the script or from the repository root (as `workload` is)
+    """
+    found, pending = set(), [script.resolve()]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        for node in ast.walk(ast.parse(path.read_text())):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                parts = name.split(".")
+                for base in (path.parent, REPO_PATH):
+                    for candidate in (
+                        base.joinpath(*parts).with_suffix(".py"),
+                        base.joinpath(*parts, "__init__.py"),
+                    ):
+                        if candidate.is_file():
+                            pending.append(candidate)
+    return found
+
+
+def source_digest(script: Path) -> str:
+    """Hash of the script's source and of the local modules it imports"""
+    digest = hashlib.sha256()
+    for path in sorted(local_imports(script)):
+        digest.update(os.path.relpath(path, script.resolve().parent).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def cache_key(**parts: Any) -> str:
+    """Hash of the JSON-serializable parts (script digests, parameters, input digests)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class BuildManifest:
+    """
+    Keys and output hashes of the build steps, stored as JSON at `path`. Output paths are stored
+    relative to `root`, so a manifest stays valid when the directory it describes is copied.
+    """
+
+    def __init__(self, path: Path, root: Path | None = None) -> None:
+        self.path = path
+        self.root = root if root is not None else path.parent
+        self.steps: dict[str, dict[str, Any]] = {}
+        # Digests computed in this process, so that a file written by one step and read by the
+        # next is only hashed once
+        self._digests: dict[Path, str] = {}
+        if path.exists():
+            manifest = json.loads(path.read_text())
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.steps = manifest["steps"]
+
+    def digest(self, path: Path) -> str:
+        path = path.resolve()
+        if path not in self._digests:
+            self._digests[path] = file_digest(path)
+        return self._digests[path]
+
+    def input_digests(self, paths: list[Path]) -> dict[str, str]:
+        root = self.root.resolve()
+        return {str(path.resolve().relative_to(root)): self.digest(path) for path in paths}
+
+    def is_current(self, step: str, key: str) -> bool:
+        entry = self.steps.get(step)
+        if entry is None or entry["key"] != key:
+            return False
+        for name, expected in entry["outputs"].items():
+            path = self.root / name
+            if not path.is_file() or self.digest(path) != expected:
+                return False
+        return True
+
+    def record(self, step: str, key: str, outputs: list[Path], **details: Any) -> None:
+        """
+        Record a step that just ran, hashing its outputs, and save the manifest. The details are
+        stored as they are with the step, for checks the hashes cannot do (see `build_graph.py`).
+        """
+        for path in outputs:
+            self._digests.pop(path.resolve(), None)
+        self.steps[step] = {"key": key, "outputs": self.input_digests(outputs), **details}
+        self.save()
+
+    def invalidate(self, step: str) -> None:
+        if self.steps.pop(step, None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        # Write to a temporary file first, so an interrupted run never leaves a partial manifest
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "steps": self.steps}, indent=2)
+        )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,85 @@
+"""
+Time the query suite on several backends with the same executor.
+
+    python -m workload.compare --backends kuzu neo4j polars reference --rounds 5
+"""
+
+import argparse
+import contextlib
+import os
+from pathlib import Path
+
+import polars as pl
+
+from workload.backends import KuzuBackend, Neo4jBackend
+from workload.executor import Backend, time_suite
+from workload.polars_backend import PolarsBackend
+from workload.reference import ReferenceBackend
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+KUZU_DB_PATH = ROOT_PATH / "kuzudb" / "social_network"
+NEO4J_URI = "bolt://localhost:7687"
+
+
+def open_backend(name: str, stack: contextlib.ExitStack) -> Backend:
+    if name == "polars":
+        return PolarsBackend()
+    if name == "polars-in-memory":
+        return PolarsBackend(engine="in-memory")
+    if name == "reference":
+        return ReferenceBackend.from_parquet()
+    if name == "kuzu":
+        import kuzu
+
+        db = kuzu.Database(str(KUZU_DB_PATH), read_only=True)
+        # Default num_threads=0 uses as many threads as hardware and utilization allows
+        return KuzuBackend(kuzu.Connection(db, num_threads=0))
+    if name == "neo4j":
+        from dotenv import load_dotenv
+        from neo4j import GraphDatabase
+
+        load_dotenv(ROOT_PATH / "neo4j" / ".env")
+        auth = (os.environ.get("NEO4J_USER"), os.environ.get("NEO4J_PASSWORD"))
+        driver = stack.enter_context(GraphDatabase.driver(NEO4J_URI, auth=auth))
+        return Neo4jBackend(stack.enter_context(driver.session(database="neo4j")))
+    raise ValueError(f"Unknown backend `{name}`")
+
+
+def main() -> None:
+    with contextlib.ExitStack() as stack:
+        backends = [open_backend(name, stack) for name in BACKENDS]
+        # Check against the reference engine's results for the generated dataset by default
+        reference = None
+        if EXPECTED == "reference":
+            reference = next(
+                (b for b in backends if isinstance(b, ReferenceBackend)), None
+            ) or ReferenceBackend.from_parquet()
+        timings = time_suite(
+            backends,
+            rounds=ROUNDS,
+            warmup=WARMUP,
+            check_results=EXPECTED != "none",
+            reference=reference,
+        )
+    summary = timings.pivot(on="backend", index="query", values="mean_s")
+    memory = timings.pivot(on="backend", index="query", values="peak_rss_mb")
+    with pl.Config(tbl_rows=len(summary)):
+        print(f"Mean run time (s) over {ROUNDS} rounds:\n{summary}")
+        print(f"Peak memory above baseline (MB) in this process:\n{memory}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Time the query suite on several backends")
+    parser.add_argument("--backends", nargs="+", default=["kuzu"], help="Backends to compare")
+    parser.add_argument("--rounds", "-r", type=int, default=5, help="Timed rounds per query")
+    parser.add_argument("--warmup", "-w", type=int, default=1, help="Warmup runs per query")
+    parser.add_argument("--expected", choices=["reference", "registry", "none"], default="reference", help="What to check results against")
+    args = parser.parse_args()
+    # fmt: on
+
+    BACKENDS = args.backends
+    ROUNDS = args.rounds
+    WARMUP = args.warmup
+    EXPECTED = args.expected
+    main()
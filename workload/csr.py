@@ -0,0 +1,61 @@
+"""
+Compressed sparse row (CSR) adjacency arrays built with NumPy.
+
+Nodes are addressed by their dense index (position in the sorted ID array of their node table),
+and the neighbors of node `i` are `neighbors[offsets[i]:offsets[i + 1]]`.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CSR:
+    offsets: np.ndarray
+    neighbors: np.ndarray
+
+    @classmethod
+    def from_edges(cls, src: np.ndarray, dst: np.ndarray, num_nodes: int) -> "CSR":
+        order = np.argsort(src, kind="stable")
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=offsets[1:])
+        return cls(offsets, dst[order].astype(np.int64))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.neighbors)
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def edges(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the (source, target) index arrays of all edges"""
+        return np.repeat(np.arange(self.num_nodes), self.degrees()), np.asarray(self.neighbors)
+
+    def transpose(self, num_targets: int | None = None) -> "CSR":
+        """Reverse the direction of every edge"""
+        src, dst = self.edges()
+        return CSR.from_edges(dst, src, num_targets or self.num_nodes)
+
+    def expand(self, sources: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        List the neighbors of every node in `sources` in one vectorized step.
+        Returns the position in `sources` that each neighbor belongs to, and the neighbors.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        starts = self.offsets[sources]
+        counts = self.offsets[sources + 1] - starts
+        positions = np.repeat(np.arange(len(sources)), counts)
+        # Offset of each output element within its source's neighbor list
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return positions, np.asarray(self.neighbors[np.repeat(starts, counts) + within])
+
+
+def index_of(ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Map node IDs to dense indices, given the sorted ID array of the node table"""
+    return np.searchsorted(ids, values)
@@ -0,0 +1,139 @@
+"""
+Backend-agnostic execution and timing of the query specs in `registry.py`.
+
+A backend is anything with a `name`, a `supports(spec)` check and a `run(spec, params)` method that
+returns a polars DataFrame, so every engine goes through the same code path and pays the same
+measurement overhead. Results can be checked against the registry's expected values, or against
+the reference engine's results for whatever dataset was generated.
+
+Timings include the peak resident memory of the process during the timed rounds, above what it
+was using beforehand. This covers embedded engines (Kùzu, Polars, the reference engine) but not
+a database server in another process (Neo4j).
+"""
+
+import gc
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Protocol
+
+import polars as pl
+
+from workload.instrument import PeakRss, measure
+from workload.registry import QUERIES, Params, QuerySpec, check_ranking, check_result
+
+
+class Backend(Protocol):
+    name: str
+
+    def supports(self, spec: QuerySpec) -> bool: ...
+
+    def run(self, spec: QuerySpec, params: Params) -> pl.DataFrame: ...
+
+
+def run_query(
+    backend: Backend, spec: QuerySpec, params: Params | None = None, verbose: bool = True
+) -> pl.DataFrame:
+    bound = spec.bind(params)
+    if verbose:
+        print(f"\nQuery {spec.id}:\n {spec.cypher.get(backend.name, spec.description)}")
+    with measure("query", backend=backend.name, query=spec.id):
+        result = backend.run(spec, bound)
+    if verbose:
+        print(f"{spec.summary.format(**bound)}:\n{result}")
+    return result
+
+
+def check(
+    spec: QuerySpec, result: pl.DataFrame, params: Params | None = None, reference: Any = None
+) -> None:
+    """
+    Check a result against the reference engine when one is given, else against the
+    expected values in the registry
+    """
+    if reference is not None and reference.supports(spec):
+        check_ranking(spec, result, reference.ranking(spec, spec.bind(params)))
+    else:
+        check_result(spec, result)
+
+
+def benchmark_query(
+    benchmark: Any,
+    backend: Backend,
+    spec: QuerySpec,
+    params: Params | None = None,
+    reference: Any = None,
+) -> pl.DataFrame:
+    """Run a spec under the `pytest-benchmark` fixture and check its result"""
+    result = benchmark(run_query, backend, spec, params, verbose=False)
+    check(spec, result, params, reference)
+    return result
+
+
+@dataclass
+class Timing:
+    backend: str
+    query: int
+    rounds: int
+    min_s: float
+    mean_s: float
+    median_s: float
+    max_s: float
+    # Peak RSS during the timed rounds above the RSS before them, if it could be measured
+    peak_rss_mb: float | None = None
+
+
+def time_query(
+    backend: Backend,
+    spec: QuerySpec,
+    params: Params | None = None,
+    rounds: int = 5,
+    warmup: int = 1,
+) -> Timing:
+    """Time a spec over several rounds after warmup runs, with the GC disabled while timing"""
+    bound = spec.bind(params)
+    for _ in range(warmup):
+        backend.run(spec, bound)
+    times = []
+    with PeakRss() as peak_rss:
+        gc.disable()
+        try:
+            with measure("query", backend=backend.name, query=spec.id, rounds=rounds):
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    backend.run(spec, bound)
+                    times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return Timing(
+        backend=backend.name,
+        query=spec.id,
+        rounds=rounds,
+        min_s=min(times),
+        mean_s=statistics.mean(times),
+        median_s=statistics.median(times),
+        max_s=max(times),
+        peak_rss_mb=peak_rss.delta_mb,
+    )
+
+
+def time_suite(
+    backends: list[Backend],
+    specs: list[QuerySpec] = QUERIES,
+    rounds: int = 5,
+    warmup: int = 1,
+    check_results: bool = True,
+    reference: Any = None,
+) -> pl.DataFrame:
+    """
+    Time every spec on every backend that supports it, optionally checking each result first
+    """
+    timings = []
+    for spec in specs:
+        for backend in backends:
+            if not backend.supports(spec):
+                continue
+            if check_results:
+                check(spec, run_query(backend, spec, verbose=False), reference=reference)
+            timings.append(asdict(time_query(backend, spec, rounds=rounds, warmup=warmup)))
+    return pl.DataFrame(timings)
@@ -0,0 +1,72 @@
+"""
+Grid cells over latitude/longitude, shared by the data pipeline that assigns cities to cells and
+the geospatial queries that prune by cell.
+
+The globe is split into square cells of `cell_size` degrees. Cell IDs are numbered row by row from
+the south-west corner, so the cells that can hold points within a radius of a point follow from the
+bounding box of the circle, without looking at any city.
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_CELL_SIZE = 1.0
+
+
+def num_columns(cell_size: float) -> int:
+    return math.ceil(360 / cell_size)
+
+
+def num_rows(cell_size: float) -> int:
+    return math.ceil(180 / cell_size)
+
+
+def grid_cells(lat: np.ndarray, lon: np.ndarray, cell_size: float) -> np.ndarray:
+    """Cell ID of every (lat, lon) point"""
+    row = np.clip(np.floor((np.asarray(lat) + 90) / cell_size), 0, num_rows(cell_size) - 1)
+    column = np.floor((np.asarray(lon) + 180) / cell_size) % num_columns(cell_size)
+    return (row * num_columns(cell_size) + column).astype(np.int64)
+
+
+def cell_bounds(cells: np.ndarray, cell_size: float) -> tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude of the south-west corner of every cell"""
+    row, column = np.divmod(np.asarray(cells), num_columns(cell_size))
+    return row * cell_size - 90, column * cell_size - 180
+
+
+def cells_within(lat: float, lon: float, radius_km: float, cell_size: float) -> np.ndarray:
+    """
+    IDs of every cell that overlaps the bounding box of the circle of `radius_km` around a point,
+    which covers all points within that distance
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    lat_low, lat_high = math.degrees(math.radians(lat) - angle), math.degrees(math.radians(lat) + angle)
+    rows = np.arange(
+        max(math.floor((lat_low + 90) / cell_size), 0),
+        min(math.floor((lat_high + 90) / cell_size), num_rows(cell_size) - 1) + 1,
+    )
+    # The circle spans all longitudes if it covers a pole, else the widest extent of its bounding box
+    span = math.sin(angle) / math.cos(math.radians(lat)) if abs(lat) < 90 else math.inf
+    if lat_low <= -90 or lat_high >= 90 or angle >= math.pi / 2 or span >= 1:
+        columns = np.arange(num_columns(cell_size))
+    else:
+        half_width = math.degrees(math.asin(span))
+        first = math.floor((lon - half_width + 180) / cell_size)
+        last = math.floor((lon + half_width + 180) / cell_size)
+        columns = np.unique(np.arange(first, last + 1) % num_columns(cell_size))
+    return (rows[:, None] * num_columns(cell_size) + columns[None, :]).ravel()
+
+
+def haversine_km(
+    lat_1: float | np.ndarray, lon_1: float | np.ndarray, lat_2: np.ndarray, lon_2: np.ndarray
+) -> np.ndarray:
+    """Great-circle distance between points, in km"""
+    lat_1, lon_1, lat_2, lon_2 = map(np.radians, (lat_1, lon_1, lat_2, lon_2))
+    a = (
+        np.sin((lat_2 - lat_1) / 2) ** 2
+        + np.cos(lat_1) * np.cos(lat_2) * np.sin((lon_2 - lon_1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
@@ -0,0 +1,244 @@
+"""
+Per-stage resource instrumentation for data generation, loading and queries.
+
+`measure(name, **labels)` is a context manager that records, for the block it wraps:
+
+* `wall_s`: elapsed wall-clock time
+* `user_s` and `sys_s`: CPU time of every thread of the process (e.g. Kùzu's COPY workers)
+* `peak_rss_delta_bytes`: the peak resident memory during the block above the resident memory
+  when it started, and `peak_rss_bytes`, that peak itself
+* `read_bytes` and `write_bytes`: bytes read from and written to storage, and `read_chars` and
+  `write_chars`, bytes passed through read/write system calls, including page cache hits
+
+and appends them with the labels as one JSON line to the log file. `instrumented` does the same for
+every call of a function. Recording is enabled by setting the `INSTRUMENT_LOG` environment variable
+to the log file's path, which subprocesses inherit, or by calling `configure`. When disabled,
+`measure` returns a shared no-op context, so instrumented code pays one function call per block.
+
+The counters come from `/proc/self` (Linux only; elsewhere only the times are recorded). The
+peak RSS is measured by resetting the kernel's high-water mark when a block starts, and the peaks
+of the blocks around a nested one are kept across its reset. Code that reports a peak itself, such
+as the query timings, uses `PeakRss` rather than resetting the mark, so that it keeps them too.
+
+    INSTRUMENT_LOG=resources.jsonl python build_graph.py
+    python -m workload.resource_report resources.jsonl
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, TypeVar
+
+ENV_VAR = "INSTRUMENT_LOG"
+IO_FIELDS = {
+    "read_bytes": "read_bytes",
+    "write_bytes": "write_bytes",
+    "rchar": "read_chars",
+    "wchar": "write_chars",
+}
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def read_status_kb(field: str) -> int | None:
+    """Read a memory field such as `VmRSS` or `VmHWM` from `/proc/self/status` (Linux only)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process's peak RSS (`VmHWM`) to its current RSS, where the kernel allows it"""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_io() -> dict[str, int]:
+    """I/O counters of the process from `/proc/self/io`, empty where it is not readable"""
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, value = line.split(":")
+                if key in IO_FIELDS:
+                    counters[IO_FIELDS[key]] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+class PeakTracker:
+    """
+    Open peak RSS windows of the process. The kernel keeps one high-water mark per process, so a
+    window resetting it first passes the peak seen so far on to the windows still open, whether
+    they are nested around it or running on other threads.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Peak RSS (kB) seen so far by each open window, by window ID
+        self._open_peaks: dict[int, int] = {}
+        self._window_ids = itertools.count()
+
+    def start(self) -> tuple[int, int | None]:
+        """Open a peak RSS window, returning its ID and the RSS (kB) it starts from"""
+        with self._lock:
+            hwm_kb = read_status_kb("VmHWM")
+            if hwm_kb is not None:
+                for window_id, peak in self._open_peaks.items():
+                    self._open_peaks[window_id] = max(peak, hwm_kb)
+            rss_kb = read_status_kb("VmRSS") if reset_peak_rss() else None
+            window_id = next(self._window_ids)
+            self._open_peaks[window_id] = rss_kb or 0
+            return window_id, rss_kb
+
+    def end(self, window_id: int) -> int | None:
+        """Close a window, returning its peak RSS (kB) and passing it on to the other open ones"""
+        with self._lock:
+            hwm_kb = read_status_kb("VmHWM")
+            peak_kb = max(self._open_peaks.pop(window_id), hwm_kb or 0)
+            for other_id, peak in self._open_peaks.items():
+                self._open_peaks[other_id] = max(peak, peak_kb)
+            return peak_kb if hwm_kb is not None else None
+
+
+_peaks = PeakTracker()
+
+
+class PeakRss:
+    """
+    Context manager measuring the peak RSS of a block above the RSS when it started, available as
+    `delta_mb` once it exits (`None` where it cannot be measured). For callers that report the peak
+    themselves: it is tracked whether recording is enabled or not, and keeps the peaks of the
+    measurements around it.
+    """
+
+    delta_mb: float | None = None
+
+    def __enter__(self) -> "PeakRss":
+        self._window_id, self._rss_kb = _peaks.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        peak_kb = _peaks.end(self._window_id)
+        if peak_kb is not None and self._rss_kb is not None:
+            self.delta_mb = (peak_kb - self._rss_kb) / 1024
+
+
+class Recorder:
+    """Appends measurements to a JSON lines file, from any thread"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+class Measurement:
+    """Context manager recording the resources used by one block"""
+
+    def __init__(self, recorder: Recorder, name: str, labels: dict[str, Any]) -> None:
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "Measurement":
+        self._window_id, self._rss_kb = _peaks.start()
+        self._io = read_io()
+        self._cpu = os.times()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall_s = time.perf_counter() - self._start
+        cpu = os.times()
+        io = read_io()
+        peak_kb = _peaks.end(self._window_id)
+        record = {
+            "name": self.name,
+            **self.labels,
+            "wall_s": wall_s,
+            "user_s": cpu.user - self._cpu.user,
+            "sys_s": cpu.system - self._cpu.system,
+            "peak_rss_bytes": peak_kb * 1024 if peak_kb is not None else None,
+            "peak_rss_delta_bytes": (
+                (peak_kb - self._rss_kb) * 1024
+                if peak_kb is not None and self._rss_kb is not None
+                else None
+            ),
+            **{key: io[key] - self._io[key] for key in io if key in self._io},
+            "pid": os.getpid(),
+            "failed": exc_info[0] is not None,
+        }
+        self.recorder.write(record)
+
+
+class NullMeasurement:
+    def __enter__(self) -> "NullMeasurement":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+NULL_MEASUREMENT = NullMeasurement()
+_recorder = Recorder(Path(os.environ[ENV_VAR])) if os.environ.get(ENV_VAR) else None
+
+
+def configure(path: Path | None) -> None:
+    """
+    Record measurements to `path` from now on, or stop recording with `None`. Also sets the
+    environment variable, so subprocesses started afterwards record to the same file.
+    """
+    global _recorder
+    if path is None:
+        _recorder = None
+        os.environ.pop(ENV_VAR, None)
+    else:
+        _recorder = Recorder(path)
+        os.environ[ENV_VAR] = str(path)
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def measure(name: str, **labels: Any) -> Measurement | NullMeasurement:
+    if _recorder is None:
+        return NULL_MEASUREMENT
+    return Measurement(_recorder, name, labels)
+
+
+def instrumented(name: str | None = None) -> Callable[[F], F]:
+    """Decorator measuring every call of a function, under its qualified name by default"""
+
+    def decorator(func: F) -> F:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with Measurement(_recorder, label, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,197 @@
+"""
+Dataframe backend that answers the benchmark queries with Polars lazy plans over the parquet files.
+
+Each query is a `pl.scan_parquet` plan of joins and aggregations that mirrors the Cypher pattern,
+with the same path multiplicities, so the results are checked with the same assertions as the
+graph databases. Plans run on the streaming engine by default, so nothing is materialized beyond
+what each join and aggregation needs. This answers whether a graph DB is worth it at all over
+scanning `data/output` directly.
+"""
+
+from pathlib import Path
+
+import polars as pl
+
+from workload.registry import Params, QuerySpec
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data"
+NODES_PATH = DATA_PATH / "output" / "nodes"
+EDGES_PATH = DATA_PATH / "output" / "edges"
+
+
+class PolarsBackend:
+    def __init__(
+        self,
+        nodes_path: Path = NODES_PATH,
+        edges_path: Path = EDGES_PATH,
+        engine: str = "streaming",
+    ) -> None:
+        self.nodes_path = nodes_path
+        self.edges_path = edges_path
+        self.engine = engine
+        self.name = "polars" if engine == "streaming" else f"polars-{engine}"
+
+    def supports(self, spec: QuerySpec) -> bool:
+        return hasattr(self, f"query{spec.id}")
+
+    def plan(self, spec: QuerySpec, params: Params) -> pl.LazyFrame:
+        return getattr(self, f"query{spec.id}")(**params)
+
+    def run(self, spec: QuerySpec, params: Params) -> pl.DataFrame:
+        return self.plan(spec, params).collect(engine=self.engine)
+
+    # --- Scans ---
+
+    def nodes(self, name: str) -> pl.LazyFrame:
+        return pl.scan_parquet(self.nodes_path / f"{name}.parquet")
+
+    def edges(self, filename: str) -> pl.LazyFrame:
+        return pl.scan_parquet(self.edges_path / filename)
+
+    def persons(self, *columns: str) -> pl.LazyFrame:
+        return self.nodes("persons").select("id", *columns)
+
+    def city_country(self) -> pl.LazyFrame:
+        """One row per City -> State -> Country path"""
+        return (
+            self.edges("city_in.parquet")
+            .rename({"from": "city_id", "to": "state_id"})
+            .join(
+                self.edges("state_in.parquet").rename({"from": "state_id", "to": "country_id"}),
+                on="state_id",
+            )
+            .join(self.nodes("countries").rename({"id": "country_id"}), on="country_id")
+            .select("city_id", "country")
+        )
+
+    def interested_persons(self, interest: str, gender: str | None = None) -> pl.LazyFrame:
+        """One row per HasInterest edge from a person (of `gender`) to a matching interest"""
+        matches = self.nodes("interests").filter(
+            pl.col("interest").str.to_lowercase() == interest.lower()
+        )
+        edges = self.edges("interested_in.parquet").join(
+            matches.select(pl.col("id").alias("to")), on="to"
+        )
+        if gender is not None:
+            persons = self.persons("gender").filter(
+                pl.col("gender").str.to_lowercase() == gender.lower()
+            )
+            edges = edges.join(persons.select(pl.col("id").alias("from")), on="from")
+        return edges.select(pl.col("from").alias("person_id"))
+
+    def persons_between(self, lower: int, upper: int) -> pl.LazyFrame:
+        return self.persons("age").filter(pl.col("age").is_between(lower, upper))
+
+    # --- Queries ---
+
+    def query1(self) -> pl.LazyFrame:
+        return (
+            self.edges("follows.parquet")
+            .group_by("to")
+            .agg(pl.len().cast(pl.Int64).alias("numFollowers"))
+            .top_k(3, by="numFollowers")
+            .join(self.persons("name"), left_on="to", right_on="id")
+            .select(pl.col("to").alias("personID"), "name", "numFollowers")
+            .sort("numFollowers", descending=True)
+        )
+
+    def query2(self) -> pl.LazyFrame:
+        return (
+            self.edges("follows.parquet")
+            .group_by("to")
+            .agg(pl.len().cast(pl.Int64).alias("numFollowers"))
+            .top_k(1, by="numFollowers")
+            .join(self.persons("name"), left_on="to", right_on="id")
+            .join(self.edges("lives_in.parquet"), left_on="to", right_on="from", suffix="_city")
+            .join(self.nodes("cities"), left_on="to_city", right_on="id")
+            .select("name", "numFollowers", "city", "state", "country")
+        )
+
+    def query3(self, country: str) -> pl.LazyFrame:
+        return (
+            self.edges("lives_in.parquet")
+            .join(self.persons("age"), left_on="from", right_on="id")
+            .join(
+                self.city_country().filter(pl.col("country") == country),
+                left_on="to",
+                right_on="city_id",
+            )
+            .join(self.nodes("cities").select("id", "city"), left_on="to", right_on="id")
+            .group_by("city")
+            .agg(pl.col("age").mean().alias("averageAge"))
+            .sort("averageAge", "city")
+            .head(5)
+        )
+
+    def query4(self, age_lower: int, age_upper: int) -> pl.LazyFrame:
+        return (
+            self.edges("lives_in.parquet")
+            .join(self.persons_between(age_lower, age_upper), left_on="from", right_on="id")
+            .join(self.city_country(), left_on="to", right_on="city_id")
+            .group_by(pl.col("country").alias("countries"))
+            .agg(pl.len().cast(pl.Int64).alias("personCounts"))
+            .sort("personCounts", "countries", descending=[True, False])
+            .head(3)
+        )
+
+    def query5(self, gender: str, city: str, country: str, interest: str) -> pl.LazyFrame:
+        cities = self.nodes("cities").filter(
+            (pl.col("city") == city) & (pl.col("country") == country)
+        )
+        return (
+            self.interested_persons(interest, gender)
+            .join(self.edges("lives_in.parquet"), left_on="person_id", right_on="from")
+            .join(cities.select("id"), left_on="to", right_on="id")
+            .select(pl.len().cast(pl.Int64).alias("numPersons"))
+        )
+
+    def query6(self, gender: str, interest: str) -> pl.LazyFrame:
+        return (
+            self.interested_persons(interest, gender)
+            .join(self.edges("lives_in.parquet"), left_on="person_id", right_on="from")
+            .join(self.nodes("cities"), left_on="to", right_on="id")
+            .group_by("city", "country")
+            .agg(pl.len().cast(pl.Int64).alias("numPersons"))
+            .sort("numPersons", "city", descending=[True, False])
+            .head(5)
+            .select("numPersons", "city", "country")
+        )
+
+    def query7(self, country: str, age_lower: int, age_upper: int, interest: str) -> pl.LazyFrame:
+        states = self.nodes("states").filter(pl.col("country") == country)
+        return (
+            self.edges("lives_in.parquet")
+            .join(self.persons_between(age_lower, age_upper), left_on="from", right_on="id")
+            .join(self.edges("city_in.parquet"), left_on="to", right_on="from", suffix="_state")
+            .join(states, left_on="to_state", right_on="id")
+            .join(self.interested_persons(interest), left_on="from", right_on="person_id")
+            .group_by("state", "country")
+            .agg(pl.len().cast(pl.Int64).alias("numPersons"))
+            .sort("numPersons", "state", descending=[True, False])
+            .head(1)
+            .select("numPersons", "state", "country")
+        )
+
+    def query8(self) -> pl.LazyFrame:
+        follows = self.edges("follows.parquet")
+        in_degrees = follows.group_by(pl.col("to").alias("id")).agg(pl.len().alias("in"))
+        out_degrees = follows.group_by(pl.col("from").alias("id")).agg(pl.len().alias("out"))
+        return in_degrees.join(out_degrees, on="id").select(
+            (pl.col("in").cast(pl.Int64) * pl.col("out")).sum().alias("numPaths")
+        )
+
+    def query9(self, age_1: int, age_2: int) -> pl.LazyFrame:
+        follows = self.edges("follows.parquet")
+        persons = self.persons("age")
+        # Out-edges of each middle person that lead to someone above age_2
+        older_targets = (
+            follows.join(persons.filter(pl.col("age") > age_2), left_on="to", right_on="id")
+            .group_by(pl.col("from").alias("id"))
+            .agg(pl.len().alias("out"))
+        )
+        in_degrees = follows.group_by(pl.col("to").alias("id")).agg(pl.len().alias("in"))
+        return (
+            in_degrees.join(older_targets, on="id")
+            .join(persons.filter(pl.col("age") < age_1), on="id")
+            .select((pl.col("in").cast(pl.Int64) * pl.col("out")).sum().alias("numPaths"))
+        )
@@ -0,0 +1,218 @@
+"""
+"People you may know" recommendations: friend-of-friend candidates over `Follows`, ranked by the
+number of mutual connections and then by the number of shared interests.
+
+A connection is a `Follows` edge in either direction. The candidates for a user are the persons
+two connections away who are not the user and not already connected to them, and their mutual
+connections are the distinct persons in between. Ties are broken by person ID, so the ranking is
+deterministic.
+
+Recommendations come in a per-user form (`LIMIT` applied by the database) and a batched form that
+takes thousands of user IDs as one list parameter and ranks the candidates of each user afterwards.
+Users connected to a super node pull in all of its connections as candidates, so the benchmark
+times hub users and ordinary users separately.
+
+    python -m workload.recommend --backend kuzu --hubs 5 --ordinary 50 --batch_size 1000
+"""
+
+import argparse
+import contextlib
+import time
+
+import numpy as np
+import polars as pl
+
+from workload.backends import CypherBackend
+from workload.reference import SocialGraph
+
+LIMIT = 10
+RANK_BY = ["mutualConnections", "sharedInterests"]
+
+# Person ID property and relationship labels of each backend
+_NAMES = {
+    "kuzu": {"id": "id", "follows": "Follows", "has_interest": "HasInterest"},
+    "neo4j": {"id": "personID", "follows": "FOLLOWS", "has_interest": "HAS_INTEREST"},
+}
+
+
+def _cypher(backend_name: str, user: str, condition: str) -> str:
+    """
+    Candidates of the users matched by the node pattern `user` and `condition`, with their mutual
+    connections and shared interests. The user is kept in the same MATCH as the path, so that
+    Kùzu starts the traversal from it instead of joining all paths against it.
+    """
+    id_, follows, has_interest = _NAMES[backend_name].values()
+    return f"""
+        MATCH {user.format(id=id_)}-[:{follows}]-(f:Person)-[:{follows}]-(c:Person)
+        WHERE {condition.format(id=id_)} AND c <> u AND NOT EXISTS {{ MATCH (u)-[:{follows}]-(c) }}
+        WITH u, c, count(DISTINCT f) AS mutualConnections
+        OPTIONAL MATCH (u)-[:{has_interest}]->(i:Interest)<-[:{has_interest}]-(c)
+        RETURN u.{id_} AS userID, c.{id_} AS personID, c.name AS name, mutualConnections, count(i) AS sharedInterests
+    """
+
+
+def per_user_cypher(backend_name: str, limit: int) -> str:
+    """
+    Per-user form, over `$person_id`, ranked and limited by the database. Kùzu 0.9 crashes on a
+    `LIMIT $limit` parameter in this query, so the limit is written into the text instead
+    """
+    ranking = f"ORDER BY mutualConnections DESC, sharedInterests DESC, personID LIMIT {int(limit)}"
+    return _cypher(backend_name, "(u:Person {{{id}: $person_id}})", "true") + ranking
+
+
+# Batched form, over the list `$person_ids`, returning every candidate of every user
+BATCH_CYPHER = {
+    "kuzu": _cypher("kuzu", "(u:Person)", "u.{id} IN CAST($person_ids AS INT64[])"),
+    "neo4j": _cypher("neo4j", "(u:Person)", "u.{id} IN $person_ids"),
+}
+
+SCHEMA = {
+    "userID": pl.Int64,
+    "personID": pl.Int64,
+    "name": pl.String,
+    "mutualConnections": pl.Int64,
+    "sharedInterests": pl.Int64,
+}
+
+
+def rank(candidates: pl.DataFrame, limit: int | None = LIMIT) -> pl.DataFrame:
+    """Order each user's candidates by the ranking, and keep the top `limit` of each"""
+    ranked = candidates.select(pl.col(col).cast(dtype) for col, dtype in SCHEMA.items()).sort(
+        ["userID", *RANK_BY, "personID"], descending=[False, True, True, False]
+    )
+    if limit is None:
+        return ranked
+    return ranked.group_by("userID", maintain_order=True).head(limit)
+
+
+def people_you_may_know(backend: CypherBackend, person_id: int, limit: int = LIMIT) -> pl.DataFrame:
+    """The top `limit` recommendations for one user"""
+    result = backend.execute(per_user_cypher(backend.name, limit), {"person_id": person_id})
+    return pl.DataFrame(result, schema=SCHEMA) if result.is_empty() else rank(result, None)
+
+
+def people_you_may_know_batch(
+    backend: CypherBackend, person_ids: list[int], limit: int = LIMIT
+) -> pl.DataFrame:
+    """The top `limit` recommendations for every user in `person_ids`, in a single query"""
+    result = backend.execute(BATCH_CYPHER[backend.name], {"person_ids": list(person_ids)})
+    return pl.DataFrame(result, schema=SCHEMA) if result.is_empty() else rank(result, limit)
+
+
+def expected_recommendations(
+    graph: SocialGraph, person_ids: list[int], limit: int | None = LIMIT
+) -> pl.DataFrame:
+    """Compute the same recommendations from the in-memory graph, with joins on dense indices"""
+    ids = graph.persons["id"].to_numpy()
+    src, dst = graph.follows.edges()
+    connections = pl.DataFrame(
+        {"u": np.concatenate([src, dst]), "f": np.concatenate([dst, src])}
+    ).unique()
+    person_ids = np.asarray(person_ids, dtype=np.int64)
+    users = pl.DataFrame({"u": np.searchsorted(ids, person_ids[np.isin(person_ids, ids)])}).unique()
+    pairs = (
+        users.join(connections, on="u")
+        .join(connections.rename({"u": "f", "f": "c"}), on="f")
+        .filter(pl.col("c") != pl.col("u"))
+        .join(connections.rename({"f": "c"}), on=["u", "c"], how="anti")
+        .group_by("u", "c")
+        .agg(pl.col("f").n_unique().alias("mutualConnections"))
+    )
+    person, interest = graph.has_interest.edges()
+    interests = pl.DataFrame({"person": person, "interest": interest})
+    shared = (
+        pairs.select("u", "c")
+        .join(interests.rename({"person": "u"}), on="u")
+        .join(interests.rename({"person": "c"}), on=["c", "interest"])
+        .group_by("u", "c")
+        .len("sharedInterests")
+    )
+    names = graph.persons["name"].to_numpy()
+    pairs = pairs.join(shared, on=["u", "c"], how="left")
+    return rank(
+        pl.DataFrame(
+            {
+                "userID": ids[pairs["u"].to_numpy()],
+                "personID": ids[pairs["c"].to_numpy()],
+                "name": names[pairs["c"].to_numpy()],
+                "mutualConnections": pairs["mutualConnections"],
+                "sharedInterests": pairs["sharedInterests"].fill_null(0),
+            }
+        ),
+        limit,
+    )
+
+
+def pick_users(
+    graph: SocialGraph, num_hubs: int, num_ordinary: int, seed: int = 0
+) -> dict[str, list[int]]:
+    """
+    The `num_hubs` persons with the most connections, and a random sample of `num_ordinary`
+    persons with at most the median number of connections
+    """
+    ids = graph.persons["id"].to_numpy()
+    degrees = graph.follows.degrees() + np.bincount(
+        graph.follows.neighbors, minlength=graph.follows.num_nodes
+    )
+    hubs = np.argsort(-degrees, kind="stable")[:num_hubs]
+    ordinary = np.flatnonzero(degrees <= np.median(degrees))
+    rng = np.random.default_rng(seed)
+    ordinary = rng.choice(ordinary, min(num_ordinary, len(ordinary)), replace=False)
+    return {"hub": ids[hubs].tolist(), "ordinary": ids[ordinary].tolist()}
+
+
+def main() -> None:
+    from workload.compare import open_backend
+
+    graph = SocialGraph.from_parquet()
+    users = pick_users(graph, NUM_HUBS, NUM_ORDINARY, SEED)
+    rng = np.random.default_rng(SEED)
+    users["batch"] = rng.choice(graph.persons["id"].to_numpy(), BATCH_SIZE).tolist()
+    results = []
+    with contextlib.ExitStack() as stack:
+        backend = open_backend(BACKEND, stack)
+        for group, person_ids in users.items():
+            latencies = []
+            for person_id in person_ids:
+                start = time.perf_counter()
+                people_you_may_know(backend, person_id, LIMIT)
+                latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            people_you_may_know_batch(backend, person_ids, LIMIT)
+            batched_s = time.perf_counter() - start
+            results.append(
+                {
+                    "users": group,
+                    "num_users": len(person_ids),
+                    "per_user_p50_ms": 1000 * float(np.median(latencies)),
+                    "per_user_max_ms": 1000 * max(latencies),
+                    "loop_s": sum(latencies),
+                    "batched_s": batched_s,
+                    "batched_users_per_s": len(person_ids) / batched_s,
+                    "speedup": sum(latencies) / batched_s,
+                }
+            )
+    results_df = pl.DataFrame(results)
+    with pl.Config(tbl_cols=len(results_df.columns)):
+        print(f"People you may know on {BACKEND}, top {LIMIT} per user:\n{results_df}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Time per-user and batched friend-of-friend recommendations")
+    parser.add_argument("--backend", "-b", choices=["kuzu", "neo4j"], default="kuzu", help="Backend to run on")
+    parser.add_argument("--hubs", type=int, default=5, help="Number of most-connected users to time")
+    parser.add_argument("--ordinary", type=int, default=50, help="Number of users with at most the median number of connections to time")
+    parser.add_argument("--batch_size", type=int, default=1000, help="Number of random users in the large batch")
+    parser.add_argument("--limit", "-k", type=int, default=LIMIT, help="Recommendations per user")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for sampling users")
+    args = parser.parse_args()
+    # fmt: on
+
+    BACKEND = args.backend
+    NUM_HUBS = args.hubs
+    NUM_ORDINARY = args.ordinary
+    BATCH_SIZE = args.batch_size
+    LIMIT = args.limit
+    SEED = args.seed
+    main()
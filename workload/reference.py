@@ -0,0 +1,383 @@
+"""
+In-memory reference engine for the benchmark queries, built on NumPy CSR arrays.
+
+The edge files are loaded into CSR adjacency arrays and every query is answered with vectorized
+array operations, independently of any database. This gives exact expected results for whatever
+dataset was generated, and acts as a third backend in the timing comparison.
+
+    python -m workload.reference
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from workload.csr import CSR, index_of
+from workload.registry import QUERIES, Params, QuerySpec
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data"
+NODES_PATH = DATA_PATH / "output" / "nodes"
+EDGES_PATH = DATA_PATH / "output" / "edges"
+
+
+NODE_TABLES = ("persons", "cities", "states", "countries", "interests")
+# Relationship name -> (edge file, source node table, target node table)
+RELATIONSHIPS = {
+    "follows": ("follows.parquet", "persons", "persons"),
+    "lives_in": ("lives_in.parquet", "persons", "cities"),
+    "has_interest": ("interested_in.parquet", "persons", "interests"),
+    "city_in": ("city_in.parquet", "cities", "states"),
+    "state_in": ("state_in.parquet", "states", "countries"),
+}
+
+
+@dataclass(frozen=True)
+class SocialGraph:
+    # Node tables, sorted by ID so that row position is the node's dense index
+    persons: pl.DataFrame
+    cities: pl.DataFrame
+    states: pl.DataFrame
+    countries: pl.DataFrame
+    interests: pl.DataFrame
+    # Edges, from the source's dense index to the target's dense index
+    follows: CSR
+    lives_in: CSR
+    has_interest: CSR
+    city_in: CSR
+    state_in: CSR
+
+    @classmethod
+    def from_frames(
+        cls, nodes: dict[str, pl.DataFrame], edges: dict[str, pl.DataFrame]
+    ) -> "SocialGraph":
+        """Build the graph from node tables and `from`/`to` edge lists keyed by name"""
+        nodes = {name: nodes[name].sort("id") for name in NODE_TABLES}
+        relationships = {}
+        for name, (_, source, target) in RELATIONSHIPS.items():
+            src = index_of(nodes[source]["id"].to_numpy(), edges[name]["from"].to_numpy())
+            dst = index_of(nodes[target]["id"].to_numpy(), edges[name]["to"].to_numpy())
+            relationships[name] = CSR.from_edges(src, dst, len(nodes[source]))
+        return cls(**nodes, **relationships)
+
+    @classmethod
+    def from_parquet(
+        cls, nodes_path: Path = NODES_PATH, edges_path: Path = EDGES_PATH
+    ) -> "SocialGraph":
+        nodes = {name: pl.read_parquet(nodes_path / f"{name}.parquet") for name in NODE_TABLES}
+        edges = {
+            name: pl.read_parquet(edges_path / filename)
+            for name, (filename, _, _) in RELATIONSHIPS.items()
+        }
+        return cls.from_frames(nodes, edges)
+
+
+class ReferenceBackend:
+    """
+    Answers the registry's queries from a `SocialGraph`. `ranking` returns every row a ranked
+    query could return, before its LIMIT, so that results can be checked in the presence of ties.
+    """
+
+    name = "reference"
+
+    def __init__(self, graph: SocialGraph) -> None:
+        self.graph = graph
+        self.in_degrees = np.bincount(graph.follows.neighbors, minlength=graph.follows.num_nodes)
+        # Number of City -> State -> Country paths for each (city, country) pair
+        city, state = graph.city_in.edges()
+        position, country = graph.state_in.expand(state)
+        self.city_country_paths = np.zeros(
+            (len(graph.cities), len(graph.countries)), dtype=np.int64
+        )
+        np.add.at(self.city_country_paths, (city[position], country), 1)
+
+    @classmethod
+    def from_parquet(
+        cls, nodes_path: Path = NODES_PATH, edges_path: Path = EDGES_PATH
+    ) -> "ReferenceBackend":
+        return cls(SocialGraph.from_parquet(nodes_path, edges_path))
+
+    def supports(self, spec: QuerySpec) -> bool:
+        return hasattr(self, f"query{spec.id}")
+
+    def run(self, spec: QuerySpec, params: Params) -> pl.DataFrame:
+        ranking = self.ranking(spec, params)
+        return ranking.head(spec.limit) if spec.limit else ranking
+
+    def ranking(self, spec: QuerySpec, params: Params) -> pl.DataFrame:
+        return getattr(self, f"query{spec.id}")(**params)
+
+    # --- Helpers ---
+
+    def _interest_matches(self, interest: str) -> np.ndarray:
+        return (self.graph.interests["interest"].str.to_lowercase() == interest.lower()).to_numpy()
+
+    def _gender_matches(self, gender: str) -> np.ndarray:
+        return (self.graph.persons["gender"].str.to_lowercase() == gender.lower()).to_numpy()
+
+    def _age_between(self, lower: int, upper: int) -> np.ndarray:
+        age = self.graph.persons["age"].to_numpy()
+        return (age >= lower) & (age <= upper)
+
+    def _interested_persons(self, interest: str) -> np.ndarray:
+        """Person index of every HasInterest edge to a matching interest (with repeats)"""
+        person, interest_idx = self.graph.has_interest.edges()
+        return person[self._interest_matches(interest)[interest_idx]]
+
+    # --- Queries ---
+
+    def query1(self) -> pl.DataFrame:
+        followed = np.flatnonzero(self.in_degrees)
+        return pl.DataFrame(
+            {
+                "personID": self.graph.persons["id"].to_numpy()[followed],
+                "name": self.graph.persons["name"].to_numpy()[followed],
+                "numFollowers": self.in_degrees[followed],
+            }
+        ).sort("numFollowers", descending=True, maintain_order=True)
+
+    def query2(self) -> pl.DataFrame:
+        followed = np.flatnonzero(self.in_degrees)
+        position, city = self.graph.lives_in.expand(followed)
+        person = followed[position]
+        cities = self.graph.cities
+        return pl.DataFrame(
+            {
+                "name": self.graph.persons["name"].to_numpy()[person],
+                "numFollowers": self.in_degrees[person],
+                "city": cities["city"].to_numpy()[city],
+                "state": cities["state"].to_numpy()[city],
+                "country": cities["country"].to_numpy()[city],
+            }
+        ).sort("numFollowers", descending=True, maintain_order=True)
+
+    def query3(self, country: str) -> pl.DataFrame:
+        country_matches = (self.graph.countries["country"] == country).to_numpy()
+        city_weights = self.city_country_paths[:, country_matches].sum(axis=1)
+        person, city = self.graph.lives_in.edges()
+        weights = city_weights[city]
+        keep = weights > 0
+        ages = self.graph.persons["age"].to_numpy()[person[keep]]
+        return (
+            pl.DataFrame(
+                {
+                    "city": self.graph.cities["city"].to_numpy()[city[keep]],
+                    "age": ages * weights[keep],
+                    "weight": weights[keep],
+                }
+            )
+            .group_by("city")
+            .agg((pl.col("age").sum() / pl.col("weight").sum()).alias("averageAge"))
+            .sort("averageAge", "city")
+        )
+
+    def query4(self, age_lower: int, age_upper: int) -> pl.DataFrame:
+        person, city = self.graph.lives_in.edges()
+        city = city[self._age_between(age_lower, age_upper)[person]]
+        counts = np.bincount(city, minlength=len(self.graph.cities)) @ self.city_country_paths
+        return (
+            pl.DataFrame({"countries": self.graph.countries["country"], "personCounts": counts})
+            .group_by("countries")
+            .agg(pl.col("personCounts").sum())
+            .filter(pl.col("personCounts") > 0)
+            .sort("personCounts", "countries", descending=[True, False])
+        )
+
+    def query5(self, gender: str, city: str, country: str, interest: str) -> pl.DataFrame:
+        person = self._interested_persons(interest)
+        person = person[self._gender_matches(gender)[person]]
+        cities = self.graph.cities
+        city_matches = ((cities["city"] == city) & (cities["country"] == country)).to_numpy()
+        lives_person, lives_city = self.graph.lives_in.edges()
+        matching_cities = np.bincount(
+            lives_person[city_matches[lives_city]], minlength=len(self.graph.persons)
+        )
+        return pl.DataFrame({"numPersons": [int(matching_cities[person].sum())]})
+
+    def query6(self, gender: str, interest: str) -> pl.DataFrame:
+        person = self._interested_persons(interest)
+        person = person[self._gender_matches(gender)[person]]
+        _, city = self.graph.lives_in.expand(person)
+        cities = self.graph.cities
+        return (
+            pl.DataFrame(
+                {
+                    "city": cities["city"].to_numpy()[city],
+                    "country": cities["country"].to_numpy()[city],
+                }
+            )
+            .group_by("city", "country")
+            .len("numPersons")
+            .select("numPersons", "city", "country")
+            .sort("numPersons", "city", descending=[True, False])
+        )
+
+    def query7(self, country: str, age_lower: int, age_upper: int, interest: str) -> pl.DataFrame:
+        person, city = self.graph.lives_in.edges()
+        keep = self._age_between(age_lower, age_upper)[person]
+        person, city = person[keep], city[keep]
+        position, state = self.graph.city_in.expand(city)
+        person = person[position]
+        states = self.graph.states
+        keep = (states["country"] == country).to_numpy()[state]
+        person, state = person[keep], state[keep]
+        # Each (person, state) row is repeated once per matching interest of the person
+        interest_counts = np.bincount(
+            self._interested_persons(interest), minlength=len(self.graph.persons)
+        )
+        return (
+            pl.DataFrame(
+                {
+                    "state": states["state"].to_numpy()[state],
+                    "country": states["country"].to_numpy()[state],
+                    "numPersons": interest_counts[person],
+                }
+            )
+            .group_by("state", "country")
+            .agg(pl.col("numPersons").sum())
+            .filter(pl.col("numPersons") > 0)
+            .select("numPersons", "state", "country")
+            .sort("numPersons", "state", descending=[True, False])
+        )
+
+    def query8(self) -> pl.DataFrame:
+        out_degrees = self.graph.follows.degrees()
+        return pl.DataFrame({"numPaths": [int(self.in_degrees @ out_degrees)]})
+
+    def query9(self, age_1: int, age_2: int) -> pl.DataFrame:
+        age = self.graph.persons["age"].to_numpy()
+        middle, target = self.graph.follows.edges()
+        # Out-edges of each person that lead to someone above age_2
+        older_targets = np.bincount(
+            middle[age[target] > age_2], minlength=self.graph.follows.num_nodes
+        )
+        paths = (self.in_degrees * older_targets)[age < age_1].sum()
+        return pl.DataFrame({"numPaths": [int(paths)]})
+
+    def _person_index(self, person_id: int) -> int | None:
+        ids = self.graph.persons["id"].to_numpy()
+        index = int(index_of(ids, np.array([person_id]))[0])
+        return index if index < len(ids) and ids[index] == person_id else None
+
+    def _hops(self, person_id: int, max_hops: int) -> np.ndarray:
+        """
+        Number of hops from a person to every person, by breadth-first search over Follows up to
+        `max_hops` (-1 where not reached). The person itself only counts if it is on a cycle.
+        """
+        hops = np.full(self.graph.follows.num_nodes, -1)
+        start = self._person_index(person_id)
+        if start is None:
+            return hops
+        frontier = np.array([start])
+        for hop in range(1, max_hops + 1):
+            _, neighbors = self.graph.follows.expand(frontier)
+            frontier = np.unique(neighbors[hops[neighbors] < 0])
+            if len(frontier) == 0:
+                break
+            hops[frontier] = hop
+        return hops
+
+    def _follow_weights(self) -> np.ndarray:
+        """Weight of every Follows edge, in `edges()` order: 1 plus the persons' age difference"""
+        age = self.graph.persons["age"].to_numpy()
+        source, target = self.graph.follows.edges()
+        return 1 + np.abs(age[source] - age[target])
+
+    def _triangles_per_person(self) -> np.ndarray:
+        """Number of follow triangles `a -> b -> c -> a` that start at each person `a`"""
+        follows = self.graph.follows
+        num_nodes = follows.num_nodes
+        source, target = follows.edges()
+        # Sorted keys of every edge `c -> a`, to look up the edge that closes each 2-path
+        closing = np.sort(source * num_nodes + target)
+        triangles = np.zeros(num_nodes, dtype=np.int64)
+        # Expand the 2-paths in chunks of edges, as there can be many more paths than edges
+        chunk = 1 << 18
+        for offset in range(0, follows.num_edges, chunk):
+            a, b = source[offset : offset + chunk], target[offset : offset + chunk]
+            position, c = follows.expand(b)
+            a = a[position]
+            keys = c * num_nodes + a
+            found = closing[np.minimum(np.searchsorted(closing, keys), len(closing) - 1)] == keys
+            triangles += np.bincount(a[found], minlength=num_nodes)
+        return triangles
+
+    def _num_reachable(self, person_id: int, max_hops: int) -> pl.DataFrame:
+        reached = self._hops(person_id, max_hops) > 0
+        start = self._person_index(person_id)
+        if start is not None:
+            reached[start] = False
+        return pl.DataFrame({"numReachable": [int(reached.sum())]})
+
+    def query10(self, person_id: int) -> pl.DataFrame:
+        return self._num_reachable(person_id, 3)
+
+    def query11(self, person_id: int) -> pl.DataFrame:
+        return self._num_reachable(person_id, 4)
+
+    def query12(self, source_id: int, target_id: int) -> pl.DataFrame:
+        target = self._person_index(target_id)
+        # Kùzu's SHORTEST is bounded at 30 hops
+        hops = self._hops(source_id, 30)
+        if target is None or hops[target] < 0:
+            return pl.DataFrame(schema={"pathLength": pl.Int64})
+        return pl.DataFrame({"pathLength": [int(hops[target])]})
+
+    def query13(self, source_id: int, target_id: int) -> pl.DataFrame:
+        source, target = self._person_index(source_id), self._person_index(target_id)
+        if source is None or target is None:
+            return pl.DataFrame(schema={"totalWeight": pl.Int64})
+        edge_source, edge_target = self.graph.follows.edges()
+        weights = self._follow_weights()
+        # Bellman-Ford, relaxing every edge at once until no path gets any cheaper
+        cost = np.full(self.graph.follows.num_nodes, np.inf)
+        cost[source] = 0
+        while True:
+            relaxed = cost.copy()
+            np.minimum.at(relaxed, edge_target, cost[edge_source] + weights)
+            if (relaxed == cost).all():
+                break
+            cost = relaxed
+        if np.isinf(cost[target]):
+            return pl.DataFrame(schema={"totalWeight": pl.Int64})
+        return pl.DataFrame({"totalWeight": [int(cost[target])]})
+
+    def query14(self) -> pl.DataFrame:
+        return pl.DataFrame({"numTriangles": [int(self._triangles_per_person().sum()) // 3]})
+
+    def query15(self) -> pl.DataFrame:
+        triangles = self._triangles_per_person()
+        persons = np.flatnonzero(triangles)
+        return pl.DataFrame(
+            {
+                "personID": self.graph.persons["id"].to_numpy()[persons],
+                "numTriangles": triangles[persons],
+            }
+        ).sort("numTriangles", descending=True, maintain_order=True)
+
+
+def main() -> None:
+    reference = ReferenceBackend.from_parquet()
+    expected = {}
+    for spec in QUERIES:
+        params = spec.bind()
+        result = reference.run(spec, params)
+        print(f"\nQuery {spec.id}: {spec.summary.format(**params)}\n{result}")
+        expected[spec.id] = result.to_dicts()
+    if OUTPUT:
+        Path(OUTPUT).write_text(json.dumps(expected, indent=2))
+        print(f"Wrote expected results to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Compute expected query results for the generated dataset")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Optional JSON file to write the results to")
+    args = parser.parse_args()
+    # fmt: on
+
+    OUTPUT = args.output
+    main()
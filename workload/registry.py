@@ -0,0 +1,579 @@
+"""
+Registry of the benchmark queries shared by every backend.
+
+Each query is described once, as a `QuerySpec`: its Cypher text for each Cypher backend, the
+parameters it takes (with the values used in the benchmark) and the results expected on the
+100K person dataset (or none, for queries only checked against the reference engine). Adding a
+query to the workload means adding a spec to `QUERIES`.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+import polars as pl
+
+Params = dict[str, Any]
+
+# Polars types of the parameter types used in the specs
+PARAM_DTYPES = {str: pl.String, int: pl.Int64, float: pl.Float64}
+
+
+@dataclass(frozen=True)
+class Expected:
+    """
+    Expected results of a query: the number of rows, and values for some of the columns of
+    specific rows. A tuple of values means any of them is acceptable (e.g., for ties).
+    """
+
+    num_rows: int
+    rows: dict[int, dict[str, Any]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    id: int
+    description: str
+    # Printed above the result, formatted with the query parameters
+    summary: str
+    # Cypher text for each Cypher backend, keyed by backend name
+    cypher: dict[str, str]
+    # Parameter schema: name -> type
+    params: dict[str, type] = field(default_factory=dict)
+    # Parameter values used in the benchmark
+    defaults: Params = field(default_factory=dict)
+    expected: Expected | None = None
+    # For top-k queries: the LIMIT, and the columns whose values the rows are ranked by
+    limit: int | None = None
+    rank_by: tuple[str, ...] = ()
+    # Batched form of the Cypher for each backend, for queries that have one (see `batch.py`):
+    # the same query over `UNWIND $params AS param`, returning `param.batch_index` with each row
+    # and without the ranking and LIMIT, which are applied per parameter combination
+    batched_cypher: dict[str, str] = field(default_factory=dict)
+    # Traversals over the whole graph that take seconds, left out of the quick `query.py` runs
+    heavy: bool = False
+
+    def params_schema(self) -> dict[str, pl.DataType]:
+        """Polars schema of the parameters, in the order they are declared"""
+        return {name: PARAM_DTYPES[type_] for name, type_ in self.params.items()}
+
+    def bind(self, params: Params | None = None) -> Params:
+        """Fill in defaults and validate the parameters against the schema"""
+        bound = {**self.defaults, **(params or {})}
+        unknown = bound.keys() - self.params.keys()
+        if unknown:
+            raise ValueError(f"Query {self.id}: unknown parameters {sorted(unknown)}")
+        missing = self.params.keys() - bound.keys()
+        if missing:
+            raise ValueError(f"Query {self.id}: missing parameters {sorted(missing)}")
+        for name, value in bound.items():
+            if not isinstance(value, self.params[name]):
+                raise TypeError(
+                    f"Query {self.id}: parameter `{name}` must be {self.params[name].__name__}, "
+                    f"got {type(value).__name__}"
+                )
+        return bound
+
+
+def check_result(spec: QuerySpec, result: pl.DataFrame) -> None:
+    """Assert that a result matches the spec's expected values"""
+    if spec.expected is None:
+        return
+    rows = result.to_dicts()
+    assert len(rows) == spec.expected.num_rows, (
+        f"Query {spec.id}: expected {spec.expected.num_rows} rows, got {len(rows)}"
+    )
+    for index, columns in spec.expected.rows.items():
+        for column, expected in columns.items():
+            actual = rows[index][column]
+            allowed = expected if isinstance(expected, tuple) else (expected,)
+            assert actual in allowed, (
+                f"Query {spec.id}: row {index} `{column}` is {actual!r}, expected {expected!r}"
+            )
+
+
+def values_equal(actual: Any, expected: Any) -> bool:
+    if isinstance(actual, float) or isinstance(expected, float):
+        return math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9)
+    return actual == expected
+
+
+def check_ranking(spec: QuerySpec, result: pl.DataFrame, ranking: pl.DataFrame) -> None:
+    """
+    Assert that a result matches the reference engine's output for the spec. For top-k queries
+    `ranking` holds every candidate row before the LIMIT: the result must have the same ranking
+    values in the same order, and each of its rows must be one of the candidates, so that ties
+    at the LIMIT boundary may be broken either way.
+    """
+    expected = ranking.head(spec.limit) if spec.limit else ranking
+    assert result.height == expected.height, (
+        f"Query {spec.id}: expected {expected.height} rows, got {result.height}"
+    )
+    candidates = ranking.to_dicts()
+    for index, (row, expected_row) in enumerate(zip(result.to_dicts(), expected.to_dicts())):
+        if not spec.rank_by:
+            matches = all(values_equal(row[col], expected_row[col]) for col in ranking.columns)
+            assert matches, f"Query {spec.id}: row {index} is {row}, expected {expected_row}"
+            continue
+        for column in spec.rank_by:
+            assert values_equal(row[column], expected_row[column]), (
+                f"Query {spec.id}: row {index} `{column}` is {row[column]!r}, "
+                f"expected {expected_row[column]!r}"
+            )
+        assert any(
+            all(values_equal(row[col], candidate[col]) for col in ranking.columns)
+            for candidate in candidates
+            if all(values_equal(row[col], candidate[col]) for col in spec.rank_by)
+        ), f"Query {spec.id}: row {index} {row} is not in the reference results"
+
+
+QUERIES = [
+    QuerySpec(
+        id=1,
+        description="Who are the top 3 most-followed persons in the network?",
+        summary="Top 3 most-followed persons",
+        cypher={
+            "kuzu": """
+        MATCH (follower:Person)-[:Follows]->(person:Person)
+        RETURN person.id AS personID, person.name AS name, count(follower.id) AS numFollowers
+        ORDER BY numFollowers DESC LIMIT 3;
+    """,
+            "neo4j": """
+        MATCH (follower:Person)-[:FOLLOWS]->(person:Person)
+        RETURN person.personID AS personID, person.name AS name, count(follower) AS numFollowers
+        ORDER BY numFollowers DESC LIMIT 3
+    """,
+        },
+        expected=Expected(
+            num_rows=3,
+            rows={
+                0: {"personID": 85723, "numFollowers": 4998},
+                1: {"personID": 68753, "numFollowers": 4985},
+                2: {"personID": 54696, "numFollowers": 4976},
+            },
+        ),
+        limit=3,
+        rank_by=("numFollowers",),
+    ),
+    QuerySpec(
+        id=2,
+        description="In which city does the most-followed person in the network live?",
+        summary="City in which most-followed person lives",
+        cypher={
+            "kuzu": """
+        MATCH (follower:Person)-[:Follows]->(person:Person)
+        WITH person, count(follower.id) as numFollowers
+        ORDER BY numFollowers DESC LIMIT 1
+        MATCH (person) -[:LivesIn]-> (city:City)
+        RETURN person.name AS name, numFollowers, city.city AS city, city.state AS state, city.country AS country;
+    """,
+            "neo4j": """
+        MATCH (follower:Person) -[:FOLLOWS]-> (person:Person)
+        WITH person, count(follower) as followers
+        ORDER BY followers DESC LIMIT 1
+        MATCH (person) -[:LIVES_IN]-> (city:City)
+        RETURN person.name AS name, followers AS numFollowers, city.city AS city, city.state AS state, city.country AS country
+    """,
+        },
+        expected=Expected(
+            num_rows=1,
+            rows={
+                0: {
+                    "name": "Melissa Murphy",
+                    "numFollowers": 4998,
+                    "city": "Austin",
+                    "state": "Texas",
+                    "country": "United States",
+                }
+            },
+        ),
+        limit=1,
+        rank_by=("numFollowers",),
+    ),
+    QuerySpec(
+        id=3,
+        description="Which 5 cities in a particular country have the lowest average age in the network?",
+        summary="Cities with lowest average age in {country}",
+        cypher={
+            "kuzu": """
+        MATCH (p:Person) -[:LivesIn]-> (c:City) -[*1..2]-> (co:Country)
+        WHERE co.country = $country
+        RETURN c.city AS city, avg(p.age) AS averageAge
+        ORDER BY averageAge LIMIT 5;
+    """,
+            "neo4j": """
+        MATCH (p:Person) -[:LIVES_IN]-> (c:City) -[*1..2]-> (co:Country)
+        WHERE co.country = $country
+        RETURN c.city AS city, avg(p.age) AS averageAge
+        ORDER BY averageAge LIMIT 5
+    """,
+        },
+        params={"country": str},
+        defaults={"country": "United States"},
+        expected=Expected(
+            num_rows=5,
+            rows={
+                0: {"city": "Austin"},
+                1: {"city": "Kansas City"},
+                2: {"city": "Miami"},
+                3: {"city": "San Antonio"},
+                4: {"city": "Houston"},
+            },
+        ),
+        limit=5,
+        rank_by=("averageAge",),
+    ),
+    QuerySpec(
+        id=4,
+        description="How many persons between a certain age range are in each country?",
+        summary="Persons between ages {age_lower}-{age_upper} in each country",
+        cypher={
+            "kuzu": """
+        MATCH (p:Person)-[:LivesIn]->(ci:City)-[*1..2]->(country:Country)
+        WHERE p.age >= $age_lower AND p.age <= $age_upper
+        RETURN country.country AS countries, count(country) AS personCounts
+        ORDER BY personCounts DESC LIMIT 3;
+    """,
+            "neo4j": """
+        MATCH (p:Person)-[:LIVES_IN]->(ci:City)-[*1..2]->(country:Country)
+        WHERE p.age >= $age_lower AND p.age <= $age_upper
+        RETURN country.country AS countries, count(country) AS personCounts
+        ORDER BY personCounts DESC LIMIT 3
+    """,
+        },
+        params={"age_lower": int, "age_upper": int},
+        defaults={"age_lower": 30, "age_upper": 40},
+        expected=Expected(
+            num_rows=3,
+            rows={
+                0: {"countries": "United States", "personCounts": 30680},
+                1: {"countries": "Canada", "personCounts": 3045},
+                2: {"countries": "United Kingdom", "personCounts": 1801},
+            },
+        ),
+        limit=3,
+        rank_by=("personCounts",),
+    ),
+    QuerySpec(
+        id=5,
+        description="How many men in a particular city have an interest in the same thing?",
+        summary="Number of {gender} users in {city}, {country} who have an interest in {interest}",
+        cypher={
+            "kuzu": """
+        MATCH (p:Person)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower($interest)
+        AND lower(p.gender) = lower($gender)
+        WITH p, i
+        MATCH (p)-[:LivesIn]->(c:City)
+        WHERE c.city = $city AND c.country = $country
+        RETURN count(p) AS numPersons
+    """,
+            "neo4j": """
+        MATCH (p:Person)-[:HAS_INTEREST]->(i:Interest)
+        WHERE tolower(i.interest) = tolower($interest)
+        AND tolower(p.gender) = tolower($gender)
+        WITH p, i
+        MATCH (p)-[:LIVES_IN]->(c:City)
+        WHERE c.city = $city AND c.country = $country
+        RETURN count(p) AS numPersons
+    """,
+        },
+        params={"gender": str, "city": str, "country": str, "interest": str},
+        defaults={
+            "gender": "male",
+            "city": "London",
+            "country": "United Kingdom",
+            "interest": "fine dining",
+        },
+        expected=Expected(num_rows=1, rows={0: {"numPersons": 52}}),
+        batched_cypher={
+            "kuzu": """
+        UNWIND $params AS param
+        MATCH (p:Person)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower(param.interest)
+        AND lower(p.gender) = lower(param.gender)
+        WITH param, p, i
+        MATCH (p)-[:LivesIn]->(c:City)
+        WHERE c.city = param.city AND c.country = param.country
+        RETURN param.batch_index AS batch_index, count(p) AS numPersons
+    """,
+            "neo4j": """
+        UNWIND $params AS param
+        MATCH (p:Person)-[:HAS_INTEREST]->(i:Interest)
+        WHERE tolower(i.interest) = tolower(param.interest)
+        AND tolower(p.gender) = tolower(param.gender)
+        WITH param, p, i
+        MATCH (p)-[:LIVES_IN]->(c:City)
+        WHERE c.city = param.city AND c.country = param.country
+        RETURN param.batch_index AS batch_index, count(p) AS numPersons
+    """,
+        },
+    ),
+    QuerySpec(
+        id=6,
+        description="Which city has the maximum number of people of a particular gender that share a particular interest",
+        summary="City with the most {gender} users who have an interest in {interest}",
+        cypher={
+            "kuzu": """
+        MATCH (p:Person)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower($interest)
+        AND lower(p.gender) = lower($gender)
+        WITH p, i
+        MATCH (p)-[:LivesIn]->(c:City)
+        RETURN count(p.id) AS numPersons, c.city AS city, c.country AS country
+        ORDER BY numPersons DESC LIMIT 5
+    """,
+            "neo4j": """
+        MATCH (p:Person)-[:HAS_INTEREST]->(i:Interest)
+        WHERE tolower(i.interest) = tolower($interest)
+        AND tolower(p.gender) = tolower($gender)
+        WITH p, i
+        MATCH (p)-[:LIVES_IN]->(c:City)
+        RETURN count(p) AS numPersons, c.city AS city, c.country AS country
+        ORDER BY numPersons DESC LIMIT 5
+    """,
+        },
+        params={"gender": str, "interest": str},
+        defaults={"gender": "female", "interest": "tennis"},
+        expected=Expected(
+            num_rows=5,
+            rows={
+                0: {
+                    "numPersons": 66,
+                    "city": ("Houston", "Birmingham"),
+                    "country": ("United States", "United Kingdom"),
+                }
+            },
+        ),
+        limit=5,
+        rank_by=("numPersons",),
+        batched_cypher={
+            "kuzu": """
+        UNWIND $params AS param
+        MATCH (p:Person)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower(param.interest)
+        AND lower(p.gender) = lower(param.gender)
+        WITH param, p, i
+        MATCH (p)-[:LivesIn]->(c:City)
+        RETURN param.batch_index AS batch_index, count(p.id) AS numPersons, c.city AS city, c.country AS country
+    """,
+            "neo4j": """
+        UNWIND $params AS param
+        MATCH (p:Person)-[:HAS_INTEREST]->(i:Interest)
+        WHERE tolower(i.interest) = tolower(param.interest)
+        AND tolower(p.gender) = tolower(param.gender)
+        WITH param, p, i
+        MATCH (p)-[:LIVES_IN]->(c:City)
+        RETURN param.batch_index AS batch_index, count(p) AS numPersons, c.city AS city, c.country AS country
+    """,
+        },
+    ),
+    QuerySpec(
+        id=7,
+        description="Which U.S. state has the maximum number of persons between a specified age who enjoy a particular interest?",
+        summary="State in {country} with the most users between ages {age_lower}-{age_upper} who have an interest in {interest}",
+        cypher={
+            "kuzu": """
+        MATCH (p:Person)-[:LivesIn]->(:City)-[:CityIn]->(s:State)
+        WHERE p.age >= $age_lower AND p.age <= $age_upper AND s.country = $country
+        WITH p, s
+        MATCH (p)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower($interest)
+        RETURN count(p.id) AS numPersons, s.state AS state, s.country AS country
+        ORDER BY numPersons DESC LIMIT 1
+    """,
+            "neo4j": """
+        MATCH (p:Person)-[:LIVES_IN]->(:City)-[:CITY_IN]->(s:State)
+        WHERE p.age >= $age_lower AND p.age <= $age_upper AND s.country = $country
+        WITH p, s
+        MATCH (p)-[:HAS_INTEREST]->(i:Interest)
+        WHERE tolower(i.interest) = tolower($interest)
+        RETURN count(p) AS numPersons, s.state AS state, s.country AS country
+        ORDER BY numPersons DESC LIMIT 1
+    """,
+        },
+        params={"country": str, "age_lower": int, "age_upper": int, "interest": str},
+        defaults={
+            "country": "United States",
+            "age_lower": 23,
+            "age_upper": 30,
+            "interest": "photography",
+        },
+        expected=Expected(
+            num_rows=1,
+            rows={0: {"numPersons": 141, "state": "California", "country": "United States"}},
+        ),
+        limit=1,
+        rank_by=("numPersons",),
+        batched_cypher={
+            "kuzu": """
+        UNWIND $params AS param
+        MATCH (p:Person)-[:LivesIn]->(:City)-[:CityIn]->(s:State)
+        WHERE p.age >= param.age_lower AND p.age <= param.age_upper AND s.country = param.country
+        WITH param, p, s
+        MATCH (p)-[:HasInterest]->(i:Interest)
+        WHERE lower(i.interest) = lower(param.interest)
+        RETURN param.batch_index AS batch_index, count(p.id) AS numPersons, s.state AS state, s.country AS country
+    """,
+            "neo4j": """
+        UNWIND $params AS param
+        MATCH (p:Person)-[:LIVES_IN]->(:City)-[:CITY_IN]->(s:State)
+        WHERE p.age >= param.age_lower AND p.age <= param.age_upper AND s.country = param.country
+        WITH param, p, s
+        MATCH (p)-[:HAS_INTEREST]->(i:Interest)
+        WHERE tolower(i.interest) = tolower(param.interest)
+        RETURN param.batch_index AS batch_index, count(p) AS numPersons, s.state AS state, s.country AS country
+    """,
+        },
+    ),
+    QuerySpec(
+        id=8,
+        description="How many second-degree paths exist in the graph?",
+        summary="Number of second-degree paths",
+        cypher={
+            "kuzu": """
+        MATCH (a:Person)-[r1:Follows]->(b:Person)-[r2:Follows]->(c:Person)
+        RETURN count(*) AS numPaths
+    """,
+            "neo4j": """
+        MATCH (a:Person)-[r1:FOLLOWS]->(b:Person)-[r2:FOLLOWS]->(c:Person)
+        RETURN count(*) AS numPaths
+    """,
+        },
+        expected=Expected(num_rows=1, rows={0: {"numPaths": 58431994}}),
+    ),
+    QuerySpec(
+        id=9,
+        description="How many paths exist in the graph through persons below a certain age to persons above a certain age?",
+        summary="Number of paths through persons below {age_1} to persons above {age_2}",
+        cypher={
+            "kuzu": """
+        MATCH (a:Person)-[r1:Follows]->(b:Person)-[r2:Follows]->(c:Person)
+        WHERE b.age < $age_1 AND c.age > $age_2
+        RETURN count(*) as numPaths
+    """,
+            "neo4j": """
+        MATCH (a:Person)-[r1:FOLLOWS]->(b:Person)-[r2:FOLLOWS]->(c:Person)
+        WHERE b.age < $age_1 AND c.age > $age_2
+        RETURN count(*) as numPaths
+    """,
+        },
+        params={"age_1": int, "age_2": int},
+        defaults={"age_1": 50, "age_2": 25},
+        expected=Expected(num_rows=1, rows={0: {"numPaths": 45578816}}),
+    ),
+    QuerySpec(
+        id=10,
+        description="How many persons can a person reach within 3 hops?",
+        summary="Number of persons reachable from person {person_id} within 3 hops",
+        cypher={
+            "kuzu": """
+        MATCH (a:Person {id: $person_id})-[:Follows* SHORTEST 1..3]->(b:Person)
+        WHERE b <> a
+        RETURN count(DISTINCT b) AS numReachable
+    """,
+            "neo4j": """
+        MATCH (a:Person {personID: $person_id})-[:FOLLOWS*1..3]->(b:Person)
+        WHERE b <> a
+        RETURN count(DISTINCT b) AS numReachable
+    """,
+        },
+        params={"person_id": int},
+        defaults={"person_id": 1},
+        heavy=True,
+    ),
+    QuerySpec(
+        id=11,
+        description="How many persons can a person reach within 4 hops?",
+        summary="Number of persons reachable from person {person_id} within 4 hops",
+        cypher={
+            "kuzu": """
+        MATCH (a:Person {id: $person_id})-[:Follows* SHORTEST 1..4]->(b:Person)
+        WHERE b <> a
+        RETURN count(DISTINCT b) AS numReachable
+    """,
+            "neo4j": """
+        MATCH (a:Person {personID: $person_id})-[:FOLLOWS*1..4]->(b:Person)
+        WHERE b <> a
+        RETURN count(DISTINCT b) AS numReachable
+    """,
+        },
+        params={"person_id": int},
+        defaults={"person_id": 1},
+        heavy=True,
+    ),
+    QuerySpec(
+        id=12,
+        description="How many hops is the shortest path from one person to another?",
+        summary="Shortest path length from person {source_id} to person {target_id}",
+        cypher={
+            "kuzu": """
+        MATCH p = (a:Person)-[:Follows* SHORTEST 1..30]->(b:Person)
+        WHERE a.id = $source_id AND b.id = $target_id
+        RETURN length(p) AS pathLength
+    """,
+            "neo4j": """
+        MATCH (a:Person {personID: $source_id}), (b:Person {personID: $target_id})
+        MATCH p = shortestPath((a)-[:FOLLOWS*..30]->(b))
+        RETURN length(p) AS pathLength
+    """,
+        },
+        params={"source_id": int, "target_id": int},
+        defaults={"source_id": 1, "target_id": 1000},
+        heavy=True,
+    ),
+    QuerySpec(
+        id=13,
+        description="What is the lowest total weight of a path from one person to another?",
+        summary="Lowest path weight from person {source_id} to person {target_id}",
+        # `weight` is set on Kùzu's Follows edges by `kuzudb/build_graph.py`
+        cypher={
+            "kuzu": """
+        MATCH (a:Person)-[e:Follows* WSHORTEST(weight)]->(b:Person)
+        WHERE a.id = $source_id AND b.id = $target_id
+        RETURN list_sum(properties(rels(e), 'weight')) AS totalWeight
+    """,
+        },
+        params={"source_id": int, "target_id": int},
+        defaults={"source_id": 1, "target_id": 1000},
+        heavy=True,
+    ),
+    QuerySpec(
+        id=14,
+        description="How many follow triangles (a follows b follows c follows a) are in the graph?",
+        summary="Number of follow triangles",
+        cypher={
+            "kuzu": """
+        MATCH (a:Person)-[:Follows]->(b:Person)-[:Follows]->(c:Person)-[:Follows]->(a)
+        RETURN count(*) / 3 AS numTriangles
+    """,
+            "neo4j": """
+        MATCH (a:Person)-[:FOLLOWS]->(b:Person)-[:FOLLOWS]->(c:Person)-[:FOLLOWS]->(a)
+        RETURN count(*) / 3 AS numTriangles
+    """,
+        },
+        heavy=True,
+    ),
+    QuerySpec(
+        id=15,
+        description="Which 10 persons are in the most follow triangles?",
+        summary="Top 10 persons by number of follow triangles",
+        cypher={
+            "kuzu": """
+        MATCH (a:Person)-[:Follows]->(b:Person)-[:Follows]->(c:Person)-[:Follows]->(a)
+        RETURN a.id AS personID, count(*) AS numTriangles
+        ORDER BY numTriangles DESC LIMIT 10
+    """,
+            "neo4j": """
+        MATCH (a:Person)-[:FOLLOWS]->(b:Person)-[:FOLLOWS]->(c:Person)-[:FOLLOWS]->(a)
+        RETURN a.personID AS personID, count(*) AS numTriangles
+        ORDER BY numTriangles DESC LIMIT 10
+    """,
+        },
+        limit=10,
+        rank_by=("numTriangles",),
+        heavy=True,
+    ),
+]
+
+QUERIES_BY_ID = {spec.id: spec for spec in QUERIES}
@@ -0,0 +1,52 @@
+"""
+Summarize a resource log written by `workload/instrument.py`: one row per measured block, such as
+a generator script, a file written, a COPY or a query, with its totals over all of its records.
+
+    python -m workload.resource_report resources.jsonl
+"""
+
+import argparse
+from pathlib import Path
+
+import polars as pl
+
+from workload.instrument import IO_FIELDS
+
+METRICS = ["wall_s", "user_s", "sys_s", "peak_rss_bytes", "peak_rss_delta_bytes"]
+# Labels that vary between records of the same block, so are not used to group them
+UNGROUPED = ["pid", "failed", "rounds", "rows"]
+
+
+def summarize(path: Path) -> pl.DataFrame:
+    """
+    Count, total times, largest peaks and total I/O of every block, identified by its name and
+    labels (e.g. the table of a COPY or the ID of a query), in the order they first appear
+    """
+    records = pl.read_ndjson(path)
+    io_columns = [column for column in IO_FIELDS.values() if column in records.columns]
+    labels = [
+        column
+        for column in records.columns
+        if column not in {*METRICS, *io_columns, *UNGROUPED, "name"}
+    ]
+    return records.group_by("name", *labels, maintain_order=True).agg(
+        pl.len().alias("count"),
+        pl.col("wall_s", "user_s", "sys_s").sum(),
+        (pl.col("peak_rss_bytes").max() / 2**20).alias("peak_rss_mb"),
+        (pl.col("peak_rss_delta_bytes").max() / 2**20).alias("peak_rss_delta_mb"),
+        *[(pl.col(column).sum() / 2**20).alias(f"{column}_mb") for column in io_columns],
+    )
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Summarize a resource log written with INSTRUMENT_LOG")
+    parser.add_argument("log", type=Path, help="JSON lines file of measurements")
+    args = parser.parse_args()
+    # fmt: on
+
+    summary = summarize(args.log)
+    with pl.Config(
+        tbl_rows=len(summary), tbl_cols=len(summary.columns), tbl_width_chars=250, float_precision=3
+    ):
+        print(summary)
@@ -0,0 +1,145 @@
+"""
+On-disk snapshot of the social graph as files that are opened memory-mapped.
+
+Each relationship is stored as the `offsets` and `neighbors` arrays of its CSR as raw `.npy`
+files, and each node table as an uncompressed Arrow IPC file in the layout polars uses in memory,
+with a `manifest.json` describing the layout. Opening a snapshot maps the files instead of reading
+them, and neither the CSR arrays nor the node columns are copied out of the mapping, so it takes
+milliseconds at any scale, and worker processes that open the same snapshot share one copy of the
+data through the page cache.
+
+The snapshot can be built from the parquet files or exported from the Kùzu database:
+
+    python -m workload.snapshot --source parquet
+    python -m workload.snapshot --source kuzu --kuzu_db kuzudb/social_network
+"""
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from workload.csr import CSR
+from workload.reference import DATA_PATH, NODE_TABLES, RELATIONSHIPS, SocialGraph
+
+SNAPSHOT_PATH = DATA_PATH / "output" / "snapshot"
+KUZU_DB_PATH = DATA_PATH.parent / "kuzudb" / "social_network"
+FORMAT_VERSION = 2
+
+# Table names in the Kùzu schema
+KUZU_NODE_TABLES = {
+    "persons": "Person",
+    "cities": "City",
+    "states": "State",
+    "countries": "Country",
+    "interests": "Interest",
+}
+KUZU_REL_TABLES = {
+    "follows": "Follows",
+    "lives_in": "LivesIn",
+    "has_interest": "HasInterest",
+    "city_in": "CityIn",
+    "state_in": "StateIn",
+}
+
+
+def write_snapshot(graph: SocialGraph, path: Path = SNAPSHOT_PATH, source: str = "") -> None:
+    """Write a graph as a snapshot directory, replacing any snapshot already at `path`"""
+    shutil.rmtree(path, ignore_errors=True)
+    manifest = {"version": FORMAT_VERSION, "source": source, "nodes": {}, "relationships": {}}
+    (path / "nodes").mkdir(parents=True)
+    for name in NODE_TABLES:
+        table = getattr(graph, name)
+        table.write_ipc(path / "nodes" / f"{name}.arrow", compression="uncompressed")
+        columns = {col: str(dtype) for col, dtype in table.schema.items()}
+        manifest["nodes"][name] = {"num_rows": table.height, "columns": columns}
+    for name, (_, source_table, target_table) in RELATIONSHIPS.items():
+        csr = getattr(graph, name)
+        (path / "relationships" / name).mkdir(parents=True)
+        np.save(path / "relationships" / name / "offsets.npy", csr.offsets)
+        np.save(path / "relationships" / name / "neighbors.npy", csr.neighbors)
+        manifest["relationships"][name] = {
+            "source": source_table,
+            "target": target_table,
+            "num_edges": csr.num_edges,
+        }
+    (path / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH, mmap_mode: str | None = "r") -> SocialGraph:
+    """
+    Open a snapshot as a `SocialGraph`. With the default `mmap_mode="r"` no array or column is
+    read until it is used, and pages are shared with every other process that has the snapshot
+    open. With `mmap_mode=None` everything is read into memory.
+    """
+    manifest = json.loads((path / "manifest.json").read_text())
+    if manifest["version"] != FORMAT_VERSION:
+        raise ValueError(f"Snapshot format {manifest['version']} is not {FORMAT_VERSION}")
+    nodes = {
+        name: pl.read_ipc(path / "nodes" / f"{name}.arrow", memory_map=mmap_mode is not None)
+        for name in manifest["nodes"]
+    }
+    relationships = {
+        name: CSR(
+            np.load(path / "relationships" / name / "offsets.npy", mmap_mode=mmap_mode),
+            np.load(path / "relationships" / name / "neighbors.npy", mmap_mode=mmap_mode),
+        )
+        for name in manifest["relationships"]
+    }
+    return SocialGraph(**nodes, **relationships)
+
+
+def export_kuzu(conn) -> SocialGraph:
+    """Read every node and relationship table out of a Kùzu database into a `SocialGraph`"""
+    nodes = {}
+    for name, table in KUZU_NODE_TABLES.items():
+        frame = conn.execute(f"MATCH (n:{table}) RETURN n.*").get_as_pl()
+        nodes[name] = frame.rename(lambda col: col.removeprefix("n."))
+    edges = {}
+    for name, table in KUZU_REL_TABLES.items():
+        query = f"MATCH (a)-[:{table}]->(b) RETURN a.id AS from, b.id AS to"
+        edges[name] = conn.execute(query).get_as_pl()
+    return SocialGraph.from_frames(nodes, edges)
+
+
+def main() -> None:
+    start = time.perf_counter()
+    if SOURCE == "kuzu":
+        import kuzu
+
+        db = kuzu.Database(str(KUZU_DB), read_only=True)
+        graph = export_kuzu(kuzu.Connection(db))
+    else:
+        graph = SocialGraph.from_parquet()
+    print(f"Read the graph from {SOURCE} in {time.perf_counter() - start:.4f}s")
+
+    start = time.perf_counter()
+    write_snapshot(graph, OUTPUT, source=SOURCE)
+    print(f"Wrote the snapshot to {OUTPUT} in {time.perf_counter() - start:.4f}s")
+
+    start = time.perf_counter()
+    snapshot = load_snapshot(OUTPUT)
+    print(f"Opened the snapshot in {time.perf_counter() - start:.4f}s")
+    print(
+        f"{snapshot.follows.num_nodes} persons, {snapshot.follows.num_edges} follows edges, "
+        f"max in-degree {np.bincount(snapshot.follows.neighbors).max()}"
+    )
+
+
+if __name__ == "__main__":
+    # fmt: off
+    parser = argparse.ArgumentParser("Build a memory-mapped CSR snapshot of the social graph")
+    parser.add_argument("--source", choices=["parquet", "kuzu"], default="parquet", help="Build from the parquet files or export from Kùzu")
+    parser.add_argument("--kuzu_db", type=Path, default=KUZU_DB_PATH, help="Kùzu database to export from")
+    parser.add_argument("--output", "-o", type=Path, default=SNAPSHOT_PATH, help="Snapshot directory")
+    args = parser.parse_args()
+    # fmt: on
+
+    SOURCE = args.source
+    KUZU_DB = args.kuzu_db
+    OUTPUT = args.output
+    main()
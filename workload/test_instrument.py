@@ -0,0 +1,105 @@
+"""
+Check that measurements are only recorded when enabled, that they capture the CPU, memory and I/O
+of the measured block, and that nested blocks keep the peak memory of the blocks around them.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from workload import instrument
+from workload.instrument import PeakRss, configure, instrumented, measure
+from workload.resource_report import summarize
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "resources.jsonl"
+    configure(path)
+    yield path
+    configure(None)
+
+
+def read_log(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_measure_is_shared_no_op(tmp_path):
+    configure(None)
+    assert measure("a") is measure("b", label=1) is instrument.NULL_MEASUREMENT
+    with measure("a"):
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_measure_records_resources(log_path, tmp_path):
+    with measure("work", step="write"):
+        array = np.ones(50_000_000 // 8)
+        (tmp_path / "data.bin").write_bytes(array.tobytes())
+        sum(range(1_000_000))
+    (record,) = read_log(log_path)
+    assert record["name"] == "work" and record["step"] == "write"
+    assert record["wall_s"] > 0 and record["user_s"] + record["sys_s"] > 0
+    assert not record["failed"]
+    if record["peak_rss_delta_bytes"] is not None:
+        assert record["peak_rss_delta_bytes"] >= 40_000_000
+    if "write_chars" in record:
+        assert record["write_chars"] >= 50_000_000
+
+
+def test_nested_blocks_keep_outer_peak(log_path):
+    with measure("outer"):
+        with measure("first"):
+            array = np.ones(80_000_000 // 8)
+            array.sum()
+        del array
+        with measure("second"):
+            pass
+    first, second, outer = read_log(log_path)
+    if outer["peak_rss_bytes"] is None:
+        pytest.skip("Peak RSS is not available on this platform")
+    assert outer["peak_rss_bytes"] >= first["peak_rss_bytes"] > second["peak_rss_bytes"]
+
+
+def test_peak_rss_keeps_outer_peak(log_path):
+    with measure("outer"):
+        with PeakRss() as first:
+            array = np.ones(80_000_000 // 8)
+            array.sum()
+        del array
+        with PeakRss() as second:
+            pass
+    (outer,) = read_log(log_path)
+    if outer["peak_rss_delta_bytes"] is None:
+        pytest.skip("Peak RSS is not available on this platform")
+    assert first.delta_mb >= 70 > second.delta_mb
+    assert outer["peak_rss_delta_bytes"] >= 70 * 2**20
+
+
+def test_peak_rss_without_recording():
+    configure(None)
+    with PeakRss() as peak_rss:
+        array = np.ones(40_000_000 // 8)
+        array.sum()
+    assert peak_rss.delta_mb is None or peak_rss.delta_mb >= 30
+
+
+def test_instrumented_and_summary(log_path):
+    @instrumented()
+    def work(n):
+        return sum(range(n))
+
+    assert work(10) == 45
+    with pytest.raises(ZeroDivisionError):
+        with measure("query", query=1):
+            1 / 0
+    with measure("query", query=1):
+        pass
+    records = read_log(log_path)
+    assert records[0]["name"].endswith("work")
+    assert records[1]["failed"] and not records[2]["failed"]
+    summary = summarize(log_path)
+    assert summary.select("name", "query", "count").rows() == [
+        (records[0]["name"], None, 1),
+        ("query", 1, 2),
+    ]
@@ -0,0 +1,76 @@
+"""
+Check that a graph written as a snapshot opens memory-mapped with the same contents, and that the
+reference engine gives the same answers on it.
+"""
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from workload.reference import ReferenceBackend, SocialGraph
+from workload.registry import QUERIES
+from workload.snapshot import load_snapshot, write_snapshot
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return SocialGraph.from_parquet()
+
+
+@pytest.fixture(scope="module")
+def snapshot(graph, tmp_path_factory):
+    path = tmp_path_factory.mktemp("snapshot")
+    write_snapshot(graph, path, source="parquet")
+    return load_snapshot(path)
+
+
+def test_arrays_are_memory_mapped(snapshot):
+    assert isinstance(snapshot.follows.offsets, np.memmap)
+    assert isinstance(snapshot.follows.neighbors, np.memmap)
+
+
+def mapped_ranges(path: Path) -> list[tuple[int, int]]:
+    """Address ranges at which this process has `path` memory-mapped"""
+    ranges = []
+    for line in Path("/proc/self/maps").read_text().splitlines():
+        if line.endswith(str(path)):
+            start, end = line.split()[0].split("-")
+            ranges.append((int(start, 16), int(end, 16)))
+    return ranges
+
+
+@pytest.mark.skipif(not Path("/proc/self/maps").exists(), reason="reads the Linux memory maps")
+def test_node_columns_are_not_copied(graph, tmp_path):
+    write_snapshot(graph, tmp_path)
+    persons = load_snapshot(tmp_path).persons
+    ranges = mapped_ranges(tmp_path / "nodes" / "persons.arrow")
+    assert ranges
+    # The address of every buffer of a numeric and a string column lies within the mapped file
+    addresses = [persons["id"]._get_buffer_info()[0]]
+    name = persons["name"].to_arrow(compat_level=pl.CompatLevel.newest())
+    addresses += [buffer.address for buffer in name.buffers() if buffer is not None]
+    assert all(any(start <= address < end for start, end in ranges) for address in addresses)
+
+
+def test_round_trip(graph, snapshot):
+    for name in ("persons", "cities", "states", "countries", "interests"):
+        assert getattr(snapshot, name).equals(getattr(graph, name))
+    for name in ("follows", "lives_in", "has_interest", "city_in", "state_in"):
+        np.testing.assert_array_equal(getattr(snapshot, name).offsets, getattr(graph, name).offsets)
+        np.testing.assert_array_equal(
+            getattr(snapshot, name).neighbors, getattr(graph, name).neighbors
+        )
+
+
+def test_string_columns_keep_non_ascii(tmp_path, graph):
+    persons = graph.persons.with_columns(pl.lit("Zoë Kùzu").alias("name"))
+    write_snapshot(SocialGraph(**{**graph.__dict__, "persons": persons}), tmp_path)
+    assert load_snapshot(tmp_path).persons["name"].unique().to_list() == ["Zoë Kùzu"]
+
+
+@pytest.mark.parametrize("spec", QUERIES, ids=lambda spec: f"query{spec.id}")
+def test_reference_results_match(graph, snapshot, spec):
+    params = spec.bind()
+    expected = ReferenceBackend(graph).run(spec, params)
+    assert ReferenceBackend(snapshot).run(spec, params).equals(expected)